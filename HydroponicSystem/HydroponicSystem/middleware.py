@@ -0,0 +1,147 @@
+import gzip
+import logging
+import time
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import BadRequest, RequestDataTooBig
+from django.http import HttpResponse
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+class _CountingReader:
+    """Counts the compressed bytes read from the underlying request stream."""
+    def __init__(self, stream):
+        self._stream = stream
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self._stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+class DecompressingStream:
+    """
+    File-like wrapper that decompresses a request body while it is read.
+
+    Decompressed output is produced in bounded reads, so memory use depends on the
+    read size and not on the compression ratio. Reading past `max_size` decompressed
+    bytes raises `RequestDataTooBig` (answered with 400) to guard against zip bombs;
+    `None` disables the limit.
+    """
+    def __init__(self, stream, encoding, max_size, read_size=65536):
+        self.compressed = _CountingReader(stream)
+        if encoding == "gzip":
+            self._reader = gzip.GzipFile(fileobj=self.compressed, mode="rb")
+        else:
+            self._reader = zstandard.ZstdDecompressor().stream_reader(self.compressed)
+        self.max_size = max_size
+        self.read_size = read_size
+        self.decompressed = 0
+        self.decode_seconds = 0.0
+        self._buffer = b""
+        self._eof = False
+
+    def _fill(self, size):
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            started = time.perf_counter()
+            try:
+                chunk = self._reader.read(self.read_size)
+            except (OSError, EOFError, zlib.error) as e:
+                raise BadRequest(f"Invalid compressed request body: {e}")
+            except Exception as e:
+                if zstandard is not None and isinstance(e, zstandard.ZstdError):
+                    raise BadRequest(f"Invalid compressed request body: {e}")
+                raise
+            finally:
+                self.decode_seconds += time.perf_counter() - started
+
+            if not chunk:
+                self._eof = True
+                break
+
+            self.decompressed += len(chunk)
+            if self.max_size is not None and self.decompressed > self.max_size:
+                raise RequestDataTooBig(
+                    f"Decompressed request body exceeds {self.max_size} bytes."
+                )
+            self._buffer += chunk
+
+    def read(self, size=-1):
+        if size is None:
+            size = -1
+        self._fill(size)
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def readline(self, size=-1):
+        if size is None:
+            size = -1
+        while True:
+            end = self._buffer.find(b"\n")
+            if end >= 0 and (size < 0 or end < size):
+                return self.read(end + 1)
+            if self._eof or (0 <= size <= len(self._buffer)):
+                return self.read(size)
+            self._fill(len(self._buffer) + self.read_size)
+
+    def __iter__(self):
+        return iter(self.readline, b"")
+
+
+class RequestDecompressionMiddleware:
+    """
+    Decodes request bodies sent with `Content-Encoding: gzip` (or `zstd` when the
+    `zstandard` package is installed) as they are read, so DRF parsers and the
+    streaming ingest paths see plain bytes.
+
+    The decompressed size limit is `REQUEST_DECOMPRESSION['MAX_SIZE']`, by default
+    `DATA_UPLOAD_MAX_MEMORY_SIZE` so compression cannot be used to send more than an
+    uncompressed body may hold. Compression ratio and decode time are logged and exposed
+    as `request.decompression_stats`.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        encoding = request.META.get("HTTP_CONTENT_ENCODING", "").strip().lower()
+        if not encoding or encoding == "identity":
+            return self.get_response(request)
+
+        if encoding != "gzip" and not (encoding == "zstd" and zstandard is not None):
+            return HttpResponse(
+                f"Unsupported Content-Encoding: {encoding}", status=415, content_type="text/plain"
+            )
+
+        config = getattr(settings, 'REQUEST_DECOMPRESSION', {})
+        max_size = config.get('MAX_SIZE', settings.DATA_UPLOAD_MAX_MEMORY_SIZE)
+        stream = DecompressingStream(request._stream, encoding, max_size)
+        request._stream = stream
+
+        response = self.get_response(request)
+
+        if stream.decompressed:
+            request.decompression_stats = {
+                "encoding": encoding,
+                "compressed_bytes": stream.compressed.bytes_read,
+                "decompressed_bytes": stream.decompressed,
+                "ratio": stream.decompressed / max(stream.compressed.bytes_read, 1),
+                "decode_ms": stream.decode_seconds * 1000,
+            }
+            logger.info(
+                "Decompressed %(encoding)s request body: %(compressed_bytes)d -> %(decompressed_bytes)d bytes "
+                "(ratio %(ratio).1f) in %(decode_ms).1f ms",
+                request.decompression_stats,
+            )
+
+        return response
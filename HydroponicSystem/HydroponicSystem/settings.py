@@ -60,11 +60,89 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 }
 
+## measurement ingest
+MEASUREMENT_INGEST = {
+    'BATCH_MAX_SIZE': 1000,
+    'GATEWAY_MAX_ROWS': 10000,
+    'NDJSON_CHUNK_SIZE': 500,
+    'NDJSON_MAX_LINE_BYTES': 65536,
+    # acknowledge single measurements immediately and write them in the background
+    'WRITE_BEHIND': False,
+    'WRITE_BEHIND_MAX_ROWS': 10000,
+    'WRITE_BEHIND_FLUSH_ROWS': 500,
+    'WRITE_BEHIND_FLUSH_INTERVAL': 1.0,
+    # manage.py run_ingest_server
+    'LINE_SERVER_QUEUE_SIZE': 10000,
+    'LINE_SERVER_BATCH_SIZE': 500,
+    'LINE_SERVER_MAX_LINE_BYTES': 4096,
+    'LINE_SERVER_AUTH_TIMEOUT': 10.0,
+    # how long a device token lookup is reused; a revoked token keeps working at most this long
+    'LINE_SERVER_TOKEN_CACHE_SECONDS': 60.0,
+}
+
+## measurement history queries
+MEASUREMENT_QUERY = {
+    # most buckets returned by /systems/<id>/measurements/aggregate/
+    'AGGREGATION_MAX_BUCKETS': 20000,
+    # ?max_points= downsampling
+    'MAX_POINTS_LIMIT': 10000,
+    'DOWNSAMPLE_CHUNK_SIZE': 10000,
+    # rows per server-side cursor fetch and per streamed chunk of /systems/<id>/measurements/export/
+    'EXPORT_CHUNK_SIZE': 2000,
+    # most compressed rows a list or export decodes beyond the ones it returns: the whole range for
+    # sort_by=ph|temperature|tds, the offset of a numbered page
+    'BLOCK_SCAN_MAX_ROWS': 100000,
+    # latest measurements returned by /systems/<id>/, cached per system in LATEST_CACHE
+    'LATEST_COUNT': 10,
+    'LATEST_CACHE': 'default',
+    # per-system and per-user version tokens behind ETag / Last-Modified
+    'VERSION_CACHE': 'default',
+    # answer If-None-Match / If-Modified-Since; None does so only when VERSION_CACHE is shared
+    # by all processes (see CACHE_URL), since tokens bumped elsewhere are invisible otherwise
+    'CONDITIONAL_REQUESTS': None,
+    # /systems/<id>/measurements/statistics/: a reading counts towards time-in-range until the
+    # next one, unless they are further apart than this many seconds
+    'STATISTICS_MAX_GAP': 3600,
+    # PostgreSQL work_mem of the statistics query, so its percentile sorts stay in memory
+    'STATISTICS_WORK_MEM': '64MB',
+}
+
+MEASUREMENT_SERIES = {
+    # directory of the memory-mapped per-system .npy series read by analytics queries (see
+    # HydroponicSystem_systems/series.py); None disables them. Every process that writes
+    # measurements must use the same directory, or the caches miss their writes.
+    'ROOT': env('MEASUREMENT_SERIES_ROOT', default=None),
+}
+
+MEASUREMENT_COMPRESSION = {
+    # `manage.py compress_measurements` moves whole days older than this into compressed blocks
+    'COLD_DAYS': 30,
+}
+
+MEASUREMENT_RETENTION = {
+    # days raw measurements are kept by `manage.py compact_measurements` unless the system sets
+    # raw_retention_days; None keeps them forever. Older readings survive only in the rollups.
+    'RAW_DAYS': 90,
+    # rows per DELETE statement and transaction
+    'BATCH_SIZE': 5000,
+}
+
+## largest request body read into memory, Django's default
+DATA_UPLOAD_MAX_MEMORY_SIZE = 2621440
+
+## gzip/zstd request bodies
+REQUEST_DECOMPRESSION = {
+    # limit on the decompressed size in bytes, the same as for uncompressed bodies so that
+    # compression cannot get a bigger body past it. This also caps compressed NDJSON streams.
+    'MAX_SIZE': DATA_UPLOAD_MAX_MEMORY_SIZE,
+}
+
 ## custom user model
 AUTH_USER_MODEL = 'HydroponicSystem_authentication.User'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'HydroponicSystem.middleware.RequestDecompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -108,6 +186,17 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# CACHE_URL, e.g. redis://redis:6379/0, selects a backend shared by every process. The
+# local-memory default is per process: it only suits a single web process, and
+# manage.py run_ingest_server refuses to run with it, since the web process would never
+# see the ingest server's writes in its latest-measurement and version caches.
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://hydroponic-system'),
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -16,6 +16,11 @@ class JWTAuthentication(authentication.BaseAuthentication):
         
         jwt_token = JWTAuthentication.get_the_token_from_header(jwt_token)
 
+        return JWTAuthentication.authenticate_token(jwt_token)
+
+    @classmethod
+    def authenticate_token(cls, jwt_token):
+        """Return `(user, payload)` for a valid token, `None` otherwise."""
         try:
             payload = jwt.decode(jwt_token, settings.SECRET_KEY, algorithms=['HS256'])
         except jwt.exceptions.InvalidSignatureError:
@@ -34,7 +39,7 @@ class JWTAuthentication(authentication.BaseAuthentication):
             return None 
 
         return user, payload
-    
+
     def authenticate_header(self, request):
         return 'Bearer'
 
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-18 03:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('email', models.EmailField(max_length=100, unique=True)),
+                ('is_staff', models.BooleanField(default=False)),
+                ('is_superuser', models.BooleanField(default=False)),
+                ('groups', models.ManyToManyField(related_name='custom_user_set', to='auth.group')),
+                ('user_permissions', models.ManyToManyField(related_name='custom_user_set', to='auth.permission')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+from django.db import NotSupportedError
+from django.db.models import Avg, Count, DateTimeField, Func, Max, Min
+
+# bucket parameter -> width in seconds
+BUCKETS = {
+    "1m": 60,
+    "5m": 5 * 60,
+    "1h": 60 * 60,
+    "1d": 24 * 60 * 60,
+}
+
+METRICS = ("ph", "temperature", "tds")
+
+
+class DateBin(Func):
+    """
+    Truncate a timestamp to the start of its `seconds`-wide bucket, counted from the Unix epoch.
+
+    Uses `date_bin` on PostgreSQL (14+) and epoch arithmetic with `strftime` on SQLite;
+    both align buckets to UTC.
+    """
+    output_field = DateTimeField()
+
+    def __init__(self, expression, seconds, **extra):
+        # inlined rather than passed as a parameter, so SELECT and GROUP BY are the same SQL
+        self.seconds = int(seconds)
+        super().__init__(expression, **extra)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template=(
+                f"date_bin(INTERVAL '{self.seconds} seconds', %(expressions)s, "
+                f"TIMESTAMPTZ '1970-01-01 00:00:00+00')"
+            ),
+            **extra_context,
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template=(
+                f"strftime('%%%%Y-%%%%m-%%%%d %%%%H:%%%%M:%%%%S', "
+                f"(CAST(strftime('%%%%s', %(expressions)s) AS INTEGER) / {self.seconds}) * {self.seconds}, "
+                f"'unixepoch')"
+            ),
+            **extra_context,
+        )
+
+    def as_sql(self, compiler, connection, template=None, **extra_context):
+        if template is None:
+            raise NotSupportedError(f"DateBin is not implemented for {connection.vendor}.")
+        return super().as_sql(compiler, connection, template=template, **extra_context)
+
+
+def aggregate_measurements(queryset, seconds, descending=False):
+    """
+    Group `queryset` into `seconds`-wide buckets inside the database.
+
+    Returns a queryset of dicts with the bucket start as `bucket`, `count` and `<metric>_min/_max/_avg`
+    for every metric, ordered by bucket.
+    """
+    aggregates = {"count": Count("id")}
+    for metric in METRICS:
+        aggregates[f"{metric}_min"] = Min(metric)
+        aggregates[f"{metric}_max"] = Max(metric)
+        aggregates[f"{metric}_avg"] = Avg(metric)
+
+    return (
+        queryset
+        .annotate(bucket=DateBin("timestamp", seconds))
+        .values("bucket")
+        .annotate(**aggregates)
+        .order_by("-bucket" if descending else "bucket")
+    )
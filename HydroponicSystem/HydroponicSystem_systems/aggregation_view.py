@@ -0,0 +1,112 @@
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from django.conf import settings
+from .models import HydroponicSystem, Measurement
+from .serializers import MeasurementBucketSerializer
+from .filters import parse_measurement_filters, parse_measurement_query
+from .aggregation import BUCKETS, aggregate_measurements
+from .rollups import aggregate_rollup, find_rollup
+from .blocks import MeasurementHistory
+from .renderers import ColumnarJSONRenderer
+from .columnar import BUCKET_COLUMNS, BUCKET_FLOAT_COLUMNS, parse_columnar_options, to_columns
+
+class MeasurementAggregationAPIView(APIView):
+    renderer_classes = [JSONRenderer, ColumnarJSONRenderer, BrowsableAPIRenderer]
+
+    def get(self, request, system_id):
+        """
+        Measurements of a hydroponic system aggregated into time buckets.
+
+        Buckets are computed by the database and aligned to UTC, so a week at one-minute
+        resolution is ~10k rows of summaries instead of every raw measurement. Hourly and daily
+        buckets are read from the maintained rollup tables when only date filters are given.
+
+        ## URL Parameter:
+        - **system_id** (integer, required): The ID of the hydroponic system.
+
+        ## Query Parameters:
+        - **bucket** (string, default: `1h`): Bucket width, one of `1m`, `5m`, `1h`, `1d`.
+        - **sort_order** (string, default: `asc`): Order of the buckets (`asc` or `desc`).
+        - The filters of `GET /systems/<id>/measurements/` (`ph_min`, `timestamp_after`, ...) select the
+          measurements that are aggregated.
+        - **format**, **timestamps**, **float32**: `format=columnar` returns `results` as one array per
+          column, as in `GET /systems/<id>/measurements/`.
+
+        ## Example Request:
+        GET /systems/1/measurements/aggregate/?bucket=1h&timestamp_after=2025-02-10
+
+        ## Responses:
+        - **200 OK**: Returns the buckets that contain at least one measurement.
+        - **400 Bad Request**: If a query parameter is incorrectly formatted or the range has too many buckets.
+        - **403 Forbidden**: If the user does not have permission to access the system.
+
+        ## Example Response:
+        ```json
+        {
+            "bucket": "1h",
+            "results": [
+                {
+                    "timestamp": "2025-02-17T12:00:00Z",
+                    "count": 60,
+                    "ph_min": 6.4,
+                    "ph_max": 6.8,
+                    "ph_avg": 6.61,
+                    "temperature_min": 24.5,
+                    "temperature_max": 25.0,
+                    "temperature_avg": 24.8,
+                    "tds_min": 480,
+                    "tds_max": 500,
+                    "tds_avg": 489.5
+                }
+            ]
+        }
+        ```
+        """
+        try:
+            system = HydroponicSystem.objects.get(id=system_id, owner=request.user)
+        except HydroponicSystem.DoesNotExist:
+            raise PermissionDenied("You do not have permission to this system")
+
+        bucket = request.query_params.get("bucket", "1h")
+        if bucket not in BUCKETS:
+            return Response(
+                {"detail": f"Invalid value for 'bucket'. Use one of: {', '.join(BUCKETS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        filters, _, descending = parse_measurement_query(request.query_params)
+        max_buckets = getattr(settings, 'MEASUREMENT_QUERY', {}).get('AGGREGATION_MAX_BUCKETS', 20000)
+
+        lookups = parse_measurement_filters(request.query_params)
+        rollup = find_rollup(BUCKETS[bucket], lookups)
+
+        history = MeasurementHistory(system.id, lookups, descending)
+
+        if rollup is not None:
+            buckets = aggregate_rollup(
+                rollup[0], system, BUCKETS[bucket], lookups, descending=descending, limit=max_buckets + 1,
+            )
+        elif history.has_blocks:
+            buckets = history.aggregate(BUCKETS[bucket], limit=max_buckets + 1)
+        else:
+            buckets = list(aggregate_measurements(
+                Measurement.objects.filter(filters, system=system), BUCKETS[bucket], descending=descending,
+            )[:max_buckets + 1])
+
+        if len(buckets) > max_buckets:
+            return Response(
+                {"detail": f"Too many buckets. At most {max_buckets} are returned, "
+                           f"narrow the time range or use a larger bucket."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if isinstance(request.accepted_renderer, ColumnarJSONRenderer):
+            epoch_ms, float32 = parse_columnar_options(request.query_params)
+            results = to_columns(buckets, BUCKET_COLUMNS, BUCKET_FLOAT_COLUMNS, epoch_ms=epoch_ms, float32=float32)
+        else:
+            results = MeasurementBucketSerializer(buckets, many=True).data
+
+        return Response({"bucket": bucket, "results": results})
@@ -0,0 +1,131 @@
+"""
+Compact fixed-width binary format for measurement uploads.
+
+Shared by the server and by gateway firmware/tools so both sides stay in sync.
+All values are little-endian.
+
+Header (16 bytes, followed by 8 more when FLAG_SEQUENCE is set):
+
+    magic           2s   b"HM"
+    version         B    1
+    flags           B    FLAG_SEQUENCE = 0x01
+    count           I    number of records
+    base_timestamp  q    milliseconds since the Unix epoch
+    first_sequence  Q    only with FLAG_SEQUENCE; record i has sequence first_sequence + i
+
+Record (16 bytes):
+
+    offset_ms       I    milliseconds after base_timestamp
+    ph              f    float32
+    temperature     f    float32
+    tds             I    uint32
+"""
+import struct
+from datetime import datetime, timezone
+
+CONTENT_TYPE = "application/x-hydroponic-measurements"
+
+MAGIC = b"HM"
+VERSION = 1
+FLAG_SEQUENCE = 0x01
+
+HEADER = struct.Struct("<2sBBIq")
+SEQUENCE = struct.Struct("<Q")
+RECORD = struct.Struct("<IffI")
+
+
+class BinaryFormatError(ValueError):
+    pass
+
+
+def _to_millis(timestamp):
+    if isinstance(timestamp, datetime):
+        return int(timestamp.timestamp() * 1000)
+    return int(timestamp)
+
+
+def encode(readings, first_sequence=None):
+    """
+    Encode `(timestamp, ph, temperature, tds)` tuples, where `timestamp` is an aware
+    datetime or milliseconds since the epoch. Readings must span less than ~49 days.
+    """
+    readings = [(_to_millis(timestamp), ph, temperature, tds) for timestamp, ph, temperature, tds in readings]
+    base = min((millis for millis, *_ in readings), default=0)
+
+    flags = FLAG_SEQUENCE if first_sequence is not None else 0
+    parts = [HEADER.pack(MAGIC, VERSION, flags, len(readings), base)]
+    if first_sequence is not None:
+        parts.append(SEQUENCE.pack(first_sequence))
+
+    try:
+        parts.extend(RECORD.pack(millis - base, ph, temperature, tds) for millis, ph, temperature, tds in readings)
+    except struct.error as e:
+        raise BinaryFormatError(f"Reading cannot be encoded: {e}")
+
+    return b"".join(parts)
+
+
+def decode_header(data):
+    """Return `(count, base_timestamp_ms, first_sequence, body_offset)` after checking the header and size."""
+    if len(data) < HEADER.size:
+        raise BinaryFormatError("Payload is shorter than the header.")
+
+    magic, version, flags, count, base = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise BinaryFormatError("Invalid magic bytes.")
+    if version != VERSION:
+        raise BinaryFormatError(f"Unsupported format version {version}.")
+
+    offset = HEADER.size
+    first_sequence = None
+    if flags & FLAG_SEQUENCE:
+        if len(data) < offset + SEQUENCE.size:
+            raise BinaryFormatError("Payload is shorter than the header.")
+        (first_sequence,) = SEQUENCE.unpack_from(data, offset)
+        offset += SEQUENCE.size
+
+    if len(data) - offset != count * RECORD.size:
+        raise BinaryFormatError(
+            f"Expected {count} records ({count * RECORD.size} bytes), got {len(data) - offset} bytes."
+        )
+
+    return count, base, first_sequence, offset
+
+
+def decode(data):
+    """
+    Yield `(timestamp, ph, temperature, tds, sequence)` tuples with aware UTC datetimes.
+    `sequence` is None when the payload carries no sequence numbers.
+    """
+    count, base, first_sequence, offset = decode_header(data)
+
+    for index, (offset_ms, ph, temperature, tds) in enumerate(RECORD.iter_unpack(memoryview(data)[offset:])):
+        timestamp = datetime.fromtimestamp((base + offset_ms) / 1000, tz=timezone.utc)
+        sequence = first_sequence + index if first_sequence is not None else None
+        # float32 keeps ~7 significant digits; rounding drops the widening noise (22.1 -> 22.100000381...)
+        yield timestamp, round(ph, 5), round(temperature, 5), tds, sequence
+
+
+def decode_columns(data):
+    """
+    Decode a payload into NumPy column arrays without building per-row Python objects.
+
+    Returns a dict with `timestamp` (int64 milliseconds since the epoch), `ph`, `temperature`
+    (float64, rounded like `decode`), `tds` (int64) and `sequence` (int64, or None).
+    """
+    import numpy as np
+
+    count, base, first_sequence, offset = decode_header(data)
+    records = np.frombuffer(
+        data, offset=offset, count=count,
+        dtype=np.dtype([("offset", "<u4"), ("ph", "<f4"), ("temperature", "<f4"), ("tds", "<u4")]),
+    )
+
+    return {
+        "timestamp": records["offset"].astype(np.int64) + base,
+        "ph": records["ph"].astype(np.float64).round(5),
+        "temperature": records["temperature"].astype(np.float64).round(5),
+        "tds": records["tds"].astype(np.int64),
+        "sequence": np.arange(first_sequence, first_sequence + count, dtype=np.int64)
+        if first_sequence is not None else None,
+    }
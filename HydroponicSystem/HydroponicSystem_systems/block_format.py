@@ -0,0 +1,148 @@
+"""
+Compressed column format of `MeasurementBlock.data`, one system-day of measurements.
+
+Gorilla-style: timestamps and ids are stored as delta-of-delta, floats as the XOR with the
+previous value, so regular readings and slowly changing values become runs of zero bytes.
+Unlike Gorilla the values are trimmed to whole bytes instead of bits, which lets NumPy
+encode and decode a block without a Python loop per value. The body is then deflated.
+All values are little-endian.
+
+Header (8 bytes):
+
+    magic           2s   b"HB"
+    version         B    1
+    flags           B    FLAG_SEQUENCE = 0x01 (some rows have a sequence)
+    count           I    number of rows
+
+Body (zlib), one word section per column, in this order:
+
+    id              delta-of-delta, zigzag
+    timestamp       microseconds since the Unix epoch, delta-of-delta, zigzag
+    ph              float64 bits XOR the previous row's
+    temperature     float64 bits XOR the previous row's
+    tds             delta, zigzag
+    sequence        only with FLAG_SEQUENCE: a bitmap of the rows that have one
+                    (numpy.packbits), then a word section of their values, delta-of-delta
+
+A word section of n words is n control bytes, each the number of low-order zero bytes
+dropped (high nibble) and of bytes kept (low nibble), followed by the kept bytes of every word.
+"""
+import struct
+import zlib
+
+import numpy as np
+
+MAGIC = b"HB"
+VERSION = 1
+FLAG_SEQUENCE = 0x01
+
+HEADER = struct.Struct("<2sBBI")
+
+BYTE_COLUMNS = np.arange(8)
+
+
+class BlockFormatError(ValueError):
+    pass
+
+
+def _pack_words(words):
+    matrix = np.ascontiguousarray(words, dtype="<u8").view(np.uint8).reshape(-1, 8)
+    nonzero = matrix != 0
+    used = nonzero.any(axis=1)
+    low = np.where(used, nonzero.argmax(axis=1), 0)
+    kept = np.where(used, 8 - nonzero[:, ::-1].argmax(axis=1) - low, 0)
+    mask = (BYTE_COLUMNS >= low[:, None]) & (BYTE_COLUMNS < (low + kept)[:, None])
+    return (low << 4 | kept).astype(np.uint8).tobytes() + matrix[mask].tobytes()
+
+
+def _unpack_words(body, offset, count):
+    if offset + count > len(body):
+        raise BlockFormatError("Truncated block")
+    controls = np.frombuffer(body, dtype=np.uint8, count=count, offset=offset).astype(np.int64)
+    low, kept = controls >> 4, controls & 0x0F
+    size = int(kept.sum())
+    if offset + count + size > len(body) or (low + kept > 8).any():
+        raise BlockFormatError("Corrupt block")
+    matrix = np.zeros((count, 8), dtype=np.uint8)
+    mask = (BYTE_COLUMNS >= low[:, None]) & (BYTE_COLUMNS < (low + kept)[:, None])
+    matrix[mask] = np.frombuffer(body, dtype=np.uint8, count=size, offset=offset + count)
+    return matrix.view("<u8").ravel(), offset + count + size
+
+
+def _zigzag(values):
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).view(np.uint64)
+
+
+def _unzigzag(words):
+    return (words >> np.uint64(1)).view(np.int64) ^ -(words & np.uint64(1)).view(np.int64)
+
+
+def _delta(values):
+    return np.diff(values.astype(np.int64), prepend=np.int64(0))
+
+
+def _xor(values):
+    bits = np.ascontiguousarray(values, dtype=np.float64).view(np.uint64)
+    return bits ^ np.concatenate([np.zeros(1, dtype=np.uint64), bits[:-1]])
+
+
+def encode(columns):
+    """
+    Encode a block from NumPy `columns`: int64 `id`, `timestamp` (microseconds), `tds` and
+    `sequence`, a bool `sequence_null`, float64 `ph` and `temperature`, all of one length.
+    """
+    count = len(columns["id"])
+    has_sequence = count and not columns["sequence_null"].all()
+    sections = [
+        _pack_words(_zigzag(_delta(_delta(columns["id"])))),
+        _pack_words(_zigzag(_delta(_delta(columns["timestamp"])))),
+        _pack_words(_xor(columns["ph"])),
+        _pack_words(_xor(columns["temperature"])),
+        _pack_words(_zigzag(_delta(columns["tds"]))),
+    ]
+    if has_sequence:
+        present = ~columns["sequence_null"]
+        sections.append(np.packbits(present).tobytes())
+        sections.append(_pack_words(_zigzag(_delta(_delta(columns["sequence"][present])))))
+
+    header = HEADER.pack(MAGIC, VERSION, FLAG_SEQUENCE if has_sequence else 0, count)
+    return header + zlib.compress(b"".join(sections), 6)
+
+
+def decode(data):
+    """Decode a block into the columns that `encode` takes."""
+    data = bytes(data)
+    if len(data) < HEADER.size:
+        raise BlockFormatError("Truncated block")
+    magic, version, flags, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise BlockFormatError("Not a measurement block")
+    try:
+        body = zlib.decompress(data[HEADER.size:])
+    except zlib.error as e:
+        raise BlockFormatError(f"Corrupt block: {e}")
+
+    words = {}
+    offset = 0
+    for name in ("id", "timestamp", "ph", "temperature", "tds"):
+        words[name], offset = _unpack_words(body, offset, count)
+
+    columns = {
+        "id": np.cumsum(np.cumsum(_unzigzag(words["id"]))),
+        "timestamp": np.cumsum(np.cumsum(_unzigzag(words["timestamp"]))),
+        "ph": np.bitwise_xor.accumulate(words["ph"]).view(np.float64),
+        "temperature": np.bitwise_xor.accumulate(words["temperature"]).view(np.float64),
+        "tds": np.cumsum(_unzigzag(words["tds"])),
+        "sequence": np.zeros(count, dtype=np.int64),
+        "sequence_null": np.ones(count, dtype=bool),
+    }
+    if flags & FLAG_SEQUENCE:
+        bitmap_size = (count + 7) // 8
+        present = np.unpackbits(
+            np.frombuffer(body, dtype=np.uint8, count=bitmap_size, offset=offset), count=count,
+        ).astype(bool)
+        sequences, offset = _unpack_words(body, offset + bitmap_size, int(present.sum()))
+        columns["sequence"][present] = np.cumsum(np.cumsum(_unzigzag(sequences)))
+        columns["sequence_null"] = ~present
+    return columns
@@ -0,0 +1,311 @@
+import heapq
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import cached_property, reduce
+from operator import attrgetter, itemgetter
+from itertools import groupby, islice, repeat
+
+import numpy as np
+from django.db.models import Sum
+
+from . import block_format
+from .aggregation import METRICS, aggregate_measurements
+from .models import Measurement, MeasurementBlock
+from .pagination import keyset_filter
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+DAY = timedelta(days=1)
+
+# the columns of serializers.MEASUREMENT_VALUES, which cannot be imported here: serializers
+# imports writes, which imports this module through series
+Row = namedtuple("Row", ["id", "sequence", "timestamp", "ph", "temperature", "tds", "system_id"])
+
+
+def day_start(value):
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, value.day, tzinfo=dt_timezone.utc)
+
+
+def _to_micros(value):
+    return (value - EPOCH) // MICROSECOND
+
+
+def _sort_key(row):
+    return row.timestamp, row.id
+
+
+def rows_to_columns(rows):
+    """`block_format` columns of `Row`s (or other tuples in the same order)."""
+    rows = list(rows)
+    count = len(rows)
+    return {
+        "id": np.fromiter((row[0] for row in rows), dtype=np.int64, count=count),
+        "sequence": np.fromiter((row[1] or 0 for row in rows), dtype=np.int64, count=count),
+        "sequence_null": np.fromiter((row[1] is None for row in rows), dtype=bool, count=count),
+        "timestamp": np.fromiter((_to_micros(row[2]) for row in rows), dtype=np.int64, count=count),
+        "ph": np.fromiter((row[3] for row in rows), dtype=np.float64, count=count),
+        "temperature": np.fromiter((row[4] for row in rows), dtype=np.float64, count=count),
+        "tds": np.fromiter((row[5] for row in rows), dtype=np.int64, count=count),
+    }
+
+
+def columns_to_rows(columns, index, system_id):
+    """The `Row`s at positions `index` of decoded block `columns`."""
+    sequences = columns["sequence"][index].tolist()
+    nulls = columns["sequence_null"][index].tolist()
+    return list(map(Row._make, zip(
+        columns["id"][index].tolist(),
+        [None if null else sequence for sequence, null in zip(sequences, nulls)],
+        [EPOCH + MICROSECOND * value for value in columns["timestamp"][index].tolist()],
+        columns["ph"][index].tolist(),
+        columns["temperature"][index].tolist(),
+        columns["tds"][index].tolist(),
+        repeat(system_id),
+    )))
+
+
+def _mask(columns, lookups, after=None, backwards=False):
+    mask = np.ones(len(columns["id"]), dtype=bool)
+    for lookup, value in lookups.items():
+        name, _, operator = lookup.partition("__")
+        column = columns[name]
+        if name == "timestamp":
+            value = _to_micros(value)
+        if operator == "gte":
+            mask &= column >= value
+        elif operator == "lte":
+            mask &= column <= value
+        else:
+            raise ValueError(f"Unsupported lookup {lookup!r}")
+
+    if after is not None:
+        timestamp, pk = _to_micros(after[0]), after[1]
+        times, ids = columns["timestamp"], columns["id"]
+        if backwards:
+            mask &= (times < timestamp) | ((times == timestamp) & (ids < pk))
+        else:
+            mask &= (times > timestamp) | ((times == timestamp) & (ids > pk))
+    return mask
+
+
+class ScanLimitExceeded(Exception):
+    """A read would decode more compressed rows than its `max_scan_rows` allows."""
+
+
+class MeasurementHistory:
+    """
+    The measurements of one system matching `lookups` (as returned by
+    `filters.parse_measurement_filters`), from the `Measurement` table and the compressed
+    `MeasurementBlock`s together.
+
+    Rows come out as `Row` named tuples in `(sort_by, id)` order, `sort_by` being one of the
+    columns of `filters.MEASUREMENT_SORTS`, descending with `descending`. Blocks are only decoded
+    when they overlap the requested time range; when none does, every method costs what the
+    same query on `queryset` costs, plus one EXISTS. For an order other than `timestamp` the
+    overlapping blocks are decoded and sorted together in memory. Sliceable and countable, so
+    it can be given to a paginator instead of a queryset; a slice skips its offset row by row.
+
+    With `max_scan_rows`, reading rows in a value order when the overlapping blocks hold more
+    rows than that, or slicing from a larger offset, raises `ScanLimitExceeded` before
+    anything is decoded.
+    """
+    ordered = True
+
+    def __init__(self, system_id, lookups=None, descending=False, sort_by="timestamp", max_scan_rows=None):
+        self.system_id = system_id
+        self.lookups = dict(lookups or {})
+        self.descending = descending
+        self.sort_by = sort_by
+        self.max_scan_rows = max_scan_rows
+        self.queryset = Measurement.objects.filter(system_id=system_id, **self.lookups)
+
+        blocks = MeasurementBlock.objects.filter(system_id=system_id)
+        if "timestamp__gte" in self.lookups:
+            blocks = blocks.filter(end__gt=self.lookups["timestamp__gte"])
+        if "timestamp__lte" in self.lookups:
+            blocks = blocks.filter(start__lte=self.lookups["timestamp__lte"])
+        self.blocks = blocks
+
+    @cached_property
+    def has_blocks(self):
+        return self.blocks.exists()
+
+    def compressed_count(self):
+        """Rows in the overlapping blocks, from their metadata, whether or not they match."""
+        return self.blocks.aggregate(rows=Sum("count"))["rows"] or 0
+
+    def _decoded(self, blocks, after=None, backwards=False):
+        """`(columns, mask)` of each of `blocks`, in the given order."""
+        for block in blocks.iterator(chunk_size=20):
+            columns = block_format.decode(block.data)
+            yield columns, _mask(columns, self.lookups, after, backwards)
+
+    def count(self):
+        count = self.queryset.count()
+        if not self.has_blocks:
+            return count
+
+        gte, lte = self.lookups.get("timestamp__gte"), self.lookups.get("timestamp__lte")
+        if set(self.lookups) <= {"timestamp__gte", "timestamp__lte"}:
+            # blocks entirely inside the range count without being decoded
+            whole = []
+            for pk, start, end, rows in self.blocks.values_list("pk", "start", "end", "count"):
+                if (gte is None or start >= gte) and (lte is None or end <= lte):
+                    whole.append(pk)
+                    count += rows
+            partial = self.blocks.exclude(pk__in=whole)
+        else:
+            partial = self.blocks
+        return count + sum(int(mask.sum()) for _, mask in self._decoded(partial))
+
+    def rows(self, descending=None, after=None, chunk_size=2000):
+        """
+        Iterate over the rows, after the `(timestamp, id)` position `after` when given, which
+        needs the timestamp order.
+
+        Hot rows are read with a server-side cursor in chunks of `chunk_size`; in timestamp
+        order blocks are decoded one at a time as the merge reaches them.
+        """
+        descending = self.descending if descending is None else descending
+        field = self.sort_by
+        if after is not None and field != "timestamp":
+            raise ValueError("Keyset positions need the timestamp order")
+        hot = self.queryset
+        if after is not None:
+            hot = hot.filter(keyset_filter(*after, backwards=descending))
+        hot = (
+            hot.order_by(*((f"-{field}", "-id") if descending else (field, "id")))
+            .values_list(*Row._fields, named=True)
+            .iterator(chunk_size=chunk_size)
+        )
+        if not self.has_blocks:
+            return hot
+        if field != "timestamp":
+            if self.max_scan_rows is not None and self.compressed_count() > self.max_scan_rows:
+                raise ScanLimitExceeded(
+                    f"Sorting by '{field}' sorts the compressed history in memory, at most "
+                    f"{self.max_scan_rows} measurements of it. Narrow the time range or sort by timestamp."
+                )
+            blocks = self._sorted_block_rows(descending, chunk_size)
+            return heapq.merge(hot, blocks, key=attrgetter(field, "id"), reverse=descending)
+        return heapq.merge(hot, self._block_rows(descending, after), key=_sort_key, reverse=descending)
+
+    def _sorted_block_rows(self, descending, chunk_size):
+        parts = [
+            {name: column[mask] for name, column in columns.items()} for columns, mask in self._decoded(self.blocks)
+        ]
+        if not parts:
+            return
+        columns = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+        order = np.lexsort((columns["id"], columns[self.sort_by]))
+        if descending:
+            order = order[::-1]
+        for start in range(0, len(order), chunk_size):
+            yield from columns_to_rows(columns, order[start:start + chunk_size], self.system_id)
+
+    def _block_rows(self, descending, after):
+        blocks = self.blocks
+        if after is not None:
+            blocks = blocks.filter(start__lte=after[0]) if descending else blocks.filter(end__gt=after[0])
+        blocks = blocks.order_by("-start" if descending else "start")
+        for columns, mask in self._decoded(blocks, after, backwards=descending):
+            index = np.flatnonzero(mask)
+            yield from columns_to_rows(columns, index[::-1] if descending else index, self.system_id)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError("MeasurementHistory only supports slicing")
+        if self.max_scan_rows is not None and (index.start or 0) > self.max_scan_rows and self.has_blocks:
+            raise ScanLimitExceeded(
+                f"Pages of compressed history start at most {self.max_scan_rows} measurements in. "
+                f"Use pagination=cursor, or narrow the time range."
+            )
+        return list(islice(self.rows(), index.start, index.stop))
+
+    def columns(self, chunk_size=2000):
+        """
+        All the rows as one set of `block_format` columns in `(timestamp, id)` order, for
+        vectorized computations. Hot rows are streamed as tuples in chunks of `chunk_size`.
+        """
+        hot = (
+            self.queryset.order_by("timestamp", "id")
+            .values_list(*Row._fields[:-1])
+            .iterator(chunk_size=chunk_size)
+        )
+        parts = []
+        while chunk := list(islice(hot, chunk_size)):
+            parts.append(rows_to_columns(chunk))
+        if self.has_blocks:
+            parts.extend(
+                {name: column[mask] for name, column in columns.items()}
+                for columns, mask in self._decoded(self.blocks)
+            )
+        if not parts:
+            return rows_to_columns([])
+
+        columns = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+        if self.has_blocks:
+            order = np.lexsort((columns["id"], columns["timestamp"]))
+            columns = {name: values[order] for name, values in columns.items()}
+        return columns
+
+    def aggregate(self, seconds, limit=None):
+        """
+        The rows in `seconds`-wide buckets, as the dicts of `aggregation.aggregate_measurements`,
+        at most `limit` of them. Blocks are decoded in bucket order as the merge with the hot
+        buckets reaches them, so none is decoded once `limit` buckets are complete.
+        """
+        hot = aggregate_measurements(self.queryset, seconds, descending=self.descending)
+        if limit is not None:
+            # each bucket of the result has at most one hot part
+            hot = hot[:limit]
+        if not self.has_blocks:
+            return list(hot)
+
+        merged = heapq.merge(
+            hot.iterator(), self._block_buckets(seconds), key=itemgetter("bucket"), reverse=self.descending,
+        )
+        # parts of the same bucket are adjacent: hot and compressed rows, or blocks of the days of a wide bucket
+        buckets = (reduce(_merge_buckets, parts) for _, parts in groupby(merged, key=itemgetter("bucket")))
+        return list(islice(buckets, limit))
+
+    def _block_buckets(self, seconds):
+        blocks = self.blocks.order_by("-start" if self.descending else "start")
+        for columns, mask in self._decoded(blocks):
+            buckets = _aggregate_columns(columns, mask, seconds)
+            yield from reversed(buckets) if self.descending else buckets
+
+
+def _aggregate_columns(columns, mask, seconds):
+    times = columns["timestamp"][mask]
+    if not len(times):
+        return []
+    width = seconds * 1000000
+    # block rows are in time order, so every bucket is one contiguous run
+    keys = times // width
+    starts = np.flatnonzero(np.r_[True, np.diff(keys) != 0])
+    counts = np.diff(np.r_[starts, len(times)])
+
+    summaries = {
+        "bucket": [EPOCH + MICROSECOND * (key * width) for key in keys[starts].tolist()],
+        "count": counts.tolist(),
+    }
+    for metric in METRICS:
+        values = columns[metric][mask]
+        summaries[f"{metric}_min"] = np.minimum.reduceat(values, starts).tolist()
+        summaries[f"{metric}_max"] = np.maximum.reduceat(values, starts).tolist()
+        summaries[f"{metric}_avg"] = (np.add.reduceat(values.astype(np.float64), starts) / counts).tolist()
+    return [dict(zip(summaries, values)) for values in zip(*summaries.values())]
+
+
+def _merge_buckets(first, second):
+    count = first["count"] + second["count"]
+    merged = {"bucket": first["bucket"], "count": count}
+    for metric in METRICS:
+        merged[f"{metric}_min"] = min(first[f"{metric}_min"], second[f"{metric}_min"])
+        merged[f"{metric}_max"] = max(first[f"{metric}_max"], second[f"{metric}_max"])
+        merged[f"{metric}_avg"] = (
+            first[f"{metric}_avg"] * first["count"] + second[f"{metric}_avg"] * second["count"]
+        ) / count
+    return merged
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from rest_framework.exceptions import ParseError
+
+from .aggregation import METRICS
+from .serializers import MEASUREMENT_VALUES, timestamp_formatter
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MILLISECOND = timedelta(milliseconds=1)
+
+TIMESTAMP_FORMATS = ("iso", "epoch_ms")
+
+# (column, position in the values_list() rows of MEASUREMENT_VALUES); the system is in the URL
+MEASUREMENT_COLUMNS = [
+    (name, MEASUREMENT_VALUES.index(name)) for name in ("id", "sequence", "timestamp", "ph", "temperature", "tds")
+]
+MEASUREMENT_FLOAT_COLUMNS = ("ph", "temperature")
+
+# (column, key in the dicts of aggregate_measurements / aggregate_rollup)
+BUCKET_COLUMNS = [("timestamp", "bucket"), ("count", "count")] + [
+    (f"{metric}_{stat}", f"{metric}_{stat}") for metric in METRICS for stat in ("min", "max", "avg")
+]
+BUCKET_FLOAT_COLUMNS = [
+    f"{metric}_{stat}" for metric in METRICS for stat in ("min", "max", "avg") if metric != "tds" or stat == "avg"
+]
+
+
+def parse_columnar_options(query_params):
+    """`(epoch_ms, float32)` from the `timestamps` and `float32` query parameters of `format=columnar`."""
+    timestamps = query_params.get("timestamps", "iso")
+    if timestamps not in TIMESTAMP_FORMATS:
+        raise ParseError(f"Invalid value for 'timestamps'. Use one of: {', '.join(TIMESTAMP_FORMATS)}.")
+
+    float32 = query_params.get("float32", "false")
+    if float32 not in ("true", "false"):
+        raise ParseError("Invalid value for 'float32'. Use 'true' or 'false'.")
+
+    return timestamps == "epoch_ms", float32 == "true"
+
+
+def to_columns(rows, columns, float_columns=(), epoch_ms=False, float32=False):
+    """
+    Transpose `rows` into `{name: [values]}` for the `(name, position)` pairs of `columns`.
+
+    `rows` are the tuples of `values_list()` or the dicts of `values()`, read straight from the
+    database. `timestamp` is written like `DateTimeField` does, or as integer milliseconds
+    since the Unix epoch with `epoch_ms`. With `float32` the `float_columns` become float32
+    arrays, which `ColumnarJSONRenderer` writes with the shortest digits that round-trip in
+    single precision.
+    """
+    rows = list(rows)
+    result = {}
+    for name, position in columns:
+        values = [row[position] for row in rows]
+        if name == "timestamp":
+            if epoch_ms:
+                values = [(value - EPOCH) // MILLISECOND for value in values]
+            else:
+                to_timestamp = timestamp_formatter()
+                values = [to_timestamp(value) for value in values]
+        elif name in float_columns and float32:
+            values = np.array(values, dtype=np.float32)
+        result[name] = values
+    return result
@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import block_format
+from .blocks import DAY, Row, day_start, rows_to_columns
+from .models import Measurement, MeasurementBlock
+from .rollups import rebuild_rollups
+
+DELETE_BATCH_SIZE = 5000
+
+
+def cold_days():
+    return getattr(settings, 'MEASUREMENT_COMPRESSION', {}).get('COLD_DAYS', 30)
+
+
+def cold_cutoff(days=None, now=None):
+    """Start of the UTC day `days` before `now`; whole days before it are cold."""
+    days = cold_days() if days is None else days
+    return day_start((now or timezone.now()) - timedelta(days=days))
+
+
+def compress_system(system_id, cutoff):
+    """
+    Move the measurements of a system before `cutoff` from `Measurement` into day blocks.
+
+    Days are found with one index seek each and moved one transaction at a time by
+    `compress_day`, so the job can be stopped at any point and rerun. Returns
+    `(rows, blocks, bytes)`: rows moved, blocks written and their total size.
+    """
+    rows = blocks = size = 0
+    day = None
+    while True:
+        hot = Measurement.objects.filter(system_id=system_id, timestamp__lt=cutoff)
+        if day is not None:
+            hot = hot.filter(timestamp__gte=day + DAY)
+        oldest = hot.order_by("timestamp").values_list("timestamp", flat=True).first()
+        if oldest is None:
+            return rows, blocks, size
+        day = day_start(oldest)
+        moved, block_size = compress_day(system_id, day)
+        rows += moved
+        blocks += 1
+        size += block_size
+
+
+def compress_day(system_id, day):
+    """
+    Pack the `Measurement` rows of a system in the UTC day starting at `day` into its block
+    and delete them. Rows that arrived after the day was compressed are merged into the
+    existing block. Returns `(rows moved, block size)`.
+    """
+    end = day + DAY
+    with transaction.atomic():
+        block = MeasurementBlock.objects.select_for_update().filter(system_id=system_id, start=day).first()
+        if block is None:
+            # exact summaries of the day while its rows are still raw; rebuild_rollups skips
+            # blocked days from now on
+            rebuild_rollups([system_id], start=day, end=end)
+
+        hot = list(
+            Measurement.objects.filter(system_id=system_id, timestamp__gte=day, timestamp__lt=end)
+            .order_by("timestamp", "id")
+            .values_list(*Row._fields)
+        )
+        columns = rows_to_columns(hot)
+        if block is not None:
+            existing = block_format.decode(block.data)
+            columns = {name: np.concatenate([existing[name], columns[name]]) for name in columns}
+            order = np.lexsort((columns["id"], columns["timestamp"]))
+            columns = {name: values[order] for name, values in columns.items()}
+
+        data = block_format.encode(columns)
+        MeasurementBlock.objects.update_or_create(
+            system_id=system_id, start=day,
+            defaults={"end": end, "count": len(columns["id"]), "data": data},
+        )
+
+        ids = [row[0] for row in hot]
+        for start in range(0, len(ids), DELETE_BATCH_SIZE):
+            # the time range lets a partitioned table prune to the day's partition
+            Measurement.objects.filter(
+                system_id=system_id, timestamp__gte=day, timestamp__lt=end, id__in=ids[start:start + DELETE_BATCH_SIZE],
+            ).delete()
+
+    return len(hot), len(data)
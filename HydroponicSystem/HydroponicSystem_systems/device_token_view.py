@@ -0,0 +1,104 @@
+from rest_framework import status
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .models import DeviceToken, HydroponicSystem
+from .serializers import DeviceTokenSerializer
+
+
+def _owned_system(request, system_id):
+    try:
+        return HydroponicSystem.objects.get(id=system_id, owner=request.user)
+    except HydroponicSystem.DoesNotExist:
+        raise PermissionDenied("You do not have permission to this system")
+
+
+class DeviceTokenAPIView(APIView):
+
+    def get(self, request, system_id):
+        """
+        List the device tokens of a hydroponic system. Keys are not included; they are only
+        returned when a token is issued.
+
+        ## Example Request:
+        GET /systems/1/device-tokens/
+
+        ## Responses:
+        - **200 OK**: The tokens, oldest first.
+        - **403 Forbidden**: If the user does not have permission to access the system.
+
+        ## Example Response:
+        ```json
+        [
+            {"id": 3, "name": "sensor-north", "created_at": "2025-02-17T11:56:38.938336Z"}
+        ]
+        ```
+        """
+        system = _owned_system(request, system_id)
+        tokens = DeviceToken.objects.filter(system=system).order_by("id")
+        return Response(DeviceTokenSerializer(tokens, many=True).data)
+
+    def post(self, request, system_id):
+        """
+        Issue a device token for a sensor of a hydroponic system.
+
+        A sensor authenticates to the line-protocol ingest server (`manage.py run_ingest_server`)
+        with `AUTH <key>`. The token may only add measurements to this system and does not
+        expire; delete it to revoke it. The key is part of this response only, so store it
+        when the sensor is provisioned.
+
+        ## Request Body:
+        - **name** (string, required): A name for the sensor.
+
+        ## Example Request:
+        POST /systems/1/device-tokens/
+
+        ```json
+        {"name": "sensor-north"}
+        ```
+
+        ## Responses:
+        - **201 Created**: The token with its `key`.
+        - **400 Bad Request**: If the request data is invalid.
+        - **403 Forbidden**: If the user does not have permission to access the system.
+
+        ## Example Response:
+        ```json
+        {
+            "id": 3,
+            "name": "sensor-north",
+            "created_at": "2025-02-17T11:56:38.938336Z",
+            "key": "Vq3Jx0c8nWm2yQ6bHt1r5LkS9dFzA4uE7pGiO0aBcXw"
+        }
+        ```
+        """
+        system = _owned_system(request, system_id)
+        serializer = DeviceTokenSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        token, key = DeviceToken.issue(system, serializer.validated_data["name"])
+        return Response({**DeviceTokenSerializer(token).data, "key": key}, status=status.HTTP_201_CREATED)
+
+
+class DeviceTokenDetailAPIView(APIView):
+
+    def delete(self, request, system_id, token_id):
+        """
+        Revoke a device token. The ingest server stops accepting it once its cached
+        authentication expires (`MEASUREMENT_INGEST['LINE_SERVER_TOKEN_CACHE_SECONDS']`),
+        on open connections as well.
+
+        ## Example Request:
+        DELETE /systems/1/device-tokens/3/
+
+        ## Responses:
+        - **204 No Content**: The token was revoked.
+        - **403 Forbidden**: If the user does not have permission to access the system.
+        - **404 Not Found**: If the system has no such token.
+        """
+        system = _owned_system(request, system_id)
+        deleted, _ = DeviceToken.objects.filter(system=system, id=token_id).delete()
+        if not deleted:
+            return Response({"detail": "Device token not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+
+from .aggregation import METRICS
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: indexes of `threshold` points of the series `(x, y)`
+    that keep its visual shape. `x` must be sorted. The first and last points are always kept.
+    """
+    size = len(x)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = size - 1
+    edges = np.linspace(1, size - 1, threshold - 1).astype(np.int64)
+    previous = 0
+
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # the next bucket is represented by its average point; the last one by the last point
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else size
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+
+        # twice the area of the triangles (previous, candidate, next average)
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+
+    return selected
+
+
+class MinMaxReducer:
+    """
+    Streaming pre-reduction for `lttb`: rows are assigned to `buckets` equal-count buckets by
+    their rank, and only the minimum and maximum point of each metric per bucket is kept.
+
+    Memory use depends on the number of buckets, not on the number of rows, and spikes survive
+    because every bucket's extremes are kept.
+    """
+    def __init__(self, total, buckets, metrics=METRICS):
+        self.total = max(total, 1)
+        self.buckets = max(min(buckets, total), 1)
+        self.rows = 0
+        self.metrics = metrics
+        self.min_value = {metric: np.full(self.buckets, np.inf) for metric in metrics}
+        self.min_time = {metric: np.zeros(self.buckets, dtype=np.int64) for metric in metrics}
+        self.max_value = {metric: np.full(self.buckets, -np.inf) for metric in metrics}
+        self.max_time = {metric: np.zeros(self.buckets, dtype=np.int64) for metric in metrics}
+
+    def update(self, times, columns):
+        """Add a chunk of rows in time order: int64 microsecond `times` and one array per metric."""
+        ranks = np.arange(self.rows, self.rows + len(times))
+        self.rows += len(times)
+        buckets = np.minimum(ranks * self.buckets // self.total, self.buckets - 1)
+        # buckets are contiguous within a time-ordered chunk
+        starts = np.flatnonzero(np.r_[True, np.diff(buckets) != 0])
+        groups = buckets[starts]
+        lengths = np.diff(np.r_[starts, len(buckets)])
+
+        for metric, values in zip(self.metrics, columns):
+            for reduce, best_value, best_time, better in (
+                (np.minimum, self.min_value[metric], self.min_time[metric], np.less),
+                (np.maximum, self.max_value[metric], self.max_time[metric], np.greater),
+            ):
+                extremes = reduce.reduceat(values, starts)
+                # position of the first row of each group that reaches the extreme
+                hits = np.flatnonzero(values == np.repeat(extremes, lengths))
+                _, first = np.unique(np.searchsorted(starts, hits, side="right") - 1, return_index=True)
+                positions = hits[first]
+
+                improved = better(extremes, best_value[groups])
+                best_value[groups[improved]] = extremes[improved]
+                best_time[groups[improved]] = times[positions[improved]]
+
+    def series(self, metric):
+        """Time-ordered `(times, values)` of the kept points of `metric`."""
+        used = np.isfinite(self.min_value[metric])
+        times = np.concatenate([self.min_time[metric][used], self.max_time[metric][used]])
+        values = np.concatenate([self.min_value[metric][used], self.max_value[metric][used]])
+        times, unique = np.unique(times, return_index=True)
+        return times, values[unique]
+
+
+def downsample_measurements(queryset, max_points, chunk_size=10000, oversampling=4):
+    """
+    Reduce the measurements of `queryset` to at most `max_points` points per metric.
+
+    Rows are streamed in time order with `iterator(chunk_size)` through a `MinMaxReducer` of
+    `oversampling * max_points` buckets, then `lttb` picks the final points. Returns
+    `(count, {metric: [(timestamp, value), ...]})`.
+    """
+    rows = queryset.order_by("timestamp", "id").values_list("timestamp", *METRICS).iterator(chunk_size=chunk_size)
+    return downsample_rows(queryset.count(), rows, max_points, chunk_size, oversampling)
+
+
+def downsample_rows(count, rows, max_points, chunk_size=10000, oversampling=4):
+    """`downsample_measurements` for `count` time-ordered `(timestamp, *METRICS)` tuples."""
+    reducer = MinMaxReducer(count, oversampling * max_points)
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            _update(reducer, chunk)
+            chunk = []
+    if chunk:
+        _update(reducer, chunk)
+
+    return count, _select(reducer, max_points)
+
+
+def downsample_series(series, max_points, chunk_size=10000, oversampling=4):
+    """
+    `downsample_measurements` for a memory-mapped `series.Series`, with the same result.
+
+    The columns are fed to the reducer in slices of `chunk_size` rows, so only one slice of
+    each is paged in and converted at a time.
+    """
+    count = len(series)
+    reducer = MinMaxReducer(count, oversampling * max_points)
+    for start in range(0, count, chunk_size):
+        end = start + chunk_size
+        reducer.update(
+            series["timestamp"][start:end],
+            [np.asarray(series[metric][start:end], dtype=np.float64) for metric in METRICS],
+        )
+    return count, _select(reducer, max_points)
+
+
+def _select(reducer, max_points):
+    series = {}
+    for metric in METRICS:
+        times, values = reducer.series(metric)
+        keep = lttb(times.astype(np.float64), values, max_points)
+        series[metric] = [
+            (EPOCH + MICROSECOND * time, value)
+            for time, value in zip(times[keep].tolist(), values[keep].tolist())
+        ]
+    return series
+
+
+def _update(reducer, chunk):
+    times = np.fromiter(((row[0] - EPOCH) // MICROSECOND for row in chunk), dtype=np.int64, count=len(chunk))
+    columns = [
+        np.fromiter((row[index] for row in chunk), dtype=np.float64, count=len(chunk))
+        for index in range(1, len(METRICS) + 1)
+    ]
+    reducer.update(times, columns)
@@ -0,0 +1,117 @@
+import re
+import zlib
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.exceptions import ParseError, PermissionDenied
+from rest_framework.fields import DateTimeField
+from rest_framework.renderers import JSONRenderer
+from rest_framework.views import APIView
+
+from .blocks import MeasurementHistory, ScanLimitExceeded
+from .filters import parse_measurement_filters, parse_measurement_query
+from .models import HydroponicSystem, Measurement
+from .renderers import CSVRenderer, NDJSONRenderer
+
+# same columns, in the same order, as MeasurementSerializer
+EXPORT_COLUMNS = ("id", "sequence", "timestamp", "ph", "temperature", "tds", "system")
+
+accepts_gzip = re.compile(r"\bgzip\b")
+
+
+class MeasurementExportAPIView(APIView):
+    renderer_classes = [CSVRenderer, NDJSONRenderer]
+
+    def get(self, request, system_id):
+        """
+        Export the measurement history of a hydroponic system as one streamed file.
+
+        Rows are read with a server-side cursor in chunks of `MEASUREMENT_QUERY['EXPORT_CHUNK_SIZE']`
+        and written to the response as they arrive, so memory use does not depend on the number of
+        rows and the header is sent before the query finishes.
+
+        ## URL Parameter:
+        - **system_id** (integer, required): The ID of the hydroponic system.
+
+        ## Query Parameters:
+        - **format** (string, default: `csv`): `csv` or `ndjson`. An `Accept: text/csv` or
+          `Accept: application/x-ndjson` header works as well.
+        - The filters and sorting of `GET /systems/<id>/measurements/` (`ph_min`, `timestamp_after`,
+          `sort_order`, ...).
+
+        With `Accept-Encoding: gzip` the stream is gzip-compressed (`Content-Encoding: gzip`).
+
+        ## Example Request:
+        GET /systems/1/measurements/export/?format=csv&timestamp_after=2025-01-01
+
+        ## Responses:
+        - **200 OK**: The measurements as an attachment, columns `id, sequence, timestamp, ph, temperature, tds, system`.
+        - **400 Bad Request**: If a query parameter is incorrectly formatted.
+        - **403 Forbidden**: If the user does not have permission to access the system.
+
+        ## Example Response (CSV):
+        ```
+        id,sequence,timestamp,ph,temperature,tds,system
+        11,,2025-02-17T11:56:38.938336Z,6.4,24.5,500,5
+        12,,2025-02-17T12:00:00Z,6.8,25.0,480,5
+        ```
+        """
+        try:
+            system = HydroponicSystem.objects.get(id=system_id, owner=request.user)
+        except HydroponicSystem.DoesNotExist:
+            raise PermissionDenied("You do not have permission to this system")
+
+        filters, ordering, descending = parse_measurement_query(request.query_params)
+        query_settings = getattr(settings, 'MEASUREMENT_QUERY', {})
+        chunk_size = query_settings.get('EXPORT_CHUNK_SIZE', 2000)
+        history = MeasurementHistory(
+            system.id, parse_measurement_filters(request.query_params), descending, ordering[0].lstrip("-"),
+            max_scan_rows=query_settings.get('BLOCK_SCAN_MAX_ROWS', 100000),
+        )
+        if history.has_blocks:
+            try:
+                rows = history.rows(chunk_size=chunk_size)
+            except ScanLimitExceeded as e:
+                raise ParseError(str(e))
+        else:
+            rows = (
+                Measurement.objects.filter(filters, system=system)
+                .order_by(*ordering)
+                .values_list("id", "sequence", "timestamp", "ph", "temperature", "tds", "system_id")
+                .iterator(chunk_size=chunk_size)
+            )
+
+        renderer = request.accepted_renderer
+        body = renderer.stream(EXPORT_COLUMNS, _format_rows(rows), chunk_size=chunk_size)
+
+        use_gzip = bool(accepts_gzip.search(request.META.get("HTTP_ACCEPT_ENCODING", "")))
+        if use_gzip:
+            body = _gzip(body)
+
+        response = StreamingHttpResponse(body, content_type=f"{renderer.media_type}; charset={renderer.charset}")
+        response["Content-Disposition"] = f'attachment; filename="system-{system.id}-measurements.{renderer.format}"'
+        if use_gzip:
+            response["Content-Encoding"] = "gzip"
+        patch_vary_headers(response, ("Accept", "Accept-Encoding"))
+        return response
+
+    def handle_exception(self, exc):
+        # errors are answered as JSON, not in the export format
+        self.request.accepted_renderer = JSONRenderer()
+        self.request.accepted_media_type = JSONRenderer.media_type
+        return super().handle_exception(exc)
+
+
+def _format_rows(rows):
+    timestamp_field = DateTimeField()
+    for pk, sequence, timestamp, ph, temperature, tds, system_id in rows:
+        yield pk, sequence, timestamp_field.to_representation(timestamp), ph, temperature, tds, system_id
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        # flushed per chunk so that clients see rows as they are read, not when zlib's buffer fills
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
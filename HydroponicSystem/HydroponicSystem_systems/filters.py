@@ -0,0 +1,83 @@
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import Q
+from rest_framework.exceptions import ParseError
+
+
+def parse_number(value):
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(value)
+    return number
+
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=dt_timezone.utc)
+
+
+INVALID_NUMBER = "Invalid value for '{param}'. Expected a number."
+INVALID_DATE = "Invalid timestamp format. Expected format: YYYY-MM-DD."
+
+# query parameter -> (lookup, parser, error message)
+MEASUREMENT_FILTERS = {
+    "ph_min": ("ph__gte", parse_number, INVALID_NUMBER),
+    "ph_max": ("ph__lte", parse_number, INVALID_NUMBER),
+    "temperature_min": ("temperature__gte", parse_number, INVALID_NUMBER),
+    "temperature_max": ("temperature__lte", parse_number, INVALID_NUMBER),
+    "tds_min": ("tds__gte", parse_number, INVALID_NUMBER),
+    "tds_max": ("tds__lte", parse_number, INVALID_NUMBER),
+    "timestamp_after": ("timestamp__gte", parse_date, INVALID_DATE),
+    "timestamp_before": ("timestamp__lte", parse_date, INVALID_DATE),
+}
+
+# sort_by value -> ORDER BY columns, with id as the tie breaker. Every order is read from a
+# `(system, <column>, id)` index without a sort step; cursor pagination only supports timestamp.
+MEASUREMENT_SORTS = {
+    "timestamp": ("timestamp", "id"),
+    "ph": ("ph", "id"),
+    "temperature": ("temperature", "id"),
+    "tds": ("tds", "id"),
+}
+
+
+def parse_measurement_filters(query_params):
+    """Return the given filters as `{lookup: parsed value}`. Raises `ParseError` for invalid values."""
+    lookups = {}
+    for param, (lookup, parse, message) in MEASUREMENT_FILTERS.items():
+        value = query_params.get(param)
+        if not value:
+            continue
+        try:
+            lookups[lookup] = parse(value)
+        except ValueError:
+            raise ParseError(message.format(param=param))
+    return lookups
+
+
+def parse_measurement_query(query_params):
+    """
+    Parse the filtering and sorting parameters of a measurement list request.
+
+    Returns `(filters, ordering, descending)`: a `Q` of the given filters, the `order_by`
+    arguments and whether the order is descending. Raises `ParseError` for a value of the
+    wrong type or an unknown sort order.
+    """
+    filters = Q(**parse_measurement_filters(query_params))
+
+    sort_by = query_params.get("sort_by", "timestamp")
+    sort_order = query_params.get("sort_order", "asc")
+
+    if sort_by not in MEASUREMENT_SORTS:
+        raise ParseError(
+            f"Invalid value for 'sort_by'. Sorting is supported by: {', '.join(MEASUREMENT_SORTS)}."
+        )
+    if sort_order not in ["asc", "desc"]:
+        raise ParseError("Invalid value for 'sort_order'. Use 'asc' or 'desc'.")
+
+    descending = sort_order == "desc"
+    ordering = MEASUREMENT_SORTS[sort_by]
+    if descending:
+        ordering = tuple(f"-{field}" for field in ordering)
+
+    return filters, ordering, descending
@@ -0,0 +1,143 @@
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from django.conf import settings
+from .models import HydroponicSystem, Measurement
+from .serializers import MeasurementSerializer
+from .writes import save_measurements
+
+class GatewayMeasurementAPIView(APIView):
+
+    def post(self, request):
+        """
+        Add measurements for many hydroponic systems in a single request.
+
+        Ownership of all listed systems is checked with one query and every accepted
+        measurement is written with a single bulk insert.
+
+        ## Query Parameters (Optional):
+        - **mode** (string, default: `atomic`): `atomic` rejects all measurements of a system if any of them
+          is invalid, `best_effort` saves the valid ones and reports the invalid ones.
+
+        ## Request Body:
+        A list of objects with:
+        - **system** (integer, required): The ID of the hydroponic system.
+        - **measurements** (list, required): Measurements in the same format as `POST /systems/<id>/measurements/`.
+          Measurements whose `sequence` was already stored for the system are skipped and listed in `duplicates`.
+
+        ## Example Request:
+        POST /gateway/measurements/
+
+        ```json
+        [
+            {"system": 1, "measurements": [{"ph": 6.5, "temperature": 22.5, "tds": 900}]},
+            {"system": 2, "measurements": [{"ph": 6.1, "temperature": 21.0, "tds": 850}]}
+        ]
+        ```
+
+        ## Responses:
+        - **201 Created**: The request was processed, see the per-system results.
+        - **400 Bad Request**: If the request body is malformed.
+
+        ## Example Response:
+        ```json
+        {
+            "created": 1,
+            "results": [
+                {"system": 1, "created": 1, "duplicates": [], "rejected": 0, "errors": []},
+                {"system": 2, "created": 0, "detail": "You do not have permission to add measurements in this system."}
+            ]
+        }
+        ```
+        """
+        mode = request.query_params.get("mode", "atomic")
+
+        if mode not in ["atomic", "best_effort"]:
+            return Response(
+                {"detail": "Invalid value for 'mode'. Use 'atomic' or 'best_effort'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        groups = request.data
+        if not isinstance(groups, list) or not all(
+            isinstance(group, dict)
+            # bool is an int subclass, but `true` is not a system id
+            and type(group.get("system")) is int
+            and isinstance(group.get("measurements"), list)
+            for group in groups
+        ):
+            return Response(
+                {"detail": "Expected a list of objects with an integer 'system' and a list of 'measurements'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        ingest_settings = getattr(settings, 'MEASUREMENT_INGEST', {})
+        max_rows = ingest_settings.get('GATEWAY_MAX_ROWS', 10000)
+        if sum(len(group["measurements"]) for group in groups) > max_rows:
+            return Response(
+                {"detail": f"Too many measurements. At most {max_rows} are allowed per request."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        owned_ids = set(
+            HydroponicSystem.objects.filter(
+                id__in={group["system"] for group in groups}, owner=request.user
+            ).values_list("id", flat=True)
+        )
+
+        results = []
+        pending = []
+
+        for group in groups:
+            system_id = group["system"]
+
+            if system_id not in owned_ids:
+                results.append({
+                    "system": system_id,
+                    "created": 0,
+                    "detail": "You do not have permission to add measurements in this system.",
+                })
+                continue
+
+            serializer = MeasurementSerializer(
+                data=group["measurements"],
+                many=True,
+                context={"best_effort": mode == "best_effort"},
+            )
+
+            if not serializer.is_valid():
+                errors = serializer.errors
+                if isinstance(errors, list):
+                    errors = [
+                        {"index": index, "errors": row_errors}
+                        for index, row_errors in enumerate(errors) if row_errors
+                    ]
+                results.append({
+                    "system": system_id,
+                    "created": 0,
+                    "rejected": len(group["measurements"]),
+                    "errors": errors,
+                })
+                continue
+
+            result = {
+                "system": system_id,
+                "created": 0,
+                "duplicates": [],
+                "rejected": len(serializer.rejected),
+                "errors": serializer.rejected,
+            }
+            measurements = [Measurement(system_id=system_id, **attrs) for attrs in serializer.validated_data]
+            pending.append((result, measurements))
+            results.append(result)
+
+        duplicates = save_measurements([measurement for _, measurements in pending for measurement in measurements])
+        duplicate_ids = {id(measurement) for measurement in duplicates}
+        created = 0
+
+        for result, measurements in pending:
+            result["duplicates"] = [m.sequence for m in measurements if id(m) in duplicate_ids]
+            result["created"] = len(measurements) - len(result["duplicates"])
+            created += result["created"]
+
+        return Response({"created": created, "results": results}, status=status.HTTP_201_CREATED)
@@ -0,0 +1,176 @@
+import atexit
+import json
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import Measurement
+from .validation import validate_rows, iter_validated
+from .writes import save_measurements
+
+logger = logging.getLogger(__name__)
+
+
+def ingest_ndjson(stream, system, chunk_size=500, max_line_bytes=65536):
+    """
+    Read newline-delimited JSON measurements from `stream` and store them for `system`.
+
+    The stream is consumed line by line; every `chunk_size` parsed lines are validated
+    together with `validate_rows` and flushed with `save_measurements`, so memory use does
+    not grow with the size of the upload. Invalid lines are skipped and counted; the first
+    one is reported with its line number.
+    """
+    summary = {"accepted": 0, "duplicates": 0, "rejected": 0, "first_error": None}
+    pending = []
+
+    lines = iter(lambda: stream.readline(max_line_bytes + 1), b"") if stream is not None else ()
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+
+        if len(line) > max_line_bytes:
+            _reject_line(summary, line_number, {"non_field_errors": [f"Line exceeds {max_line_bytes} bytes."]})
+            # drain the rest of the oversized line
+            while line and not line.endswith(b"\n"):
+                line = stream.readline(max_line_bytes + 1)
+            continue
+
+        try:
+            pending.append((line_number, json.loads(line)))
+        except ValueError:
+            _reject_line(summary, line_number, {"non_field_errors": ["Invalid JSON."]})
+            continue
+
+        if len(pending) >= chunk_size:
+            _flush_ndjson_chunk(pending, system, summary)
+            pending = []
+
+    if pending:
+        _flush_ndjson_chunk(pending, system, summary)
+
+    return summary
+
+
+def _reject_line(summary, line_number, errors):
+    summary["rejected"] += 1
+    if summary["first_error"] is None or line_number < summary["first_error"]["line"]:
+        summary["first_error"] = {"line": line_number, "errors": errors}
+
+
+def _flush_ndjson_chunk(pending, system, summary):
+    columns, nulls, errors = validate_rows([data for _, data in pending])
+
+    for index, row_errors in errors.items():
+        _reject_line(summary, pending[index][0], row_errors)
+
+    measurements = [Measurement(system=system, **attrs) for _, attrs in iter_validated(columns, nulls, errors)]
+    duplicates = len(save_measurements(measurements))
+    summary["accepted"] += len(measurements) - duplicates
+    summary["duplicates"] += duplicates
+
+
+class WriteBehindBuffer:
+    """
+    Bounded in-process queue of unsaved measurements flushed with `save_measurements`.
+
+    A background thread flushes the queue when it holds `flush_rows` rows or every
+    `flush_interval` seconds, whichever comes first. When the queue is full new rows
+    are refused and counted in `dropped`; rows of a failed flush are counted there too.
+    """
+    def __init__(self, max_rows=10000, flush_rows=500, flush_interval=1.0):
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.flushed = 0
+        self._queue = queue.Queue(maxsize=max_rows)
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="measurement-write-behind", daemon=True)
+        self._thread.start()
+
+    def put(self, measurement):
+        try:
+            self._queue.put_nowait(measurement)
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+        if self._queue.qsize() >= self.flush_rows:
+            self._wakeup.set()
+        return True
+
+    def flush(self):
+        with self._flush_lock:
+            while True:
+                rows = []
+                while len(rows) < self.flush_rows:
+                    try:
+                        rows.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not rows:
+                    return
+
+                try:
+                    save_measurements(rows)
+                except Exception:
+                    self.dropped += len(rows)
+                    logger.exception("Write-behind flush of %d measurements failed", len(rows))
+                else:
+                    self.flushed += len(rows)
+
+    def shutdown(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+
+    def stats(self):
+        return {"queue_depth": self._queue.qsize(), "dropped": self.dropped, "flushed": self.flushed}
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+
+_write_behind_buffer = None
+_write_behind_lock = threading.Lock()
+
+
+def get_write_behind_buffer():
+    """Return the process-wide write-behind buffer, starting it on first use."""
+    global _write_behind_buffer
+
+    with _write_behind_lock:
+        if _write_behind_buffer is None:
+            ingest_settings = getattr(settings, 'MEASUREMENT_INGEST', {})
+            _write_behind_buffer = WriteBehindBuffer(
+                max_rows=ingest_settings.get('WRITE_BEHIND_MAX_ROWS', 10000),
+                flush_rows=ingest_settings.get('WRITE_BEHIND_FLUSH_ROWS', 500),
+                flush_interval=ingest_settings.get('WRITE_BEHIND_FLUSH_INTERVAL', 1.0),
+            )
+            _write_behind_buffer.start()
+        return _write_behind_buffer
+
+
+@atexit.register
+def shutdown_write_behind_buffer():
+    """Flush pending measurements and stop the flusher thread. Registered to run at interpreter exit."""
+    global _write_behind_buffer
+
+    with _write_behind_lock:
+        buffer, _write_behind_buffer = _write_behind_buffer, None
+    if buffer is not None:
+        buffer.shutdown()
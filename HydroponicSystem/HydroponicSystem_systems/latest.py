@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .blocks import MeasurementHistory
+from .models import Measurement
+
+FIELDS = [field.attname for field in Measurement._meta.concrete_fields]
+ID = FIELDS.index("id")
+TIMESTAMP = FIELDS.index("timestamp")
+
+HITS_KEY = "measurements:latest:hits"
+MISSES_KEY = "measurements:latest:misses"
+
+
+def _cache():
+    return caches[getattr(settings, 'MEASUREMENT_QUERY', {}).get('LATEST_CACHE', 'default')]
+
+
+def _count():
+    return getattr(settings, 'MEASUREMENT_QUERY', {}).get('LATEST_COUNT', 10)
+
+
+def _key(system_id):
+    return f"measurements:latest:{system_id}"
+
+
+def _row(measurement):
+    return tuple(getattr(measurement, field) for field in FIELDS)
+
+
+def _newest(rows, count):
+    return sorted(rows, key=lambda row: (row[TIMESTAMP], row[ID]), reverse=True)[:count]
+
+
+def _incr(key):
+    cache = _cache()
+    cache.add(key, 0, timeout=None)
+    cache.incr(key)
+
+
+def get_latest_measurements(system_id):
+    """
+    The newest `MEASUREMENT_QUERY['LATEST_COUNT']` measurements of a system, newest first.
+
+    Served from the cache when the system has an entry; otherwise read from the database
+    once and cached without expiry, since `remember_measurements` keeps entries current.
+    The returned instances are built from cached values and must not be saved.
+    """
+    cache = _cache()
+    rows = cache.get(_key(system_id))
+
+    if rows is None:
+        _incr(MISSES_KEY)
+        rows = list(
+            Measurement.objects.filter(system_id=system_id)
+            .order_by("-timestamp", "-id")
+            .values_list(*FIELDS)[:_count()]
+        )
+        if len(rows) < _count():
+            # older measurements may have been moved into compressed blocks
+            history = MeasurementHistory(system_id, descending=True)
+            if history.has_blocks:
+                rows = [tuple(getattr(row, field) for field in FIELDS) for row in history[:_count()]]
+        # add, not set: a write committed meanwhile may already have stored a newer entry
+        cache.add(_key(system_id), rows, timeout=None)
+    else:
+        _incr(HITS_KEY)
+
+    return [Measurement(*row) for row in rows]
+
+
+def remember_measurements(measurements):
+    """
+    Merge saved `measurements` into the cached entries of their systems once the current
+    transaction commits.
+
+    Systems without an entry are left alone; their next read fills it. The merge is a
+    read-modify-write of one key per system, so with a shared cache concurrent writers
+    to the same system can drop each other's rows until `forget_latest_measurements`.
+    """
+    by_system = {}
+    for measurement in measurements:
+        by_system.setdefault(measurement.system_id, []).append(_row(measurement))
+
+    def merge():
+        cache = _cache()
+        count = _count()
+        for system_id, rows in by_system.items():
+            cached = cache.get(_key(system_id))
+            if any(row[ID] is None for row in rows):
+                # the backend did not return primary keys from the bulk insert
+                cache.delete(_key(system_id))
+            elif cached is not None:
+                cache.set(_key(system_id), _newest(cached + _newest(rows, count), count), timeout=None)
+
+    if by_system:
+        transaction.on_commit(merge)
+
+
+def forget_latest_measurements(system_ids):
+    """Drop the cached entries of `system_ids`, for writes that bypass `save_measurements`."""
+    keys = [_key(system_id) for system_id in system_ids]
+    transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def cache_stats():
+    """Hit and miss counters of `get_latest_measurements`."""
+    counters = _cache().get_many([HITS_KEY, MISSES_KEY])
+    return {"hits": counters.get(HITS_KEY, 0), "misses": counters.get(MISSES_KEY, 0)}
@@ -0,0 +1,458 @@
+"""
+Line-protocol ingest server for sensors that cannot afford an HTTP request per reading.
+
+One command or reading per line, UTF-8, terminated by a newline:
+
+    AUTH <device token>                                     first line of every connection
+    system=12 ph=6.4,temperature=22.1,tds=820 1700000000    a reading; the timestamp is optional
+    FLUSH                                                   wait until this connection's readings are written
+
+`AUTH` takes the key of a device token, issued by `POST /systems/<id>/device-tokens/`, and
+is answered with `OK`; a connection may only write to that token's system. Device tokens do
+not expire and are revoked by deleting them. The server caches each token's system for
+`token_cache_seconds` and checks it again for every reading, so a revoked token stops
+working within that time, also on open connections. `FLUSH` is answered with
+`OK <accepted> <duplicates> <rejected>` for the connection so far. Rejected lines are
+reported as `ERR <line number> <reason>`.
+
+Over UDP, when the server is given a UDP port, every datagram is authenticated on its own:
+its first line is `AUTH <device token>` and the rest are readings. Datagrams are not
+encrypted, which is why they carry a key limited to one system rather than a login token. Nothing is answered, and since
+UDP has no flow control, readings that find the write queue full are dropped and counted.
+Sensors that need to know what was stored should use TCP, or send a `sequence` and retry.
+
+Fields are `ph`, `temperature`, `tds` and optionally `sequence` (see idempotent uploads).
+Integer values may carry the `i` suffix written by InfluxDB clients. Timestamps are
+seconds since the epoch unless the server runs with another precision; readings
+without one are stamped when they are received.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import DeviceToken, Measurement
+from .validation import format_errors, validate_columns
+from .writes import save_measurements
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = {"s": 1, "ms": 10 ** 3, "us": 10 ** 6, "ns": 10 ** 9}
+FIELDS = {"ph": float, "temperature": float, "tds": int, "sequence": int}
+REQUIRED_FIELDS = ("ph", "temperature", "tds")
+INT64_RANGE = range(-2 ** 63, 2 ** 63)
+# cached token lookups, valid or not, kept before the cache is cleared
+MAX_CACHED_TOKENS = 10000
+
+
+class LineProtocolError(ValueError):
+    pass
+
+
+def _pairs(text):
+    for pair in text.split(","):
+        key, separator, value = pair.partition("=")
+        if not separator or not key or not value:
+            raise LineProtocolError(f"Expected key=value, got {pair!r}.")
+        yield key, value
+
+
+def _parse_field(name, value):
+    try:
+        if FIELDS[name] is float:
+            return float(value)
+        number = int(value[:-1] if value.endswith("i") else value)
+    except ValueError:
+        raise LineProtocolError(f"Invalid value for {name}: {value!r}.")
+    if number not in INT64_RANGE:
+        raise LineProtocolError(f"Value for {name} is out of range.")
+    return number
+
+
+def parse_line(line, precision="s"):
+    """
+    Parse `system=<id> <field>=<value>,... [timestamp]` into `(system_id, reading, timestamp)`.
+
+    `reading` maps field names to numbers, `timestamp` is an aware datetime or `None`.
+    Only the syntax is checked here; value ranges are checked in batches by the server.
+    """
+    parts = line.split()
+    if len(parts) not in (2, 3):
+        raise LineProtocolError("Expected 'system=<id> <field>=<value>,... [timestamp]'.")
+
+    tags = dict(_pairs(parts[0]))
+    if set(tags) != {"system"} or not tags["system"].isdigit():
+        raise LineProtocolError("Expected a single 'system=<id>' tag.")
+
+    reading = {}
+    for name, value in _pairs(parts[1]):
+        if name not in FIELDS:
+            raise LineProtocolError(f"Unknown field {name!r}.")
+        reading[name] = _parse_field(name, value)
+
+    missing = [name for name in REQUIRED_FIELDS if name not in reading]
+    if missing:
+        raise LineProtocolError(f"Missing field(s): {', '.join(missing)}.")
+
+    timestamp = None
+    if len(parts) == 3:
+        try:
+            timestamp = datetime.fromtimestamp(int(parts[2]) / PRECISIONS[precision], tz=dt_timezone.utc)
+        except (ValueError, OverflowError, OSError):
+            raise LineProtocolError(f"Invalid timestamp {parts[2]!r}.")
+
+    return int(tags["system"]), reading, timestamp
+
+
+class Connection:
+    """State and statistics of one client connection."""
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.peer = writer.get_extra_info("peername")
+        self.token = None
+        self.lines = 0
+        self.bytes = 0
+        self.accepted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.pending = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.started = time.monotonic()
+
+    def send(self, message):
+        if not self.writer.is_closing():
+            self.writer.write(message.encode() + b"\n")
+
+    def reject(self, line_number, reason):
+        self.rejected += 1
+        self.send(f"ERR {line_number} {reason}")
+
+    def stop_reading(self):
+        """Stop receiving; lines already buffered are still processed."""
+        if not self.writer.is_closing():
+            self.writer.transport.pause_reading()
+            self.reader.feed_eof()
+
+    def stats(self):
+        return {
+            "lines": self.lines,
+            "bytes": self.bytes,
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "seconds": time.monotonic() - self.started,
+        }
+
+
+class Datagrams:
+    """Statistics of the UDP endpoint, shared by all datagrams; rejections are counted, not answered."""
+    def __init__(self):
+        self.datagrams = 0
+        self.unauthenticated = 0
+        self.lines = 0
+        self.bytes = 0
+        self.accepted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.pending = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.started = time.monotonic()
+
+    def reject(self, line_number, reason):
+        self.rejected += 1
+
+    def stats(self):
+        return {
+            "datagrams": self.datagrams,
+            "unauthenticated": self.unauthenticated,
+            "lines": self.lines,
+            "bytes": self.bytes,
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            "seconds": time.monotonic() - self.started,
+        }
+
+
+class DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        task = asyncio.ensure_future(self.server._handle_datagram(data))
+        self.server._handlers.add(task)
+        task.add_done_callback(self.server._handlers.discard)
+
+
+class IngestServer:
+    """
+    Asyncio TCP server for the line protocol, with an optional UDP endpoint (`udp_port`).
+
+    Connections parse lines and put readings on a bounded queue. When the queue is full
+    they stop reading, so backpressure reaches the sensors through TCP flow control;
+    datagrams cannot wait and are dropped instead.
+    A single writer task takes up to `batch_size` readings at a time, checks them with
+    `validate_columns` and stores them with `save_measurements` in a worker thread.
+    """
+    def __init__(self, host="127.0.0.1", port=8094, queue_size=10000, batch_size=500,
+                 max_line_bytes=4096, auth_timeout=10.0, precision="s", udp_port=None,
+                 token_cache_seconds=60.0):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision {precision!r}.")
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.max_line_bytes = max_line_bytes
+        self.auth_timeout = auth_timeout
+        self.precision = precision
+        self.udp_port = udp_port
+        self.token_cache_seconds = token_cache_seconds
+        self.connections = set()
+        self.datagrams = Datagrams()
+        self._handlers = set()
+        self._tokens = {}
+        self._queue = None
+        self._server = None
+        self._udp_transport = None
+        self._writer_task = None
+
+    async def start(self):
+        self._queue = asyncio.Queue(self.queue_size)
+        self._writer_task = asyncio.create_task(self._write_loop())
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=self.max_line_bytes)
+        # port 0 binds to a free port
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.udp_port is not None:
+            self._udp_transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+                lambda: DatagramProtocol(self), local_addr=(self.host, self.udp_port),
+            )
+            self.udp_port = self._udp_transport.get_extra_info("sockname")[1]
+
+    async def shutdown(self):
+        """Stop accepting connections, write every reading already received and close."""
+        self._server.close()
+        if self._udp_transport is not None:
+            self._udp_transport.close()
+        for connection in list(self.connections):
+            connection.stop_reading()
+        if self._handlers:
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._queue.join()
+
+        self._writer_task.cancel()
+        try:
+            await self._writer_task
+        except asyncio.CancelledError:
+            pass
+        await self._server.wait_closed()
+        if self._udp_transport is not None:
+            logger.info(
+                "Line protocol UDP endpoint closed: %s",
+                ", ".join(f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}"
+                          for key, value in self.datagrams.stats().items()),
+            )
+
+    async def _handle(self, reader, writer):
+        connection = Connection(reader, writer)
+        self.connections.add(connection)
+        self._handlers.add(asyncio.current_task())
+
+        try:
+            if await self._authenticate(connection):
+                await self._read_lines(connection)
+                await connection.idle.wait()
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections.discard(connection)
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+            if connection.token is not None:
+                logger.info(
+                    "Line protocol connection %s closed: %s", connection.peer,
+                    ", ".join(f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}"
+                              for key, value in connection.stats().items()),
+                )
+
+    async def _authenticate(self, connection):
+        try:
+            line = await asyncio.wait_for(connection.reader.readline(), self.auth_timeout)
+        except (asyncio.TimeoutError, ValueError):
+            connection.send("ERR 1 Expected 'AUTH <token>'.")
+            return False
+
+        connection.lines = 1
+        command, _, token = line.decode("utf-8", "replace").strip().partition(" ")
+        token = token.strip()
+        if command != "AUTH" or not token or await self._token_system(token) is None:
+            connection.send("ERR 1 Authentication failed.")
+            await connection.writer.drain()
+            return False
+
+        connection.token = token
+        connection.send("OK")
+        return True
+
+    async def _token_system(self, token):
+        """The system a device token may write to, or `None`; looked up at most once per `token_cache_seconds`."""
+        now = time.monotonic()
+        cached = self._tokens.get(token)
+        if cached is None or cached[1] <= now:
+            if len(self._tokens) >= MAX_CACHED_TOKENS:
+                # bounds the memory that datagrams with made-up tokens can take
+                self._tokens.clear()
+            system_id = await sync_to_async(self._lookup_token)(token)
+            cached = self._tokens[token] = (system_id, now + self.token_cache_seconds)
+        return cached[0]
+
+    def _lookup_token(self, token):
+        close_old_connections()
+        return DeviceToken.objects.filter(key_hash=DeviceToken.hash_key(token)).values_list(
+            "system_id", flat=True,
+        ).first()
+
+    async def _handle_datagram(self, data):
+        datagrams = self.datagrams
+        datagrams.datagrams += 1
+        datagrams.bytes += len(data)
+        lines = data.decode("utf-8", "replace").splitlines()
+        datagrams.lines += len(lines)
+
+        command, _, token = (lines[0].strip() if lines else "").partition(" ")
+        token = token.strip()
+        token_system_id = None
+        if command == "AUTH" and token:
+            token_system_id = await self._token_system(token)
+        if token_system_id is None:
+            datagrams.unauthenticated += 1
+            return
+
+        for line_number, line in enumerate(lines[1:], 2):
+            text = line.strip()
+            if not text:
+                continue
+            if len(line.encode()) > self.max_line_bytes:
+                datagrams.reject(line_number, f"Line is longer than {self.max_line_bytes} bytes.")
+                continue
+            try:
+                system_id, reading, timestamp = parse_line(text, self.precision)
+            except LineProtocolError as e:
+                datagrams.reject(line_number, str(e))
+                continue
+            if system_id != token_system_id:
+                datagrams.reject(line_number, "You do not have permission to add measurements in this system.")
+                continue
+            try:
+                self._queue.put_nowait((datagrams, line_number, system_id, reading, timestamp or timezone.now()))
+            except asyncio.QueueFull:
+                datagrams.dropped += 1
+                continue
+            datagrams.pending += 1
+            datagrams.idle.clear()
+
+    async def _read_lines(self, connection):
+        while True:
+            try:
+                line = await connection.reader.readline()
+            except ValueError:
+                connection.reject(connection.lines + 1, f"Line is longer than {self.max_line_bytes} bytes.")
+                return
+            if not line:
+                return
+
+            connection.lines += 1
+            connection.bytes += len(line)
+            text = line.decode("utf-8", "replace").strip()
+            if not text:
+                continue
+
+            if text == "FLUSH":
+                await connection.idle.wait()
+                connection.send(f"OK {connection.accepted} {connection.duplicates} {connection.rejected}")
+                await connection.writer.drain()
+                continue
+
+            try:
+                system_id, reading, timestamp = parse_line(text, self.precision)
+            except LineProtocolError as e:
+                connection.reject(connection.lines, str(e))
+                await connection.writer.drain()
+                continue
+
+            # checked per reading, so that revoking the token also ends open connections' writes
+            token_system_id = await self._token_system(connection.token)
+            if token_system_id is None:
+                connection.reject(connection.lines, "Authentication failed.")
+                await connection.writer.drain()
+                return
+            if system_id != token_system_id:
+                connection.reject(connection.lines, "You do not have permission to add measurements in this system.")
+                await connection.writer.drain()
+                continue
+
+            connection.pending += 1
+            connection.idle.clear()
+            await self._queue.put((connection, connection.lines, system_id, reading, timestamp or timezone.now()))
+
+    async def _write_loop(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            try:
+                rejected, duplicates = await sync_to_async(self._write_batch)(batch)
+            except Exception:
+                logger.exception("Line protocol write of %d measurements failed", len(batch))
+                rejected = {index: "Write failed." for index in range(len(batch))}
+                duplicates = set()
+
+            for index, (connection, line_number, *_) in enumerate(batch):
+                if index in rejected:
+                    connection.reject(line_number, rejected[index])
+                elif index in duplicates:
+                    connection.duplicates += 1
+                else:
+                    connection.accepted += 1
+                connection.pending -= 1
+                if not connection.pending:
+                    connection.idle.set()
+                self._queue.task_done()
+
+    def _write_batch(self, batch):
+        """Validate and store a batch; return rejected reasons and duplicate indexes by batch index."""
+        close_old_connections()
+        readings = [reading for _, _, _, reading, _ in batch]
+        columns = {
+            "ph": np.array([reading["ph"] for reading in readings], dtype=np.float64),
+            "temperature": np.array([reading["temperature"] for reading in readings], dtype=np.float64),
+            "tds": np.array([reading["tds"] for reading in readings], dtype=np.int64),
+            "sequence": np.array([reading.get("sequence", 0) for reading in readings], dtype=np.int64),
+        }
+        errors = validate_columns(columns)
+
+        measurements = {
+            index: Measurement.from_reading(system_id=system_id, timestamp=timestamp, **reading)
+            for index, (_, _, system_id, reading, timestamp) in enumerate(batch)
+            if index not in errors
+        }
+        skipped = {id(measurement) for measurement in save_measurements(list(measurements.values()))}
+
+        rejected = {index: format_errors(row_errors) for index, row_errors in errors.items()}
+        duplicates = {index for index, measurement in measurements.items() if id(measurement) in skipped}
+        return rejected, duplicates
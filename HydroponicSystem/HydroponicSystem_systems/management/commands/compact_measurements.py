@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from HydroponicSystem_systems import retention
+from HydroponicSystem_systems.models import HydroponicSystem, Measurement
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete raw measurements older than each system's retention (raw_retention_days, or "
+        "MEASUREMENT_RETENTION['RAW_DAYS']) after folding them into the hourly and daily rollups. "
+        "Deletes in small batches and can be stopped and rerun at any time; run one instance at a time, e.g. daily."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--system", type=int, action="append", dest="systems",
+            help="Only compact this system. Can be given more than once; all systems by default.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int,
+            help="Rows deleted per statement and transaction (default: MEASUREMENT_RETENTION['BATCH_SIZE']).",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only count the rows that would be deleted.")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] is not None and options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        systems = HydroponicSystem.objects.order_by("id")
+        if options["systems"]:
+            systems = systems.filter(id__in=options["systems"])
+            missing = set(options["systems"]) - {system.id for system in systems}
+            if missing:
+                raise CommandError(f"Unknown system IDs: {', '.join(map(str, sorted(missing)))}")
+
+        started = time.monotonic()
+        now = timezone.now()
+        total_rows, total_bytes = 0, 0
+        for system in systems:
+            cutoff = retention.retention_cutoff(system, now)
+            if options["dry_run"]:
+                if cutoff is not None:
+                    rows = Measurement.objects.filter(system=system, timestamp__lt=cutoff).count()
+                    self.stdout.write(f"System {system.id}: {rows} rows before {cutoff:%Y-%m-%d}")
+                    total_rows += rows
+                continue
+
+            rows, freed = retention.compact_system(system, cutoff, options["batch_size"])
+            total_rows += rows
+            total_bytes = None if total_bytes is None or freed is None else total_bytes + freed
+            if rows:
+                self.stdout.write(f"System {system.id}: deleted {rows} rows, {_size(freed)}")
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"Would delete {total_rows} rows"))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {total_rows} rows, {_size(total_bytes)} reclaimed in {time.monotonic() - started:.1f}s"
+        ))
+
+
+def _size(value):
+    if value is None:
+        return "size unknown"
+    return f"{value / (1024 * 1024):.1f} MB"
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from HydroponicSystem_systems import compression
+from HydroponicSystem_systems.models import HydroponicSystem, Measurement
+
+
+class Command(BaseCommand):
+    help = (
+        "Move measurements of whole UTC days older than --older-than-days (default: "
+        "MEASUREMENT_COMPRESSION['COLD_DAYS']) into compressed per-day blocks. The API reads blocks "
+        "and remaining rows together. One transaction per system-day, so it can be stopped and "
+        "rerun at any time; run one instance at a time, e.g. nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--system", type=int, action="append", dest="systems",
+            help="Only compress this system. Can be given more than once; all systems by default.",
+        )
+        parser.add_argument("--older-than-days", type=int, help="Age in days after which measurements are cold.")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the rows that would be moved.")
+
+    def handle(self, *args, **options):
+        days = options["older_than_days"]
+        if days is not None and days < 0:
+            raise CommandError("--older-than-days must not be negative.")
+        cutoff = compression.cold_cutoff(days, timezone.now())
+
+        systems = HydroponicSystem.objects.order_by("id")
+        if options["systems"]:
+            systems = systems.filter(id__in=options["systems"])
+            missing = set(options["systems"]) - {system.id for system in systems}
+            if missing:
+                raise CommandError(f"Unknown system IDs: {', '.join(map(str, sorted(missing)))}")
+
+        started = time.monotonic()
+        total_rows = total_blocks = total_bytes = 0
+        for system in systems:
+            if options["dry_run"]:
+                rows = Measurement.objects.filter(system=system, timestamp__lt=cutoff).count()
+                self.stdout.write(f"System {system.id}: {rows} rows before {cutoff:%Y-%m-%d}")
+                total_rows += rows
+                continue
+
+            rows, blocks, size = compression.compress_system(system.id, cutoff)
+            if rows:
+                self.stdout.write(
+                    f"System {system.id}: moved {rows} rows into {blocks} blocks ({size / rows:.1f} bytes/row)"
+                )
+            total_rows += rows
+            total_blocks += blocks
+            total_bytes += size
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"Would move {total_rows} rows"))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {total_rows} rows into {total_blocks} blocks, {total_bytes / (1024 * 1024):.1f} MB, "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
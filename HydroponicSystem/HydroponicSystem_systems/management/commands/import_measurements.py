@@ -0,0 +1,171 @@
+import csv
+import time
+from datetime import timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+import numpy as np
+
+from HydroponicSystem_systems.models import HydroponicSystem, Measurement
+from HydroponicSystem_systems.validation import format_errors, validate_columns
+from HydroponicSystem_systems.writes import save_measurements
+
+COLUMNS = ("timestamp", "ph", "temperature", "tds")
+VALUE_COLUMNS = (("ph", np.float64), ("temperature", np.float64), ("tds", np.int64))
+MAX_REPORTED_ERRORS = 10
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import historical measurements from CSV files with the columns "
+        "timestamp,ph,temperature,tds. Every chunk is written by save_measurements, with "
+        "COPY FROM STDIN on PostgreSQL and bulk_create on other databases, so rollups "
+        "and caches are updated as for any other write."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "files", nargs="+",
+            help="CSV files to import, either PATH (requires --system) or SYSTEM_ID=PATH.",
+        )
+        parser.add_argument("--system", type=int, help="System ID for files given without SYSTEM_ID=.")
+        parser.add_argument("--chunk-size", type=int, default=50000, help="Rows written per COPY / bulk_create.")
+        parser.add_argument("--delimiter", default=",")
+
+    def handle(self, *args, **options):
+        sources = self.resolve_sources(options["files"], options["system"])
+        self.chunk_size = options["chunk_size"]
+        self.delimiter = options["delimiter"]
+        self.started = time.monotonic()
+        self.imported = 0
+        self.rejected = 0
+
+        for system_id, path in sources:
+            self.stdout.write(f"Importing {path} into system {system_id}")
+            try:
+                with open(path, newline="") as csv_file:
+                    self.import_file(csv_file, system_id, path)
+            except OSError as e:
+                raise CommandError(f"Cannot read {path}: {e}")
+
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {self.imported} rows, rejected {self.rejected} "
+            f"in {elapsed:.1f}s ({self.imported / max(elapsed, 1e-9):.0f} rows/s)"
+        ))
+
+    def resolve_sources(self, files, default_system):
+        sources = []
+        for item in files:
+            system_id, separator, path = item.partition("=")
+            if separator and system_id.isdigit():
+                sources.append((int(system_id), path))
+            elif default_system is not None:
+                sources.append((default_system, item))
+            else:
+                raise CommandError(f"No system given for {item}. Use SYSTEM_ID=PATH or --system.")
+
+        system_ids = {system_id for system_id, _ in sources}
+        existing = set(HydroponicSystem.objects.filter(id__in=system_ids).values_list("id", flat=True))
+        missing = system_ids - existing
+        if missing:
+            raise CommandError(f"Unknown system IDs: {', '.join(map(str, sorted(missing)))}")
+
+        return sources
+
+    def import_file(self, csv_file, system_id, path):
+        reader = csv.reader(csv_file, delimiter=self.delimiter)
+        header = next(reader, None)
+        if header is None:
+            return
+
+        try:
+            positions = [header.index(column) for column in COLUMNS]
+        except ValueError:
+            raise CommandError(f"{path}: header must contain the columns {', '.join(COLUMNS)}")
+
+        chunk = []
+        for line_number, record in enumerate(reader, start=2):
+            if not record:
+                continue
+            chunk.append((line_number, record))
+
+            if len(chunk) >= self.chunk_size:
+                self.write_chunk(self.validate_chunk(chunk, positions, path), system_id)
+                chunk = []
+
+        if chunk:
+            self.write_chunk(self.validate_chunk(chunk, positions, path), system_id)
+
+    def validate_chunk(self, chunk, positions, path):
+        """
+        Parse and range-check a chunk of CSV records column by column.
+
+        Returns `(timestamp, ph, temperature, tds)` tuples of the valid rows; invalid rows
+        are counted and the first few reported on stderr.
+        """
+        timestamp_position, *value_positions = positions
+        errors = {}
+
+        timestamps = []
+        for index, (_, record) in enumerate(chunk):
+            raw = record[timestamp_position].strip() if len(record) > timestamp_position else ""
+            try:
+                timestamp = parse_datetime(raw)
+            except ValueError:
+                # well formed, but not a date, e.g. 2023-02-30
+                timestamp = None
+            if timestamp is None:
+                errors[index] = {"timestamp": [f"Invalid timestamp {raw!r}."]}
+            elif timezone.is_naive(timestamp):
+                timestamp = timezone.make_aware(timestamp, dt_timezone.utc)
+            timestamps.append(timestamp)
+
+        columns = {}
+        for (name, dtype), position in zip(VALUE_COLUMNS, value_positions):
+            raw = [record[position] if len(record) > position else "" for _, record in chunk]
+            try:
+                columns[name] = np.array(raw, dtype=dtype)
+            except (TypeError, ValueError, OverflowError):
+                columns[name] = self.parse_slowly(raw, name, dtype, errors)
+
+        for index, row_errors in validate_columns(columns).items():
+            errors.setdefault(index, {}).update(row_errors)
+
+        for index in sorted(errors):
+            self.rejected += 1
+            if self.rejected <= MAX_REPORTED_ERRORS:
+                line_number = chunk[index][0]
+                self.stderr.write(f"{path}:{line_number}: {format_errors(errors[index])}")
+
+        return [
+            row for index, row in enumerate(zip(
+                timestamps, columns["ph"].tolist(), columns["temperature"].tolist(), columns["tds"].tolist(),
+            ))
+            if index not in errors
+        ]
+
+    def parse_slowly(self, raw, name, dtype, errors):
+        values = np.zeros(len(raw), dtype=dtype)
+        convert = float if dtype is np.float64 else int
+        for index, value in enumerate(raw):
+            try:
+                values[index] = convert(value)
+            except (TypeError, ValueError, OverflowError):
+                errors.setdefault(index, {})[name] = [f"Invalid value {value!r}."]
+        return values
+
+    def write_chunk(self, chunk, system_id):
+        # one transaction per chunk, with the rollups, caches and version tokens of any other write
+        save_measurements([
+            Measurement.from_reading(
+                system_id=system_id, timestamp=timestamp, ph=ph, temperature=temperature, tds=tds,
+            )
+            for timestamp, ph, temperature, tds in chunk
+        ], copy=True)
+
+        self.imported += len(chunk)
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(f"  {self.imported} rows ({self.imported / max(elapsed, 1e-9):.0f} rows/s)")
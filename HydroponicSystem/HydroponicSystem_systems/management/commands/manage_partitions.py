@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from HydroponicSystem_systems import partitions
+from HydroponicSystem_systems.latest import forget_latest_measurements
+from HydroponicSystem_systems.series import forget_series
+from HydroponicSystem_systems.versions import bump_versions
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the monthly measurement partitions of the coming months and detach old ones "
+        "(PostgreSQL only). Run it from cron, e.g. daily: a missing partition does not lose "
+        "rows, they go to the default partition, but queries on them are not pruned."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead", type=int, default=3,
+            help="Months after the current one that must have a partition (default: 3).",
+        )
+        parser.add_argument(
+            "--keep-months", type=int,
+            help="Detach partitions of months that ended more than this many months ago. "
+                 "Their rows disappear from the API; rollups keep their summaries. Nothing is detached by default.",
+        )
+        parser.add_argument("--drop", action="store_true", help="Drop detached partitions instead of keeping them as tables.")
+        parser.add_argument("--dry-run", action="store_true", help="Only print what would be done.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Measurement partitioning requires PostgreSQL.")
+        if not partitions.is_partitioned():
+            raise CommandError(f'"{partitions.TABLE}" is not partitioned. Run migrate first.')
+        if options["ahead"] < 0 or (options["keep_months"] is not None and options["keep_months"] < 0):
+            raise CommandError("--ahead and --keep-months must not be negative.")
+
+        current = partitions.month_start(timezone.now())
+        wanted = [partitions.add_months(current, offset) for offset in range(options["ahead"] + 1)]
+
+        with connection.cursor() as cursor:
+            existing = partitions.list_partitions(cursor)
+
+        for month in wanted:
+            if month in existing:
+                continue
+            if not options["dry_run"]:
+                # one transaction per partition keeps the locks on the default partition short
+                with transaction.atomic(), connection.cursor() as cursor:
+                    partitions.create_partition(cursor, month)
+            self.stdout.write(f"Created {partitions.partition_name(month)}")
+
+        if options["keep_months"] is not None:
+            oldest = partitions.add_months(current, -options["keep_months"])
+            for month in sorted(existing):
+                if month >= oldest:
+                    continue
+                if not options["dry_run"]:
+                    with transaction.atomic(), connection.cursor() as cursor:
+                        system_ids = partitions.partition_system_ids(cursor, month)
+                        partitions.detach_partition(cursor, month, drop=options["drop"])
+                        # the rows are gone from every system that had readings that month
+                        forget_latest_measurements(system_ids)
+                        forget_series(system_ids)
+                        bump_versions("system", system_ids)
+                action = "Dropped" if options["drop"] else "Detached"
+                self.stdout.write(f"{action} {partitions.partition_name(month)}")
+
+        self.stdout.write(self.style.SUCCESS("Partitions are up to date"))
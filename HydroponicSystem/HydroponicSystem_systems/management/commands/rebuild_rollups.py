@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from HydroponicSystem_systems.models import HydroponicSystem
+from HydroponicSystem_systems.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the hourly and daily measurement rollups from the raw measurements. "
+        "Run it once after migrating an existing database and after writing measurements "
+        "without save_measurements. Pause ingest for the rebuilt systems while it runs. "
+        "Buckets of measurements deleted by compact_measurements are kept as they are."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--system", type=int, action="append", dest="systems",
+            help="Only rebuild this system. Can be given more than once; all systems by default.",
+        )
+
+    def handle(self, *args, **options):
+        system_ids = options["systems"]
+        if system_ids:
+            missing = set(system_ids) - set(
+                HydroponicSystem.objects.filter(id__in=system_ids).values_list("id", flat=True)
+            )
+            if missing:
+                raise CommandError(f"Unknown system IDs: {', '.join(map(str, sorted(missing)))}")
+
+        started = time.monotonic()
+        written = rebuild_rollups(system_ids)
+
+        for model_name, rows in written.items():
+            self.stdout.write(f"{model_name}: {rows} rows")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups in {time.monotonic() - started:.1f}s"))
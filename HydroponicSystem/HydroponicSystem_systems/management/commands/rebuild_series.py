@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from HydroponicSystem_systems import series
+from HydroponicSystem_systems.models import HydroponicSystem
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the memory-mapped measurement series caches in MEASUREMENT_SERIES['ROOT'] from the "
+        "database. They are otherwise built on first use and kept up to date by save_measurements; "
+        "run it after writing or deleting measurements any other way. Ingest can keep running."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--system", type=int, action="append", dest="systems",
+            help="Only rebuild this system. Can be given more than once; all systems by default.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=10000, help="Rows read from the database at a time.")
+
+    def handle(self, *args, **options):
+        if not series.enabled():
+            raise CommandError("Series caches are disabled. Set MEASUREMENT_SERIES['ROOT'].")
+
+        system_ids = options["systems"]
+        if system_ids:
+            missing = set(system_ids) - set(
+                HydroponicSystem.objects.filter(id__in=system_ids).values_list("id", flat=True)
+            )
+            if missing:
+                raise CommandError(f"Unknown system IDs: {', '.join(map(str, sorted(missing)))}")
+        else:
+            system_ids = list(HydroponicSystem.objects.order_by("id").values_list("id", flat=True))
+
+        started = time.monotonic()
+        for system_id in system_ids:
+            rows = series.build_series(system_id, chunk_size=options["chunk_size"])
+            self.stdout.write(f"System {system_id}: {rows} rows")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt series in {time.monotonic() - started:.1f}s"))
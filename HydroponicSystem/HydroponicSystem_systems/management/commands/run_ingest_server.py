@@ -0,0 +1,80 @@
+import asyncio
+import signal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+
+from HydroponicSystem_systems.line_server import PRECISIONS, IngestServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the TCP line-protocol ingest server for sensors, e.g. "
+        "'system=12 ph=6.4,temperature=22.1,tds=820 1700000000'. Each connection "
+        "authenticates once with 'AUTH <device token>' (POST /systems/<id>/device-tokens/); with "
+        "--udp-port, each datagram starts with its own 'AUTH <device token>' line and is not answered. SIGINT/SIGTERM stop accepting new data "
+        "and write everything already received before exiting."
+    )
+
+    def add_arguments(self, parser):
+        ingest_settings = getattr(settings, 'MEASUREMENT_INGEST', {})
+        parser.add_argument("--host", default="0.0.0.0")
+        parser.add_argument("--port", type=int, default=8094)
+        parser.add_argument("--udp-port", type=int, help="Also accept datagrams on this UDP port.")
+        parser.add_argument(
+            "--precision", choices=sorted(PRECISIONS), default="s", help="Unit of the line timestamps.",
+        )
+        parser.add_argument(
+            "--queue-size", type=int, default=ingest_settings.get('LINE_SERVER_QUEUE_SIZE', 10000),
+            help="Readings buffered before connections stop being read.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=ingest_settings.get('LINE_SERVER_BATCH_SIZE', 500),
+            help="Readings written per insert.",
+        )
+
+    def handle(self, *args, **options):
+        query_settings = getattr(settings, 'MEASUREMENT_QUERY', {})
+        for alias in {query_settings.get('LATEST_CACHE', 'default'), query_settings.get('VERSION_CACHE', 'default')}:
+            if isinstance(caches[alias], LocMemCache):
+                # the web processes would keep serving their own copies of the latest
+                # measurements and version tokens, never seeing this process's writes
+                raise CommandError(
+                    f"The '{alias}' cache is local to this process. Configure a shared one, e.g. CACHE_URL=redis://..."
+                )
+
+        ingest_settings = getattr(settings, 'MEASUREMENT_INGEST', {})
+        server = IngestServer(
+            host=options["host"],
+            port=options["port"],
+            queue_size=options["queue_size"],
+            batch_size=options["batch_size"],
+            max_line_bytes=ingest_settings.get('LINE_SERVER_MAX_LINE_BYTES', 4096),
+            auth_timeout=ingest_settings.get('LINE_SERVER_AUTH_TIMEOUT', 10.0),
+            precision=options["precision"],
+            udp_port=options["udp_port"],
+            token_cache_seconds=ingest_settings.get('LINE_SERVER_TOKEN_CACHE_SECONDS', 60.0),
+        )
+        asyncio.run(self.serve(server))
+
+    async def serve(self, server):
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stop.set)
+            except NotImplementedError:
+                # Windows: Ctrl+C raises KeyboardInterrupt instead
+                pass
+
+        await server.start()
+        self.stdout.write(f"Listening on {server.host}:{server.port}")
+        if server.udp_port is not None:
+            self.stdout.write(f"Listening on {server.host}:{server.udp_port}/udp")
+        await stop.wait()
+
+        self.stdout.write("Draining connections...")
+        await server.shutdown()
+        self.stdout.write(self.style.SUCCESS("Ingest server stopped."))
@@ -2,14 +2,28 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
+from rest_framework.fields import DateTimeField
 from .models import HydroponicSystem, Measurement
-from .serializers import MeasurementSerializer
-from datetime import datetime
-from django.db.models import Q
+from .serializers import MeasurementSerializer, MEASUREMENT_VALUES, encode_measurements
+from .renderers import MeasurementJSONRenderer, ColumnarJSONRenderer
+from .columnar import MEASUREMENT_COLUMNS, MEASUREMENT_FLOAT_COLUMNS, parse_columnar_options, to_columns
+from rest_framework.renderers import BrowsableAPIRenderer
+from .ingest import ingest_ndjson, get_write_behind_buffer
+from . import binary_format
 from rest_framework.pagination import PageNumberPagination
+from .pagination import MeasurementCursorPagination
+from .filters import parse_measurement_filters, parse_measurement_query
+from .downsampling import downsample_measurements, downsample_rows, downsample_series
+from .blocks import MeasurementHistory, ScanLimitExceeded
+from . import series
+from .versions import conditional, owned_system
+from django.conf import settings
+from django.utils import timezone
 
 class MeasurementAPIView(APIView):    
     pagination = PageNumberPagination
+    cursor_pagination = MeasurementCursorPagination
+    renderer_classes = [MeasurementJSONRenderer, ColumnarJSONRenderer, BrowsableAPIRenderer]
 
     def post(self, request, system_id):
         """
@@ -23,6 +37,8 @@ class MeasurementAPIView(APIView):
         - **ph** (float, required): The pH level of the system.
         - **tds** (integer, required): Total dissolved solids (TDS) in ppm.
         - **timestamp** (string, optional, default: current time): The timestamp of the measurement.
+        - **sequence** (integer, optional): Client-assigned reading number, unique per system. A measurement whose
+          sequence is already stored is not inserted again, so retried uploads are idempotent.
 
         ## Example Request:
         POST /systems/1/measurements/
@@ -35,15 +51,55 @@ class MeasurementAPIView(APIView):
         }
         ```
 
+        ## Batch Request:
+        The body may also be a JSON array of measurements (at most `MEASUREMENT_INGEST['BATCH_MAX_SIZE']`).
+        The ownership check runs once and all rows are written with a single bulk insert.
+
+        - **mode** (query parameter, default: `atomic`): `atomic` rejects the whole batch if any row is invalid,
+          `best_effort` saves the valid rows and reports the invalid ones.
+
+        ```json
+        [
+            {"ph": 6.5, "temperature": 22.5, "tds": 900},
+            {"ph": 6.6, "temperature": 22.4, "tds": 905}
+        ]
+        ```
+
+        ## Streaming Request:
+        With `Content-Type: application/x-ndjson` the body is read as one JSON measurement per line.
+        Lines are validated as they arrive and flushed to the database in chunks of
+        `MEASUREMENT_INGEST['NDJSON_CHUNK_SIZE']` rows; invalid lines are skipped and counted.
+
+        ```
+        {"ph": 6.5, "temperature": 22.5, "tds": 900}
+        {"ph": 6.6, "temperature": 22.4, "tds": 905}
+        ```
+
+        Response: `{"accepted": 2, "duplicates": 0, "rejected": 0, "first_error": null}`
+
+        ## Binary Request:
+        With `Content-Type: application/x-hydroponic-measurements` the body is a packed batch in the format
+        described in `HydroponicSystem_systems/binary_format.py` (16-byte header, 16 bytes per reading).
+        Readings keep their own timestamps; `mode` and the response are the same as for a batch request.
+
+        ## Write-behind Mode:
+        When `MEASUREMENT_INGEST['WRITE_BEHIND']` is enabled, a single measurement is validated, queued and
+        acknowledged with **202 Accepted** (without an `id`); queued rows are written in bulk in the background.
+        - **sync** (query parameter, `true`): Write the measurement before responding, for read-after-write.
+
         ## Responses:
-        - **201 Created**: Successfully created a new measurement.
+        - **200 OK**: The measurement's `sequence` is already stored, nothing was inserted.
+        - **201 Created**: Successfully created a new measurement (or batch of measurements).
+        - **202 Accepted**: The measurement was queued for a write-behind insert.
         - **400 Bad Request**: If the request data is invalid.
         - **403 Forbidden**: If the user does not have permission to add measurements to the system.
+        - **503 Service Unavailable**: If the write-behind queue is full.
 
         ## Example Response:
         ```json
         {
             "id": 17,
+            "sequence": null,
             "timestamp": "2025-02-17T12:22:43.652462Z",
             "ph": 6.5,
             "temperature": 22.5,
@@ -51,19 +107,129 @@ class MeasurementAPIView(APIView):
             "system": 1
         }
         ```
+
+        ## Example Batch Response:
+        ```json
+        {
+            "created": 1,
+            "duplicates": [],
+            "rejected": 1,
+            "errors": [
+                {"index": 1, "errors": {"ph": ["Ensure this value is less than or equal to 14.0."]}}
+            ]
+        }
+        ```
         """
         try:
             system = HydroponicSystem.objects.get(id=system_id, owner=request.user)
         except HydroponicSystem.DoesNotExist:
             raise PermissionDenied("You do not have permission to add measurements in this system.")
 
+        ingest_settings = getattr(settings, 'MEASUREMENT_INGEST', {})
+
+        content_type = request.content_type.split(";")[0].strip()
+
+        if content_type == "application/x-ndjson":
+            summary = ingest_ndjson(
+                request.stream,
+                system,
+                chunk_size=ingest_settings.get('NDJSON_CHUNK_SIZE', 500),
+                max_line_bytes=ingest_settings.get('NDJSON_MAX_LINE_BYTES', 65536),
+            )
+            return Response(summary, status=status.HTTP_201_CREATED)
+
+        if content_type == binary_format.CONTENT_TYPE:
+            return self._create_binary(request, system)
+
+        if isinstance(request.data, list):
+            return self._create_batch(request, system, request.data, ingest_settings.get('BATCH_MAX_SIZE', 1000))
+
         serializer = MeasurementSerializer(data=request.data)
         if serializer.is_valid():
+            if ingest_settings.get('WRITE_BEHIND') and request.query_params.get("sync") != "true":
+                return self._queue_measurement(serializer, system)
+
             serializer.save(system=system)
+            if serializer.duplicate:
+                return Response(
+                    {"detail": "Measurement with this sequence is already stored.", "duplicate": True,
+                     "sequence": serializer.instance.sequence},
+                    status=status.HTTP_200_OK,
+                )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)          
 
+    def _queue_measurement(self, serializer, system):
+        measurement = Measurement.from_reading(
+            system=system, timestamp=timezone.now(), **serializer.validated_data
+        )
+
+        if not get_write_behind_buffer().put(measurement):
+            return Response(
+                {"detail": "Measurement queue is full. Retry later."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
+
+        return Response(MeasurementSerializer(measurement).data, status=status.HTTP_202_ACCEPTED)
+
+    def _create_binary(self, request, system):
+        try:
+            readings = list(binary_format.decode(request.body))
+        except binary_format.BinaryFormatError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = [
+            {"ph": ph, "temperature": temperature, "tds": tds, "sequence": sequence}
+            for _, ph, temperature, tds, sequence in readings
+        ]
+        # the size of a binary upload is bounded by DATA_UPLOAD_MAX_MEMORY_SIZE, not by BATCH_MAX_SIZE
+        return self._create_batch(
+            request, system, rows, max_length=None, timestamps=[timestamp for timestamp, *_ in readings],
+        )
+
+    def _create_batch(self, request, system, rows, max_length, timestamps=None):
+        mode = request.query_params.get("mode", "atomic")
+
+        if mode not in ["atomic", "best_effort"]:
+            return Response(
+                {"detail": "Invalid value for 'mode'. Use 'atomic' or 'best_effort'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        serializer = MeasurementSerializer(
+            data=rows,
+            many=True,
+            allow_empty=False,
+            max_length=max_length,
+            context={"best_effort": mode == "best_effort", "timestamps": timestamps},
+        )
+
+        if not serializer.is_valid():
+            errors = serializer.errors
+            if isinstance(errors, list):
+                errors = {"errors": [
+                    {"index": index, "errors": row_errors}
+                    for index, row_errors in enumerate(errors) if row_errors
+                ]}
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        measurements = serializer.save(system=system)
+        duplicates = [measurement.sequence for measurement in serializer.duplicates]
+        rejected = serializer.rejected
+
+        return Response(
+            {
+                "created": len(measurements) - len(duplicates),
+                "duplicates": duplicates,
+                "rejected": len(rejected),
+                "errors": rejected,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+    @conditional("system", "system_id")
     def get(self, request, system_id):
         """
         List of measurements for a specific hydroponic system.
@@ -80,14 +246,45 @@ class MeasurementAPIView(APIView):
         - **tds_max** (float): Filter measurements with total dissolved solids less than or equal to this value.
         - **timestamp_after** (YYYY-MM-DD): Filter measurements recorded after this date.
         - **timestamp_before** (YYYY-MM-DD): Filter measurements recorded before this date.
-        - **sort_by** (string, default: `timestamp`): Field to sort the results by.
+        - **sort_by** (string, default: `timestamp`): Field to sort the results by: `timestamp`, `ph`,
+          `temperature` or `tds`, ties ordered by `id`. Each order is backed by an index. Over compressed
+          history the value orders sort in memory and answer 400
+          when the time range holds more than `MEASUREMENT_QUERY['BLOCK_SCAN_MAX_ROWS']` compressed
+          measurements, and so do numbered pages that start further in; cursor pages have no such limit.
         - **sort_order** (string, default: `asc`): Sorting order (`asc` for ascending, `desc` for descending).
+        - **pagination** (string, default: `page`): `cursor` pages by `(timestamp, id)` instead of page numbers.
+          Deep pages are as fast as the first one. Only `sort_by=timestamp` is supported; follow the
+          opaque `next`/`previous` links, which carry a `cursor` parameter.
+        - **page_size** (integer, cursor mode only, default: 10, max: 1000): Measurements per page.
+        - **count** (boolean, cursor mode only): `true` adds the total `count`, which costs a `COUNT(*)`.
+        - **max_points** (integer, 3-10000): Instead of pages, return a chart-ready series of at most this many
+          points per metric, in time order. All matching measurements are streamed from the database,
+          reduced to the min/max points of small buckets and then picked with Largest-Triangle-Three-Buckets,
+          so spikes stay visible. With only timestamp filters the points are read from the system's
+          memory-mapped series cache instead, when `MEASUREMENT_SERIES['ROOT']` is set.
+        - **format** (string, default: `json`): `columnar` returns the page as one array per column,
+          `{"id": [...], "sequence": [...], "timestamp": [...], "ph": [...], "temperature": [...], "tds": [...]}`,
+          under `results`. Use `pagination=cursor&page_size=1000` for large pages. `max_points` responses
+          keep their shape.
+        - **timestamps** (string, `format=columnar` only, default: `iso`): `epoch_ms` writes timestamps as
+          integer milliseconds since the Unix epoch.
+        - **float32** (boolean, `format=columnar` only): `true` rounds pH and temperature to single precision.
 
         ## Example Request:
         GET /systems/1/measurements/?ph_min=6.0&ph_max=7.0&temperature_min=20&sort_by=temperature&sort_order=desc
 
+        GET /systems/1/measurements/?pagination=cursor&sort_order=desc
+
+        GET /systems/1/measurements/?timestamp_after=2025-01-01&max_points=1000
+
+        GET /systems/1/measurements/?format=columnar&pagination=cursor&page_size=1000&timestamps=epoch_ms
+
         ## Responses:
-        - **200 OK**: Returns a paginated list of measurements.
+        - **200 OK**: Returns a paginated list of measurements, or the downsampled series with `max_points`.
+          `ETag` and `Last-Modified` change whenever measurements of the system are saved; they are
+          only sent when the version cache is shared (`MEASUREMENT_QUERY['CONDITIONAL_REQUESTS']`).
+        - **304 Not Modified**: If `If-None-Match` / `If-Modified-Since` match the current validators;
+          answered after the ownership lookup alone.
         - **400 Bad Request**: If a query parameter is incorrectly formatted.
         - **403 Forbidden**: If the user does not have permission to access the system.
 
@@ -117,66 +314,121 @@ class MeasurementAPIView(APIView):
             ]
         }
         ```
+
+        ## Example Response with `max_points`:
+        ```json
+        {
+            "count": 250000,
+            "max_points": 1000,
+            "series": {
+                "ph": [{"timestamp": "2025-01-01T00:00:12Z", "value": 6.4}],
+                "temperature": [{"timestamp": "2025-01-01T00:00:12Z", "value": 24.5}],
+                "tds": [{"timestamp": "2025-01-01T00:00:12Z", "value": 500}]
+            }
+        }
+        ```
         """
-        try:
-            system = HydroponicSystem.objects.get(id=system_id, owner=request.user)
-        except HydroponicSystem.DoesNotExist:
+        # already looked up by @conditional
+        system = owned_system(request, system_id)
+        if system is None:
             raise PermissionDenied("You do not have permission to this system")
 
-        #filtering
-        filters = Q(system=system)
-
-        ph_min = request.query_params.get("ph_min")
-        ph_max = request.query_params.get("ph_max")
-        temp_min = request.query_params.get("temperature_min")
-        temp_max = request.query_params.get("temperature_max")
-        tds_min = request.query_params.get("tds_min")
-        tds_max = request.query_params.get("tds_max")
-        timestamp_after = request.query_params.get("timestamp_after")
-        timestamp_before = request.query_params.get("timestamp_before")
-
-        if ph_min:
-            filters &= Q(ph__gte=ph_min)
-        if ph_max:
-            filters &= Q(ph__lte=ph_max)
-        if temp_min:
-            filters &= Q(temperature__gte=temp_min)
-        if temp_max:
-            filters &= Q(temperature__lte=temp_max)
-        if tds_min:
-            filters &= Q(tds__gte=tds_min)
-        if tds_max:
-            filters &= Q(tds__lte=tds_max)
+        #filtering and sorting
+        filters, ordering, descending = parse_measurement_query(request.query_params)
+        sort_by = ordering[0].lstrip("-")
+        measurements = Measurement.objects.filter(filters, system=system)
+        # compressed days of the system, read together with the rows that are still in the table
+        query_settings = getattr(settings, 'MEASUREMENT_QUERY', {})
+        history = MeasurementHistory(
+            system.id, parse_measurement_filters(request.query_params), descending,
+            # downsampled series are always in time order
+            "timestamp" if "max_points" in request.query_params else sort_by,
+            max_scan_rows=query_settings.get('BLOCK_SCAN_MAX_ROWS', 100000),
+        )
 
-        try:
-            if timestamp_after:
-                filters &= Q(timestamp__gte=datetime.strptime(timestamp_after, "%Y-%m-%d"))
-            if timestamp_before:
-                filters &= Q(timestamp__lte=datetime.strptime(timestamp_before, "%Y-%m-%d"))
-        except ValueError:
-            return Response(
-                {"detail": "Invalid timestamp format. Expected format: YYYY-MM-DD."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        if "max_points" in request.query_params:
+            return self._downsampled(request, system, measurements, history)
 
-        #sorting
-        sort_by = request.query_params.get("sort_by", "timestamp")
-        sort_order = request.query_params.get("sort_order", "asc")
+        # JSON pages skip the serializer: rows are read as tuples and encoded by a string template
+        fast = isinstance(request.accepted_renderer, MeasurementJSONRenderer)
+        columnar = isinstance(request.accepted_renderer, ColumnarJSONRenderer)
+        if columnar:
+            epoch_ms, float32 = parse_columnar_options(request.query_params)
+        if history.has_blocks:
+            measurements = history
+        elif fast or columnar:
+            measurements = measurements.values_list(*MEASUREMENT_VALUES, named=True)
 
-        if sort_order not in ["asc", "desc"]:
-            return Response(
-                {"detail": "Invalid value for 'sort_order'. Use 'asc' or 'desc'."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        def serialize(page):
+            if columnar:
+                return to_columns(
+                    page, MEASUREMENT_COLUMNS, MEASUREMENT_FLOAT_COLUMNS, epoch_ms=epoch_ms, float32=float32,
+                )
+            if fast:
+                return encode_measurements(page)
+            if history.has_blocks:
+                page = [Measurement(**row._asdict()) for row in page]
+            return MeasurementSerializer(page, many=True).data
 
-        if sort_order == "desc":
-            sort_by = f"-{sort_by}"
+        if "cursor" in request.query_params or request.query_params.get("pagination") == "cursor":
+            if sort_by != "timestamp":
+                return Response(
+                    {"detail": "Cursor pagination only supports 'sort_by=timestamp'."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            paginator = self.cursor_pagination()
+            page = paginator.paginate_queryset(measurements, request, view=self, descending=descending)
+            return paginator.get_paginated_response(serialize(page))
 
-        measurements = Measurement.objects.filter(filters).order_by(sort_by)
+        if not history.has_blocks:
+            measurements = measurements.order_by(*ordering)
 
         #pagination
         paginator = self.pagination()
-        paginated_measurements = paginator.paginate_queryset(measurements, request)
+        try:
+            paginated_measurements = paginator.paginate_queryset(measurements, request)
+        except ScanLimitExceeded as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return paginator.get_paginated_response(serialize(paginated_measurements))
+
+    def _downsampled(self, request, system, measurements, history):
+        query_settings = getattr(settings, 'MEASUREMENT_QUERY', {})
+        limit = query_settings.get('MAX_POINTS_LIMIT', 10000)
+
+        try:
+            max_points = int(request.query_params["max_points"])
+        except ValueError:
+            max_points = 0
+        if not 3 <= max_points <= limit:
+            return Response(
+                {"detail": f"Invalid value for 'max_points'. Use an integer between 3 and {limit}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        chunk_size = query_settings.get('DOWNSAMPLE_CHUNK_SIZE', 10000)
+        lookups = parse_measurement_filters(request.query_params)
+        if series.enabled() and set(lookups) <= {"timestamp__gte", "timestamp__lte"}:
+            cached = series.load_series(system.id, chunk_size=chunk_size).between(
+                lookups.get("timestamp__gte"), lookups.get("timestamp__lte"),
+            )
+            count, points = downsample_series(cached, max_points, chunk_size=chunk_size)
+        elif history.has_blocks:
+            rows = ((row.timestamp, row.ph, row.temperature, row.tds) for row in history.rows(descending=False))
+            count, points = downsample_rows(history.count(), rows, max_points, chunk_size=chunk_size)
+        else:
+            count, points = downsample_measurements(measurements, max_points, chunk_size=chunk_size)
+        timestamp_field = DateTimeField()
 
-        serializer = MeasurementSerializer(paginated_measurements, many=True)
-        return paginator.get_paginated_response(serializer.data)
\ No newline at end of file
+        return Response({
+            "count": count,
+            "max_points": max_points,
+            "series": {
+                metric: [
+                    {"timestamp": timestamp_field.to_representation(timestamp),
+                     "value": int(value) if metric == "tds" else value}
+                    for timestamp, value in metric_points
+                ]
+                for metric, metric_points in points.items()
+            },
+        })
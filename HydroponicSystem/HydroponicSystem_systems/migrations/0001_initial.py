@@ -0,0 +1,44 @@
+# Generated by Django 5.1.6 on 2026-10-18 03:46
+
+import HydroponicSystem_systems.models
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HydroponicSystem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('location', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Measurement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', HydroponicSystem_systems.models.ReadingTimestampField(auto_now_add=True)),
+                ('ph', models.FloatField(validators=[django.core.validators.MinValueValidator(0.0), django.core.validators.MaxValueValidator(14.0)])),
+                ('temperature', models.FloatField(validators=[django.core.validators.MinValueValidator(-10.0), django.core.validators.MaxValueValidator(50.0)])),
+                ('tds', models.IntegerField(validators=[django.core.validators.MinValueValidator(0)])),
+                ('sequence', models.BigIntegerField(blank=True, null=True)),
+                ('system', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='HydroponicSystem_systems.hydroponicsystem')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('system', 'sequence'), name='unique_measurement_sequence')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 03:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HydroponicSystem_systems', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='measurement',
+            index=models.Index(fields=['system', 'timestamp', 'id'], name='measurement_system_ts_id_idx'),
+        ),
+    ]
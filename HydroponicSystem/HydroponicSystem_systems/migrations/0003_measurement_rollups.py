@@ -0,0 +1,62 @@
+# Generated by Django 5.1.6 on 2026-10-18 03:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HydroponicSystem_systems', '0002_measurement_system_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeasurementDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('count', models.BigIntegerField()),
+                ('ph_sum', models.FloatField()),
+                ('ph_sum_sq', models.FloatField()),
+                ('ph_min', models.FloatField()),
+                ('ph_max', models.FloatField()),
+                ('temperature_sum', models.FloatField()),
+                ('temperature_sum_sq', models.FloatField()),
+                ('temperature_min', models.FloatField()),
+                ('temperature_max', models.FloatField()),
+                ('tds_sum', models.FloatField()),
+                ('tds_sum_sq', models.FloatField()),
+                ('tds_min', models.IntegerField()),
+                ('tds_max', models.IntegerField()),
+                ('system', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='HydroponicSystem_systems.hydroponicsystem')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('system', 'bucket'), name='unique_measurement_daily_bucket')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MeasurementHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('count', models.BigIntegerField()),
+                ('ph_sum', models.FloatField()),
+                ('ph_sum_sq', models.FloatField()),
+                ('ph_min', models.FloatField()),
+                ('ph_max', models.FloatField()),
+                ('temperature_sum', models.FloatField()),
+                ('temperature_sum_sq', models.FloatField()),
+                ('temperature_min', models.FloatField()),
+                ('temperature_max', models.FloatField()),
+                ('tds_sum', models.FloatField()),
+                ('tds_sum_sq', models.FloatField()),
+                ('tds_min', models.IntegerField()),
+                ('tds_max', models.IntegerField()),
+                ('system', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='HydroponicSystem_systems.hydroponicsystem')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('system', 'bucket'), name='unique_measurement_hourly_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,143 @@
+"""
+Turn the measurement table into a table partitioned by month on `timestamp` (PostgreSQL only).
+
+PostgreSQL requires every unique index of a partitioned table to contain the partition key, so
+the primary key becomes (id, timestamp) and `unique_measurement_sequence` becomes
+(system_id, sequence, timestamp). That no longer catches retried uploads stamped by the server,
+so `writes.save_measurements` deduplicates them through the `MeasurementSequence` table of
+migration 0007. The model state is unchanged, and other databases are not touched.
+
+The rows are copied inside the migration's transaction, which locks the table; migrate large
+databases in a maintenance window.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import migrations
+
+from HydroponicSystem_systems import partitions
+
+TABLE = partitions.TABLE
+SYSTEM_TABLE = "HydroponicSystem_systems_hydroponicsystem"
+COLUMNS = '"id", "timestamp", "ph", "temperature", "tds", "sequence", "system_id"'
+# partitions created ahead of the current month; `manage.py manage_partitions` keeps it that way
+MONTHS_AHEAD = 3
+
+RENAME_INDEXES = """
+DO $$
+DECLARE index_name text;
+BEGIN
+    FOR index_name IN SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = '{table}'
+    LOOP
+        EXECUTE format('ALTER INDEX %I RENAME TO %I', index_name, left(index_name, 55) || '{suffix}');
+    END LOOP;
+END $$
+"""
+
+
+def partition(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{TABLE}_plain"')
+        # index names are global, so the old ones must make room for the new
+        cursor.execute(RENAME_INDEXES.format(table=f"{TABLE}_plain", suffix="_plain"))
+
+        cursor.execute(f"""
+            CREATE TABLE "{TABLE}" (
+                "id" bigint NOT NULL,
+                "timestamp" timestamp with time zone NOT NULL,
+                "ph" double precision NOT NULL,
+                "temperature" double precision NOT NULL,
+                "tds" integer NOT NULL,
+                "sequence" bigint NULL,
+                "system_id" bigint NOT NULL
+            ) PARTITION BY RANGE ("timestamp")
+        """)
+        # a plain sequence rather than an identity column, which partitioned tables only
+        # support from PostgreSQL 17
+        cursor.execute(f'CREATE SEQUENCE "{TABLE}_id_part_seq" OWNED BY "{TABLE}"."id"')
+        cursor.execute(f'ALTER TABLE "{TABLE}" ALTER COLUMN "id" SET DEFAULT nextval(\'"{TABLE}_id_part_seq"\')')
+        cursor.execute(
+            f'SELECT setval(\'"{TABLE}_id_part_seq"\', COALESCE(MAX("id"), 1), MAX("id") IS NOT NULL) '
+            f'FROM "{TABLE}_plain"'
+        )
+
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey" PRIMARY KEY ("id", "timestamp")')
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "unique_measurement_sequence" '
+            f'UNIQUE ("system_id", "sequence", "timestamp")'
+        )
+        cursor.execute(f'CREATE INDEX "measurement_system_ts_id_idx" ON "{TABLE}" ("system_id", "timestamp", "id")')
+        cursor.execute(f'CREATE INDEX "{TABLE}_system_id_idx" ON "{TABLE}" ("system_id")')
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_system_id_fk" FOREIGN KEY ("system_id") '
+            f'REFERENCES "{SYSTEM_TABLE}" ("id") DEFERRABLE INITIALLY DEFERRED'
+        )
+        cursor.execute(f'CREATE TABLE "{partitions.DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+
+        # one partition per month that has data, and the coming months
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', \"timestamp\" AT TIME ZONE 'UTC') FROM \"{TABLE}_plain\""
+        )
+        months = {month.replace(tzinfo=dt_timezone.utc) for (month,) in cursor.fetchall()}
+        current = partitions.month_start(datetime.now(dt_timezone.utc))
+        months.update(partitions.add_months(current, offset) for offset in range(MONTHS_AHEAD + 1))
+        for month in sorted(months):
+            partitions.create_partition(cursor, month)
+
+        cursor.execute(f'INSERT INTO "{TABLE}" ({COLUMNS}) SELECT {COLUMNS} FROM "{TABLE}_plain"')
+        cursor.execute(f'DROP TABLE "{TABLE}_plain"')
+
+    partitions.is_partitioned.cache_clear()
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{TABLE}_partitioned"')
+        cursor.execute(RENAME_INDEXES.format(table=f"{TABLE}_partitioned", suffix="_part"))
+
+        cursor.execute(f"""
+            CREATE TABLE "{TABLE}" (
+                "id" bigint NOT NULL GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+                "timestamp" timestamp with time zone NOT NULL,
+                "ph" double precision NOT NULL,
+                "temperature" double precision NOT NULL,
+                "tds" integer NOT NULL,
+                "sequence" bigint NULL,
+                "system_id" bigint NOT NULL
+            )
+        """)
+        cursor.execute(f'INSERT INTO "{TABLE}" ({COLUMNS}) SELECT {COLUMNS} FROM "{TABLE}_partitioned"')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('\"{TABLE}\"', 'id'), COALESCE(MAX(\"id\"), 1), "
+            f'MAX("id") IS NOT NULL) FROM "{TABLE}"'
+        )
+        # fails if the same (system, sequence) was stored with different timestamps meanwhile
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "unique_measurement_sequence" UNIQUE ("system_id", "sequence")'
+        )
+        cursor.execute(f'CREATE INDEX "measurement_system_ts_id_idx" ON "{TABLE}" ("system_id", "timestamp", "id")')
+        cursor.execute(f'CREATE INDEX "{TABLE}_system_id_idx" ON "{TABLE}" ("system_id")')
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_system_id_fk" FOREIGN KEY ("system_id") '
+            f'REFERENCES "{SYSTEM_TABLE}" ("id") DEFERRABLE INITIALLY DEFERRED'
+        )
+        # drops the attached partitions; detached ones stay as standalone tables
+        cursor.execute(f'DROP TABLE "{TABLE}_partitioned"')
+
+    partitions.is_partitioned.cache_clear()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HydroponicSystem_systems', '0003_measurement_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
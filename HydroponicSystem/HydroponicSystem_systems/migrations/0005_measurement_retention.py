@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-18 04:14
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HydroponicSystem_systems', '0004_partition_measurement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeasurementCompaction',
+            fields=[
+                ('system', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='HydroponicSystem_systems.hydroponicsystem')),
+                ('compacted_before', models.DateTimeField(null=True)),
+                ('folded_before', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='hydroponicsystem',
+            name='raw_retention_days',
+            field=models.PositiveIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-18 04:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HydroponicSystem_systems', '0005_measurement_retention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeasurementBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('count', models.IntegerField()),
+                ('data', models.BinaryField()),
+                ('system', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='HydroponicSystem_systems.hydroponicsystem')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('system', 'start'), name='unique_measurement_block_start')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.6 on 2026-10-18 04:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from HydroponicSystem_systems import partitions
+
+
+def backfill(apps, schema_editor):
+    # the keys are only claimed while the measurement table is partitioned
+    partitions.is_partitioned.cache_clear()
+    if not partitions.is_partitioned(schema_editor.connection.alias):
+        return
+    MeasurementSequence = apps.get_model("HydroponicSystem_systems", "MeasurementSequence")
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO "{MeasurementSequence._meta.db_table}" ("system_id", "sequence", "timestamp") '
+            f'SELECT "system_id", "sequence", MIN("timestamp") FROM "{partitions.TABLE}" '
+            f'WHERE "sequence" IS NOT NULL GROUP BY "system_id", "sequence"'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HydroponicSystem_systems', '0006_measurement_blocks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeasurementSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.BigIntegerField()),
+                ('timestamp', models.DateTimeField()),
+                ('system', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='HydroponicSystem_systems.hydroponicsystem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['timestamp'], name='measurement_sequence_ts_idx')],
+                'constraints': [models.UniqueConstraint(fields=('system', 'sequence'), name='unique_measurement_sequence_key')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-18 05:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HydroponicSystem_systems', '0007_measurement_sequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='measurement',
+            index=models.Index(fields=['system', 'ph', 'id'], name='measurement_system_ph_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='measurement',
+            index=models.Index(fields=['system', 'temperature', 'id'], name='measurement_system_temp_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='measurement',
+            index=models.Index(fields=['system', 'tds', 'id'], name='measurement_system_tds_id_idx'),
+        ),
+    ]
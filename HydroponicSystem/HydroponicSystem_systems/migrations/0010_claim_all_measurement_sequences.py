@@ -0,0 +1,56 @@
+"""
+Claim the `(system, sequence)` keys of every stored measurement in `MeasurementSequence`,
+which `writes.save_measurements` now does on every database rather than only on a partitioned
+table (migration 0007), including those of rows already compressed into blocks.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import migrations
+
+from HydroponicSystem_systems import block_format
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+BATCH_SIZE = 5000
+
+
+def backfill(apps, schema_editor):
+    Measurement = apps.get_model("HydroponicSystem_systems", "Measurement")
+    MeasurementBlock = apps.get_model("HydroponicSystem_systems", "MeasurementBlock")
+    MeasurementSequence = apps.get_model("HydroponicSystem_systems", "MeasurementSequence")
+    quote_name = schema_editor.connection.ops.quote_name
+
+    with schema_editor.connection.cursor() as cursor:
+        # keys claimed while the table was partitioned are already there
+        cursor.execute(
+            f"INSERT INTO {quote_name(MeasurementSequence._meta.db_table)} "
+            f"({quote_name('system_id')}, {quote_name('sequence')}, {quote_name('timestamp')}) "
+            f"SELECT {quote_name('system_id')}, {quote_name('sequence')}, MIN({quote_name('timestamp')}) "
+            f"FROM {quote_name(Measurement._meta.db_table)} WHERE {quote_name('sequence')} IS NOT NULL "
+            f"GROUP BY {quote_name('system_id')}, {quote_name('sequence')} "
+            f"ON CONFLICT ({quote_name('system_id')}, {quote_name('sequence')}) DO NOTHING"
+        )
+
+    for block in MeasurementBlock.objects.exclude(count=0).iterator(chunk_size=100):
+        columns = block_format.decode(block.data)
+        keys = ~columns["sequence_null"]
+        MeasurementSequence.objects.bulk_create(
+            [
+                MeasurementSequence(
+                    system_id=block.system_id, sequence=sequence, timestamp=EPOCH + timedelta(microseconds=timestamp),
+                )
+                for sequence, timestamp in zip(columns["sequence"][keys].tolist(), columns["timestamp"][keys].tolist())
+            ],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HydroponicSystem_systems', '0009_device_token'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
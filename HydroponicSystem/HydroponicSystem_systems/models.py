@@ -1,17 +1,38 @@
+import hashlib
+import secrets
+
 from django.db import models
 
 from HydroponicSystem_authentication.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+class ReadingTimestampField(models.DateTimeField):
+    """
+    `auto_now_add` timestamp that can keep the time reported with a reading.
+
+    Measurements are stamped on insert as before, unless the instance has
+    `keep_timestamp` set (see `Measurement.from_reading`), which historical
+    imports and buffered device uploads use to store the original reading time.
+    """
+    def pre_save(self, model_instance, add):
+        if add and model_instance.keep_timestamp and getattr(model_instance, self.attname) is not None:
+            return getattr(model_instance, self.attname)
+        return super().pre_save(model_instance, add)
+
 class HydroponicSystem(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
     location = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # days raw measurements are kept before `manage.py compact_measurements` deletes them,
+    # leaving only their rollups; MEASUREMENT_RETENTION['RAW_DAYS'] when null
+    raw_retention_days = models.PositiveIntegerField(
+        blank=True, null=True, validators=[MinValueValidator(1)],
+    )
 
 class Measurement(models.Model):
     system = models.ForeignKey(HydroponicSystem, on_delete=models.CASCADE)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = ReadingTimestampField(auto_now_add=True)
 
     ph = models.FloatField(
         validators=[MinValueValidator(0.0), MaxValueValidator(14.0)],
@@ -23,4 +44,150 @@ class Measurement(models.Model):
 
     tds = models.IntegerField(
         validators=[MinValueValidator(0)],
-    )
\ No newline at end of file
+    )
+
+    # client-assigned reading number, unique per system, used to make retried uploads idempotent
+    sequence = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        # On PostgreSQL the table is partitioned by month on timestamp (migration 0004,
+        # `manage.py manage_partitions`); there the primary key and this constraint also
+        # contain timestamp, because unique indexes of partitioned tables must, and
+        # MeasurementSequence keeps (system, sequence) unique instead.
+        constraints = [
+            models.UniqueConstraint(fields=['system', 'sequence'], name='unique_measurement_sequence'),
+        ]
+        indexes = [
+            # history of one system in time order; serves timestamp filters, sorting and cursor pages.
+            # Queries on (system, timestamp) use its prefix, so that pair needs no index of its own.
+            models.Index(fields=['system', 'timestamp', 'id'], name='measurement_system_ts_id_idx'),
+            # sort_by=ph|temperature|tds pages, read in index order instead of sorting the history
+            models.Index(fields=['system', 'ph', 'id'], name='measurement_system_ph_id_idx'),
+            models.Index(fields=['system', 'temperature', 'id'], name='measurement_system_temp_id_idx'),
+            models.Index(fields=['system', 'tds', 'id'], name='measurement_system_tds_id_idx'),
+        ]
+
+    keep_timestamp = False
+
+    @classmethod
+    def from_reading(cls, timestamp=None, **fields):
+        """Build a measurement that keeps `timestamp` on insert instead of being stamped with the current time."""
+        measurement = cls(timestamp=timestamp, **fields)
+        measurement.keep_timestamp = timestamp is not None
+        return measurement
+
+class MeasurementRollup(models.Model):
+    """
+    Running aggregates of the measurements of one system in one time bucket.
+
+    Kept up to date by `rollups.update_rollups` on every write through `save_measurements`;
+    `manage.py rebuild_rollups` recomputes them from the raw measurements. Once
+    `manage.py compact_measurements` has deleted old raw measurements, their buckets are the
+    only record of them.
+    """
+    system = models.ForeignKey(HydroponicSystem, on_delete=models.CASCADE)
+    bucket = models.DateTimeField()
+    count = models.BigIntegerField()
+
+    ph_sum = models.FloatField()
+    ph_sum_sq = models.FloatField()
+    ph_min = models.FloatField()
+    ph_max = models.FloatField()
+
+    temperature_sum = models.FloatField()
+    temperature_sum_sq = models.FloatField()
+    temperature_min = models.FloatField()
+    temperature_max = models.FloatField()
+
+    tds_sum = models.FloatField()
+    tds_sum_sq = models.FloatField()
+    tds_min = models.IntegerField()
+    tds_max = models.IntegerField()
+
+    class Meta:
+        abstract = True
+
+class MeasurementHourly(MeasurementRollup):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['system', 'bucket'], name='unique_measurement_hourly_bucket'),
+        ]
+
+class MeasurementDaily(MeasurementRollup):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['system', 'bucket'], name='unique_measurement_daily_bucket'),
+        ]
+
+class MeasurementCompaction(models.Model):
+    """
+    Progress of `manage.py compact_measurements` for one system.
+
+    Raw measurements before `compacted_before` have been deleted; only the rollups summarize
+    them, so `rebuild_rollups` leaves those buckets alone. `folded_before` runs ahead of it
+    while a compaction is deleting: the rollups before it are final, and an interrupted run
+    resumes by deleting the raw rows up to it without recomputing them.
+    """
+    system = models.OneToOneField(HydroponicSystem, on_delete=models.CASCADE, primary_key=True)
+    compacted_before = models.DateTimeField(null=True)
+    folded_before = models.DateTimeField(null=True)
+
+class MeasurementBlock(models.Model):
+    """
+    The measurements of one system in one UTC day `[start, end)`, packed by
+    `manage.py compress_measurements` into `data` (see `block_format`) and deleted from
+    `Measurement`. `blocks.MeasurementHistory` reads both together.
+    """
+    system = models.ForeignKey(HydroponicSystem, on_delete=models.CASCADE)
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+    count = models.IntegerField()
+    data = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['system', 'start'], name='unique_measurement_block_start'),
+        ]
+
+class MeasurementSequence(models.Model):
+    """
+    The `(system, sequence)` keys of stored measurements, claimed by `writes.save_measurements`
+    before a measurement is inserted. They stay when `compress_measurements` moves the rows into
+    blocks, so a retried upload is still a duplicate then, and on a partitioned measurement
+    table (PostgreSQL, migration 0004), whose unique indexes must contain `timestamp`, also
+    when the server stamps the retry with a fresh one. `timestamp` is the reading's, for
+    deleting the keys together with their rows.
+    """
+    system = models.ForeignKey(HydroponicSystem, on_delete=models.CASCADE)
+    sequence = models.BigIntegerField()
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['system', 'sequence'], name='unique_measurement_sequence_key'),
+        ]
+        indexes = [
+            models.Index(fields=['timestamp'], name='measurement_sequence_ts_idx'),
+        ]
+
+class DeviceToken(models.Model):
+    """
+    Credential of a sensor for the line-protocol ingest server (`line_server`). Unlike the
+    owner's login token it only allows adding measurements to `system`, does not expire and
+    is revoked by deleting it. Only the SHA-256 of the key is stored; the key itself is shown
+    once, when the token is issued.
+    """
+    system = models.ForeignKey(HydroponicSystem, on_delete=models.CASCADE, related_name='device_tokens')
+    name = models.CharField(max_length=255)
+    key_hash = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @staticmethod
+    def hash_key(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, system, name):
+        """Create a token for `system` and return it with its key."""
+        key = secrets.token_urlsafe(32)
+        return cls.objects.create(system=system, name=name, key_hash=cls.hash_key(key)), key
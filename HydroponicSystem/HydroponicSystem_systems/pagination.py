@@ -0,0 +1,122 @@
+import base64
+import json
+from datetime import datetime
+from itertools import islice
+
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def keyset_filter(timestamp, pk, backwards=False):
+    """
+    Rows after `(timestamp, pk)` in `(timestamp, id)` order, or before it when `backwards`.
+
+    The redundant `timestamp >= ...` bound lets the database start the index range scan at
+    the cursor instead of filtering every earlier row of the system.
+    """
+    if backwards:
+        return Q(timestamp__lte=timestamp) & (Q(timestamp__lt=timestamp) | Q(id__lt=pk))
+    return Q(timestamp__gte=timestamp) & (Q(timestamp__gt=timestamp) | Q(id__gt=pk))
+
+
+class MeasurementCursorPagination(BasePagination):
+    """
+    Keyset pagination over `(timestamp, id)`.
+
+    A page is fetched with `WHERE (timestamp, id) > (last timestamp, last id) ORDER BY timestamp, id
+    LIMIT page_size + 1`, so every page costs the same no matter how deep it is, unlike
+    `OFFSET`. Cursors are opaque to clients: base64 of the boundary row, the sort order and
+    the direction. The total count is only computed when asked for with `count=true`.
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None, descending=False):
+        self.request = request
+        self.descending = descending
+        self.page_size = self.get_page_size(request)
+        self.count = queryset.count() if request.query_params.get("count") == "true" else None
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor["reverse"]
+        # walk backwards through the index for `desc`, and for `previous` links of `asc`
+        backwards = descending != reverse
+
+        position = cursor["position"] if cursor is not None else None
+
+        if isinstance(queryset, QuerySet):
+            if position is not None:
+                queryset = queryset.filter(keyset_filter(*position, backwards=backwards))
+            ordering = ("-timestamp", "-id") if backwards else ("timestamp", "id")
+            results = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        else:
+            # a blocks.MeasurementHistory, which applies the keyset to its blocks as well
+            results = list(islice(queryset.rows(descending=backwards, after=position), self.page_size + 1))
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = cursor is not None, has_more
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+        if page_size <= 0:
+            return api_settings.PAGE_SIZE
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            position = (datetime.fromisoformat(data["t"]), int(data["i"]))
+            descending, reverse = bool(data["d"]), bool(data["r"])
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise ParseError("Invalid cursor.")
+
+        if descending != self.descending:
+            raise ParseError("Cursor does not match 'sort_order'.")
+
+        return {"position": position, "reverse": reverse}
+
+    def encode_cursor(self, measurement, reverse):
+        data = {
+            "t": measurement.timestamp.isoformat(),
+            "i": measurement.id,
+            "d": int(self.descending),
+            "r": int(reverse),
+        }
+        encoded = base64.urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode()).decode("ascii")
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        response = {"next": self.get_next_link(), "previous": self.get_previous_link(), "results": data}
+        if self.count is not None:
+            response = {"count": self.count, **response}
+        return Response(response)
@@ -0,0 +1,113 @@
+import functools
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connections
+
+# Measurement._meta.db_table; monthly partitions are named <table>_pYYYYMM and rows outside
+# them land in <table>_default
+TABLE = "HydroponicSystem_systems_measurement"
+DEFAULT_PARTITION = f"{TABLE}_default"
+# MeasurementSequence._meta.db_table, the deduplication keys of the partitioned table
+SEQUENCE_TABLE = "HydroponicSystem_systems_measurementsequence"
+
+PARTITION_NAME = re.compile(rf"^{TABLE}_p(\d{{4}})(\d{{2}})$")
+
+
+@functools.lru_cache(maxsize=None)
+def is_partitioned(using="default"):
+    """
+    Whether the measurement table is a partitioned table (PostgreSQL after migration 0004).
+
+    Looked up once per database alias and process; the migration clears the cache.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))",
+            [f'"{TABLE}"'],
+        )
+        return cursor.fetchone()[0]
+
+
+def month_start(value):
+    """First instant of the UTC month of `value`."""
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def _literal(month):
+    # generated here, never user input; DDL such as ATTACH PARTITION cannot take parameters
+    return f"TIMESTAMPTZ '{month:%Y-%m-%d} 00:00:00+00'"
+
+
+def list_partitions(cursor):
+    """`{month: name}` of the monthly partitions attached to the measurement table."""
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(%s)",
+        [f'"{TABLE}"'],
+    )
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[datetime(int(match[1]), int(match[2]), 1, tzinfo=dt_timezone.utc)] = name
+    return partitions
+
+
+def create_partition(cursor, month):
+    """
+    Create and attach the partition of `month`.
+
+    Rows of that month already in the default partition are moved into it first, otherwise
+    ATTACH would fail. The temporary CHECK constraint lets ATTACH skip scanning the new table.
+    """
+    name = partition_name(month)
+    start, end = _literal(month), _literal(add_months(month, 1))
+    cursor.execute(f'CREATE TABLE "{name}" (LIKE "{TABLE}" INCLUDING DEFAULTS)')
+    cursor.execute(
+        f'ALTER TABLE "{name}" ADD CONSTRAINT "{name}_range" '
+        f'CHECK ("timestamp" >= {start} AND "timestamp" < {end})'
+    )
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" WHERE "timestamp" >= {start} AND "timestamp" < {end} '
+        f'RETURNING *) INSERT INTO "{name}" SELECT * FROM moved'
+    )
+    cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{name}" FOR VALUES FROM ({start}) TO ({end})')
+    cursor.execute(f'ALTER TABLE "{name}" DROP CONSTRAINT "{name}_range"')
+    return name
+
+
+def partition_system_ids(cursor, month):
+    """The ids of the systems with measurements in the partition of `month`."""
+    cursor.execute(f'SELECT DISTINCT "system_id" FROM "{partition_name(month)}"')
+    return [system_id for (system_id,) in cursor.fetchall()]
+
+
+def detach_partition(cursor, month, drop=False):
+    """
+    Detach the partition of `month` from the measurement table, keeping it as a standalone
+    table unless `drop` is set. Its rows disappear from every query, and so do their
+    `MeasurementSequence` keys; rollups are not touched.
+    """
+    name = partition_name(month)
+    cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+    cursor.execute(
+        f'DELETE FROM "{SEQUENCE_TABLE}" WHERE "timestamp" >= {_literal(month)} '
+        f'AND "timestamp" < {_literal(add_months(month, 1))}'
+    )
+    if drop:
+        cursor.execute(f'DROP TABLE "{name}"')
+    return name
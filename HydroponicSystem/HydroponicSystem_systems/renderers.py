@@ -0,0 +1,182 @@
+import csv
+import io
+import json
+from abc import ABC, abstractmethod
+
+import numpy as np
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class EncodedList(list):
+    """
+    A JSON array that is already encoded, copied as-is into the output by `MeasurementJSONRenderer`.
+
+    To Python code (tests, the browsable API) it is the decoded list, which is only built on
+    first access.
+    """
+    def __init__(self, encoded):
+        super().__init__()
+        self.encoded = encoded
+        self.decoded = False
+
+    def decode(self):
+        if not self.decoded:
+            self.decoded = True
+            self.extend(json.loads(self.encoded))
+        return self
+
+    def __len__(self):
+        return list.__len__(self.decode())
+
+    def __iter__(self):
+        return list.__iter__(self.decode())
+
+    def __reversed__(self):
+        return list.__reversed__(self.decode())
+
+    def __getitem__(self, index):
+        return list.__getitem__(self.decode(), index)
+
+    def __contains__(self, value):
+        return list.__contains__(self.decode(), value)
+
+    def __eq__(self, other):
+        return list.__eq__(self.decode(), other)
+
+    def __ne__(self, other):
+        return list.__ne__(self.decode(), other)
+
+    def __repr__(self):
+        return list.__repr__(self.decode())
+
+
+class MeasurementJSONRenderer(JSONRenderer):
+    """
+    `JSONRenderer` for responses whose bulk is pre-encoded, like the pages built with
+    `serializers.encode_measurements`.
+
+    `EncodedList` values of a top-level dict are copied into the output instead of being encoded
+    again; the remaining values (`count`, `next`, ...) are encoded with orjson when it is
+    installed. Floats always go through `json`, because orjson writes exponents differently
+    (`1e-5` instead of `1e-05`). Anything else is rendered exactly like `JSONRenderer`, as is
+    output with `COMPACT_JSON` off or an `indent`.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, dict) or not any(isinstance(value, EncodedList) for value in data.values()):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if not self.compact or self.get_indent(accepted_media_type, renderer_context or {}):
+            data = {key: list(value) if isinstance(value, EncodedList) else value for key, value in data.items()}
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return b"{" + b",".join(
+            self._encode(key) + b":" + (value.encoded if isinstance(value, EncodedList) else self._encode(value))
+            for key, value in data.items()
+        ) + b"}"
+
+    def _encode(self, value):
+        if orjson is not None and not self.ensure_ascii and type(value) in (str, int, bool, type(None)):
+            encoded = orjson.dumps(value)
+        else:
+            encoded = json.dumps(
+                value, cls=self.encoder_class, ensure_ascii=self.ensure_ascii,
+                allow_nan=not self.strict, separators=(",", ":"),
+            ).encode()
+        # like JSONRenderer, which escapes them for JavaScript
+        return encoded.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """
+    Compact JSON for `format=columnar` responses, whose columns are lists or NumPy arrays
+    (see `columnar.to_columns`).
+
+    float32 arrays are written with the shortest digits that round-trip in single precision,
+    so `22.123456789` becomes `22.123457`. Uses orjson when it is installed.
+    """
+    format = "columnar"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if orjson is not None:
+            return orjson.dumps(data, default=self._default, option=orjson.OPT_SERIALIZE_NUMPY)
+        return json.dumps(
+            data, default=self._default, ensure_ascii=self.ensure_ascii,
+            allow_nan=not self.strict, separators=(",", ":"),
+        ).encode()
+
+    def _default(self, obj):
+        if isinstance(obj, np.ndarray):
+            if obj.dtype == np.float32:
+                # str() of a float32 gives its shortest round-tripping digits
+                return [float(str(value)) for value in obj]
+            return obj.tolist()
+        return self.encoder_class().default(obj)
+
+
+class _RowRenderer(BaseRenderer, ABC):
+    """
+    Renderer for flat records that can also produce its output incrementally.
+
+    `stream(columns, rows)` yields encoded chunks of `chunk_size` rows for a
+    `StreamingHttpResponse`; `render` handles in-memory lists of dicts.
+    """
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        records = data if isinstance(data, list) else [data]
+        columns = list(records[0]) if records else []
+        return b"".join(self.stream(columns, ([record.get(column) for column in columns] for record in records)))
+
+    @abstractmethod
+    def stream(self, columns, rows, chunk_size=1000):
+        """Yield the header, if the format has one, and the encoded rows, `chunk_size` at a time."""
+
+
+class CSVRenderer(_RowRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+    def stream(self, columns, rows, chunk_size=1000):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(columns)
+        # the header goes out before the first row is read
+        yield buffer.getvalue().encode(self.charset)
+
+        for chunk in _chunks(rows, chunk_size):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(chunk)
+            yield buffer.getvalue().encode(self.charset)
+
+
+class NDJSONRenderer(_RowRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def stream(self, columns, rows, chunk_size=1000):
+        encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+        for chunk in _chunks(rows, chunk_size):
+            yield "".join(
+                encoder.encode(dict(zip(columns, row))) + "\n" for row in chunk
+            ).encode(self.charset)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
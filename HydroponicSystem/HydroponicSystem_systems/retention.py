@@ -0,0 +1,154 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from .latest import forget_latest_measurements
+from .blocks import day_start
+from .models import Measurement, MeasurementBlock, MeasurementCompaction, MeasurementSequence
+from .rollups import rebuild_rollups
+from .series import forget_series
+from .versions import bump_versions
+
+
+def _settings():
+    return getattr(settings, 'MEASUREMENT_RETENTION', {})
+
+
+def batch_size():
+    return _settings().get('BATCH_SIZE', 5000)
+
+
+def retention_days(system):
+    """Days the raw measurements of `system` are kept, or None to keep them forever."""
+    if system.raw_retention_days is not None:
+        return system.raw_retention_days
+    return _settings().get('RAW_DAYS', 90)
+
+
+def retention_cutoff(system, now=None):
+    """
+    Start of the UTC day `retention_days` before `now`; raw measurements before it are expired.
+
+    Cutoffs fall on day boundaries so that compaction never splits an hourly or daily bucket.
+    """
+    days = retention_days(system)
+    if days is None:
+        return None
+    return day_start((now or timezone.now()) - timedelta(days=days))
+
+
+def compact_system(system, cutoff, size=None):
+    """
+    Fold the raw measurements of `system` before `cutoff` into the rollups and delete them.
+
+    The rollup buckets before `cutoff` are first recomputed from the raw rows, so they hold
+    exact count/sum/min/max summaries even for readings written without `save_measurements`.
+    The raw rows are then deleted `size` at a time, one short transaction per batch, and
+    the compressed blocks before `cutoff` with them.
+
+    Progress is kept in the system's `MeasurementCompaction`: when a run dies while deleting,
+    the next one finishes deleting up to the folded cutoff before folding anything new, so
+    summaries are never recomputed from half-deleted buckets.
+
+    Returns `(rows, bytes)` deleted; bytes is None where the database cannot tell.
+    """
+    size = size or batch_size()
+    checkpoint, _ = MeasurementCompaction.objects.get_or_create(system=system)
+    rows, freed = 0, 0
+
+    if checkpoint.folded_before is not None and (
+        checkpoint.compacted_before is None or checkpoint.folded_before > checkpoint.compacted_before
+    ):
+        rows, freed = _delete_before(system.id, checkpoint.folded_before, size)
+        checkpoint.compacted_before = checkpoint.folded_before
+        checkpoint.save(update_fields=["compacted_before"])
+
+    if cutoff is not None and (checkpoint.compacted_before is None or cutoff > checkpoint.compacted_before):
+        oldest = (
+            Measurement.objects.filter(system=system, timestamp__lt=cutoff)
+            .order_by("timestamp").values_list("timestamp", flat=True).first()
+        )
+        with transaction.atomic():
+            if oldest is not None:
+                # from the oldest raw reading, not from the beginning of time: buckets whose rows
+                # were removed some other way (e.g. a detached partition) keep their summaries
+                start = day_start(oldest)
+                if checkpoint.compacted_before is not None:
+                    start = max(start, checkpoint.compacted_before)
+                rebuild_rollups([system.id], start=start, end=cutoff)
+            checkpoint.folded_before = cutoff
+            checkpoint.save(update_fields=["folded_before"])
+
+        deleted, deleted_bytes = _delete_before(system.id, cutoff, size)
+        rows += deleted
+        freed = None if freed is None or deleted_bytes is None else freed + deleted_bytes
+        # compressed days are whole days, so blocks before a day-aligned cutoff expire entirely
+        blocks = MeasurementBlock.objects.filter(system=system, start__lt=cutoff)
+        expired = blocks.aggregate(rows=Sum("count"), size=Sum(Length("data")))
+        if expired["rows"]:
+            blocks.delete()
+            rows += expired["rows"]
+            freed = None if freed is None else freed + expired["size"]
+        checkpoint.compacted_before = cutoff
+        checkpoint.save(update_fields=["compacted_before"])
+
+    if rows:
+        forget_latest_measurements([system.id])
+        forget_series([system.id])
+        bump_versions("system", [system.id])
+    return rows, freed
+
+
+def _delete_before(system_id, before, size):
+    """Delete the raw measurements of a system before `before` in batches of `size` rows."""
+    quote_name = connection.ops.quote_name
+    table = quote_name(Measurement._meta.db_table)
+    pk, timestamp, system = quote_name("id"), quote_name("timestamp"), quote_name("system_id")
+    # timestamp is in the key so that partitioned tables prune to the partitions involved
+    select = (
+        f"SELECT {pk}, {timestamp} FROM {table} WHERE {system} = %s AND {timestamp} < %s "
+        f"ORDER BY {timestamp}, {pk} LIMIT %s"
+    )
+    delete = f"DELETE FROM {table} WHERE ({pk}, {timestamp}) IN ({select})"
+    if connection.vendor == "postgresql":
+        # the size of each row as stored, i.e. the heap space VACUUM hands back for new rows
+        delete = (
+            f"WITH deleted AS ({delete} RETURNING pg_column_size({table}.*) AS size) "
+            f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM deleted"
+        )
+    params = [system_id, Measurement._meta.get_field("timestamp").get_db_prep_value(before, connection), size]
+
+    rows, freed = 0, 0 if connection.vendor == "postgresql" else None
+    used_before = _sqlite_used_bytes() if connection.vendor == "sqlite" else None
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(delete, params)
+            if connection.vendor == "postgresql":
+                deleted, deleted_bytes = cursor.fetchone()
+                freed += deleted_bytes
+            else:
+                deleted = cursor.rowcount
+        rows += deleted
+        if deleted < size:
+            break
+
+    # the deduplication keys go with their rows
+    MeasurementSequence.objects.filter(system_id=system_id, timestamp__lt=before).delete()
+
+    if used_before is not None:
+        freed = max(used_before - _sqlite_used_bytes(), 0)
+    return rows, freed
+
+
+def _sqlite_used_bytes():
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA page_count")
+        pages = cursor.fetchone()[0]
+        cursor.execute("PRAGMA freelist_count")
+        pages -= cursor.fetchone()[0]
+        cursor.execute("PRAGMA page_size")
+        return pages * cursor.fetchone()[0]
@@ -0,0 +1,232 @@
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Count, Exists, FloatField, Max, Min, OuterRef, Q, Sum
+from django.db.models.functions import Cast
+
+from .aggregation import METRICS, DateBin
+from .blocks import MeasurementHistory
+from .models import Measurement, MeasurementBlock, MeasurementCompaction, MeasurementDaily, MeasurementHourly
+
+# coarsest first
+ROLLUPS = (
+    (MeasurementDaily, 24 * 60 * 60),
+    (MeasurementHourly, 60 * 60),
+)
+
+STATS = ("sum", "sum_sq", "min", "max")
+COLUMNS = ["count"] + [f"{metric}_{stat}" for metric in METRICS for stat in STATS]
+INTEGER_COLUMNS = {"count", "tds_min", "tds_max"}
+
+
+def _summarize(system_ids, epochs, values, seconds):
+    """
+    Per-(system, bucket) count, sum, sum of squares, min and max of every metric column.
+
+    Keys come back sorted; upserting in that fixed order keeps concurrent batches that touch
+    the same buckets from deadlocking.
+    """
+    keys = np.stack([system_ids, epochs // seconds * seconds], axis=1)
+    keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    order = np.argsort(inverse, kind="stable")
+    starts = np.flatnonzero(np.r_[True, np.diff(inverse[order]) != 0])
+
+    summaries = [np.bincount(inverse, minlength=len(keys))]
+    for column in values:
+        sorted_column = column[order]
+        summaries.append(np.bincount(inverse, weights=column, minlength=len(keys)))
+        summaries.append(np.bincount(inverse, weights=column * column, minlength=len(keys)))
+        summaries.append(np.minimum.reduceat(sorted_column, starts))
+        summaries.append(np.maximum.reduceat(sorted_column, starts))
+
+    return keys.tolist(), np.stack(summaries, axis=1).tolist()
+
+
+def _upsert(model, keys, summaries):
+    opts = model._meta
+    quote_name = connection.ops.quote_name
+    table = quote_name(opts.db_table)
+    bucket_field = opts.get_field("bucket")
+    columns = ["system_id", "bucket"] + COLUMNS
+    least, greatest = ("MIN", "MAX") if connection.vendor == "sqlite" else ("LEAST", "GREATEST")
+
+    updates = []
+    for column in COLUMNS:
+        quoted = quote_name(column)
+        if column.endswith("_min"):
+            updates.append(f"{quoted} = {least}({table}.{quoted}, EXCLUDED.{quoted})")
+        elif column.endswith("_max"):
+            updates.append(f"{quoted} = {greatest}({table}.{quoted}, EXCLUDED.{quoted})")
+        else:
+            updates.append(f"{quoted} = {table}.{quoted} + EXCLUDED.{quoted}")
+
+    row_placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    sql = (
+        f"INSERT INTO {table} ({', '.join(quote_name(column) for column in columns)}) VALUES {{values}} "
+        f"ON CONFLICT ({quote_name('system_id')}, {quote_name('bucket')}) DO UPDATE SET {', '.join(updates)}"
+    )
+    batch_size = max(connection.ops.bulk_batch_size(columns, keys), 1)
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(keys), batch_size):
+            params = []
+            for (system_id, epoch), summary in zip(keys[start:start + batch_size], summaries[start:start + batch_size]):
+                bucket = datetime.fromtimestamp(epoch, tz=dt_timezone.utc)
+                params.extend([system_id, bucket_field.get_db_prep_save(bucket, connection)])
+                params.extend(
+                    int(value) if column in INTEGER_COLUMNS else value for column, value in zip(COLUMNS, summary)
+                )
+            rows = len(params) // len(columns)
+            cursor.execute(sql.format(values=", ".join([row_placeholder] * rows)), params)
+
+
+def update_rollups(rows):
+    """
+    Add `(system_id, timestamp, ph, temperature, tds)` rows to the hourly and daily rollups.
+
+    Rows are summarized per bucket with NumPy and merged with one
+    `INSERT ... ON CONFLICT DO UPDATE` per rollup and batch, which adds counts and sums and
+    keeps the smaller minimum and larger maximum, so batches and out-of-order readings can
+    be applied in any order. Must run in the transaction that inserted the rows.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+
+    system_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    epochs = np.fromiter((row[1].timestamp() for row in rows), dtype=np.float64, count=len(rows))
+    epochs = np.floor(epochs).astype(np.int64)
+    values = [
+        np.fromiter((row[index] for row in rows), dtype=np.float64, count=len(rows))
+        for index in range(2, 5)
+    ]
+
+    for model, seconds in reversed(ROLLUPS):
+        _upsert(model, *_summarize(system_ids, epochs, values, seconds))
+
+
+def rebuild_rollups(system_ids=None, start=None, end=None):
+    """
+    Recompute the rollups of `system_ids` (all systems when None) from the raw measurements.
+
+    Each rollup is deleted and refilled with one `INSERT ... SELECT ... GROUP BY` inside the
+    database. `start` and `end` limit the rebuild to the buckets in `[start, end)`; they must
+    be on day boundaries. Buckets before a system's `MeasurementCompaction.compacted_before`
+    or in a day moved into a `MeasurementBlock` are never touched, since their raw
+    measurements are gone. Returns the number of rollup rows written per model name.
+    """
+    written = {}
+    quote_name = connection.ops.quote_name
+
+    for model, seconds in ROLLUPS:
+        aggregates = {"count": Count("id")}
+        for metric in METRICS:
+            value = Cast(metric, FloatField())
+            aggregates[f"{metric}_sum"] = Sum(value)
+            aggregates[f"{metric}_sum_sq"] = Sum(value * value)
+            aggregates[f"{metric}_min"] = Min(metric)
+            aggregates[f"{metric}_max"] = Max(metric)
+
+        measurements = Measurement.objects.exclude(Exists(MeasurementCompaction.objects.filter(
+            system=OuterRef("system"), compacted_before__gt=OuterRef("timestamp"),
+        ))).exclude(Exists(MeasurementBlock.objects.filter(
+            system=OuterRef("system"), start__lte=OuterRef("timestamp"), end__gt=OuterRef("timestamp"),
+        )))
+        rollups = model.objects.exclude(Exists(MeasurementCompaction.objects.filter(
+            system=OuterRef("system"), compacted_before__gt=OuterRef("bucket"),
+        ))).exclude(Exists(MeasurementBlock.objects.filter(
+            system=OuterRef("system"), start__lte=OuterRef("bucket"), end__gt=OuterRef("bucket"),
+        )))
+        if system_ids is not None:
+            measurements = measurements.filter(system_id__in=system_ids)
+            rollups = rollups.filter(system_id__in=system_ids)
+        if start is not None:
+            measurements = measurements.filter(timestamp__gte=start)
+            rollups = rollups.filter(bucket__gte=start)
+        if end is not None:
+            measurements = measurements.filter(timestamp__lt=end)
+            rollups = rollups.filter(bucket__lt=end)
+
+        summaries = (
+            measurements
+            .annotate(rollup_bucket=DateBin("timestamp", seconds))
+            .values("system_id", "rollup_bucket")
+            .annotate(**aggregates)
+            .order_by()
+        )
+        select_sql, params = summaries.query.sql_with_params()
+        columns = ["system_id", "bucket"] + list(aggregates)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            rollups.delete()
+            cursor.execute(
+                f"INSERT INTO {quote_name(model._meta.db_table)} "
+                f"({', '.join(quote_name(column) for column in columns)}) {select_sql}",
+                params,
+            )
+            written[model.__name__] = cursor.rowcount
+
+    return written
+
+
+def find_rollup(seconds, lookups):
+    """
+    Return `(model, width)` of the coarsest rollup that can answer a `seconds`-wide aggregation
+    with the given filter lookups, or None when the raw measurements must be read.
+
+    Rollups only know time buckets, so any value filter (`ph__gte`, ...) rules them out, and
+    timestamp bounds must fall on bucket boundaries.
+    """
+    if not set(lookups) <= {"timestamp__gte", "timestamp__lte"}:
+        return None
+
+    for model, width in ROLLUPS:
+        if seconds % width:
+            continue
+        if all(int(bound.timestamp()) % width == 0 for bound in lookups.values()):
+            return model, width
+    return None
+
+
+def aggregate_rollup(model, system, seconds, lookups, descending=False, limit=None):
+    """
+    Aggregate the `model` rollup of `system` into `seconds`-wide buckets.
+
+    Returns dicts in the format of `aggregation.aggregate_measurements`, at most `limit` of
+    them. `timestamp__lte` is inclusive on raw timestamps, so readings at exactly that
+    instant are read from the raw table and added as a bucket of their own.
+    """
+    filters = Q(system=system)
+    if "timestamp__gte" in lookups:
+        filters &= Q(bucket__gte=lookups["timestamp__gte"])
+    if "timestamp__lte" in lookups:
+        filters &= Q(bucket__lt=lookups["timestamp__lte"])
+
+    aggregates = {}
+    for metric in METRICS:
+        aggregates[f"{metric}_min"] = Min(f"{metric}_min")
+        aggregates[f"{metric}_max"] = Max(f"{metric}_max")
+        aggregates[f"{metric}_avg"] = Cast(Sum(f"{metric}_sum"), FloatField()) / Cast(Sum("count"), FloatField())
+    # last, so that "count" above still refers to the column and not to this annotation
+    aggregates["count"] = Sum("count")
+
+    queryset = (
+        model.objects.filter(filters)
+        .annotate(rollup_bucket=DateBin("bucket", seconds))
+        .values("rollup_bucket")
+        .annotate(**aggregates)
+        .order_by("-rollup_bucket" if descending else "rollup_bucket")
+    )
+    buckets = list(queryset if limit is None else queryset[:limit])
+    for bucket in buckets:
+        bucket["bucket"] = bucket.pop("rollup_bucket")
+
+    if "timestamp__lte" in lookups:
+        edge = MeasurementHistory(
+            system.id, {**lookups, "timestamp__gte": lookups["timestamp__lte"]},
+        ).aggregate(seconds)
+        buckets = edge + buckets if descending else buckets + edge
+
+    return buckets if limit is None else buckets[:limit]
@@ -1,5 +1,14 @@
-from rest_framework.serializers import ModelSerializer
-from .models import HydroponicSystem, Measurement
+from rest_framework.serializers import (
+    ModelSerializer, ListSerializer, Serializer, IntegerField, FloatField, DateTimeField,
+)
+from rest_framework.exceptions import ValidationError
+from rest_framework import ISO_8601
+from rest_framework.settings import api_settings
+from django.utils import timezone
+from .models import DeviceToken, HydroponicSystem, Measurement
+from .renderers import EncodedList
+from .writes import save_measurements
+from .validation import validate_rows, iter_validated
 
 class HydroponicSystemSerializer(ModelSerializer):
     class Meta:
@@ -7,8 +16,110 @@ class HydroponicSystemSerializer(ModelSerializer):
         fields = '__all__'
         read_only_fields = ['owner', 'created_at']
 
+class DeviceTokenSerializer(ModelSerializer):
+    class Meta:
+        model = DeviceToken
+        fields = ['id', 'name', 'created_at']
+        read_only_fields = ['created_at']
+
+class MeasurementListSerializer(ListSerializer):
+    """
+    Validates a batch of measurements and writes it with a single bulk insert.
+
+    Rows are validated together, column by column, by `validation.validate_rows`, which
+    reports the same errors as validating each row with `MeasurementSerializer`.
+
+    With `best_effort` set in the serializer context, invalid rows do not fail
+    the whole batch: they are collected in `rejected` as
+    `{"index": ..., "errors": ...}` and only the valid rows are saved.
+
+    `timestamp` is read-only; rows that carry their own, such as the readings of a binary
+    upload, pass them as the `timestamps` list in the context, one per row.
+    """
+    def run_child_validation(self, data):
+        return data
+
+    def to_internal_value(self, data):
+        rows = super().to_internal_value(data)
+        columns, nulls, errors = validate_rows(rows)
+        self.rejected = [{"index": index, "errors": errors[index]} for index in sorted(errors)]
+
+        if errors and not self.context.get("best_effort"):
+            raise ValidationError([errors.get(index, {}) for index in range(len(rows))])
+
+        timestamps = self.context.get("timestamps")
+        if timestamps is None:
+            return [attrs for _, attrs in iter_validated(columns, nulls, errors)]
+        return [{**attrs, "timestamp": timestamps[index]} for index, attrs in iter_validated(columns, nulls, errors)]
+
+    def create(self, validated_data):
+        measurements = [Measurement.from_reading(**attrs) for attrs in validated_data]
+        self.duplicates = save_measurements(measurements)
+        return measurements
+
 class MeasurementSerializer(ModelSerializer):
+    sequence = IntegerField(required=False, allow_null=True, min_value=0)
+
     class Meta:
         model = Measurement
         fields = '__all__'
-        read_only_fields = ['system', 'timestamp']
\ No newline at end of file
+        read_only_fields = ['system', 'timestamp']
+        list_serializer_class = MeasurementListSerializer
+        # (system, sequence) uniqueness is enforced by the database with ON CONFLICT DO NOTHING
+        # instead of a read-before-write UniqueTogetherValidator
+        validators = []
+
+    def create(self, validated_data):
+        measurement = Measurement(**validated_data)
+        self.duplicate = bool(save_measurements([measurement]))
+        return measurement
+
+# values_list() columns read by encode_measurements, in MeasurementSerializer's field order
+MEASUREMENT_VALUES = ("id", "sequence", "timestamp", "ph", "temperature", "tds", "system_id")
+MEASUREMENT_TEMPLATE = '{"id":%d,"sequence":%s,"timestamp":"%s","ph":%r,"temperature":%r,"tds":%d,"system":%d}'
+
+def encode_measurements(rows):
+    """
+    Read-only fast path of `MeasurementSerializer(rows, many=True).data` rendered as JSON.
+
+    `rows` are `values_list(*MEASUREMENT_VALUES)` tuples. Each one is formatted with a single
+    string template instead of building field objects and a dict per row. Floats are written
+    with `repr` and timestamps like the serializer's `DateTimeField`, so the bytes are the same
+    as `JSONRenderer` produces for the serializer data.
+    """
+    to_timestamp = timestamp_formatter()
+    return EncodedList(("[" + ",".join([
+        MEASUREMENT_TEMPLATE % (
+            pk, "null" if sequence is None else sequence, to_timestamp(timestamp),
+            float(ph), float(temperature), tds, system_id,
+        )
+        for pk, sequence, timestamp, ph, temperature, tds, system_id in rows
+    ]) + "]").encode())
+
+def timestamp_formatter():
+    """`DateTimeField.to_representation` with the time zone and format looked up once, not per row."""
+    field = DateTimeField()
+    field_timezone = field.default_timezone()
+    if api_settings.DATETIME_FORMAT is None or api_settings.DATETIME_FORMAT.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def to_representation(value):
+        if timezone.is_naive(value):
+            return field.to_representation(value)
+        text = value.astimezone(field_timezone).isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    return to_representation
+
+class MeasurementBucketSerializer(Serializer):
+    """One time bucket of `aggregation.aggregate_measurements`."""
+    timestamp = DateTimeField(source="bucket")
+    count = IntegerField()
+    ph_min = FloatField()
+    ph_max = FloatField()
+    ph_avg = FloatField()
+    temperature_min = FloatField()
+    temperature_max = FloatField()
+    temperature_avg = FloatField()
+    tds_min = IntegerField()
+    tds_max = IntegerField()
+    tds_avg = FloatField()
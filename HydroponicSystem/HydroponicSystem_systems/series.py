@@ -0,0 +1,324 @@
+import json
+import logging
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from numpy.lib.format import open_memmap
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .blocks import MeasurementHistory
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+# timestamps are integer microseconds since the Unix epoch, like in downsampling
+FIELDS = (
+    ("id", np.int64),
+    ("timestamp", np.int64),
+    ("ph", np.float64),
+    ("temperature", np.float64),
+    ("tds", np.int64),
+)
+MIN_CAPACITY = 4096
+
+
+def _root():
+    root = getattr(settings, 'MEASUREMENT_SERIES', {}).get('ROOT')
+    # appends are serialized with flock, which only exists on POSIX systems
+    return Path(root) if root and fcntl is not None else None
+
+
+def enabled():
+    return _root() is not None
+
+
+def _to_micros(value):
+    return (value - EPOCH) // MICROSECOND
+
+
+class Series:
+    """
+    Read-only, memory-mapped columns of the measurements of one system in `(timestamp, id)` order.
+
+    `series["ph"]` and friends are views into the `.npy` files; slicing them, or the whole
+    series with `between`, copies nothing.
+    """
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns["id"])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def between(self, start=None, end=None):
+        """The rows with `start <= timestamp <= end`; either bound may be None."""
+        times = self.columns["timestamp"]
+        first = 0 if start is None else int(np.searchsorted(times, _to_micros(start), side="left"))
+        last = len(times) if end is None else int(np.searchsorted(times, _to_micros(end), side="right"))
+        return Series({name: column[first:last] for name, column in self.columns.items()})
+
+
+def _meta_path(root, system_id):
+    return root / f"{system_id}.json"
+
+
+def _directory(root, system_id, generation):
+    return root / f"{system_id}-{generation}"
+
+
+def _read_meta(root, system_id):
+    try:
+        with open(_meta_path(root, system_id)) as meta_file:
+            return json.load(meta_file)
+    except FileNotFoundError:
+        return None
+
+
+def _write_meta(root, system_id, meta):
+    # readers see either the old or the new file, never a partial one
+    path = _meta_path(root, system_id)
+    temporary = path.with_name(f"{path.name}.{uuid.uuid4().hex}")
+    with open(temporary, "w") as meta_file:
+        json.dump(meta, meta_file)
+    os.replace(temporary, path)
+
+
+@contextmanager
+def _locked(root, system_id):
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / f"{system_id}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def open_series(system_id):
+    """The cached `Series` of a system, or None when it has not been built or was invalidated."""
+    root = _root()
+    meta = root and _read_meta(root, system_id)
+    if not meta:
+        return None
+    directory = _directory(root, system_id, meta["generation"])
+    try:
+        columns = {
+            name: np.load(directory / f"{name}.npy", mmap_mode="r")[:meta["length"]] for name, _ in FIELDS
+        }
+    except FileNotFoundError:
+        # replaced by a rebuild since the metadata was read
+        return None
+    return Series(columns)
+
+
+def load_series(system_id, chunk_size=10000):
+    """The cached `Series` of a system, built from the database first if needed."""
+    series = open_series(system_id)
+    if series is None:
+        build_series(system_id, chunk_size=chunk_size)
+        series = open_series(system_id)
+    return series
+
+
+class _Writer:
+    """Columns of one generation being filled; moves to a larger new generation when full."""
+    def __init__(self, root, system_id, generation, columns, length):
+        self.root = root
+        self.system_id = system_id
+        self.generation = generation
+        self.columns = columns
+        self.length = length
+        # the generation the metadata points to, if any
+        self.published = None
+
+    @classmethod
+    def create(cls, root, system_id, capacity):
+        generation, columns = cls._allocate(root, system_id, capacity)
+        return cls(root, system_id, generation, columns, 0)
+
+    @classmethod
+    def reopen(cls, root, system_id, meta):
+        directory = _directory(root, system_id, meta["generation"])
+        columns = {name: open_memmap(directory / f"{name}.npy", mode="r+") for name, _ in FIELDS}
+        writer = cls(root, system_id, meta["generation"], columns, meta["length"])
+        writer.published = meta["generation"]
+        return writer
+
+    @staticmethod
+    def _allocate(root, system_id, capacity):
+        generation = uuid.uuid4().hex
+        directory = _directory(root, system_id, generation)
+        directory.mkdir(parents=True)
+        columns = {
+            name: open_memmap(directory / f"{name}.npy", mode="w+", dtype=dtype, shape=(max(capacity, MIN_CAPACITY),))
+            for name, dtype in FIELDS
+        }
+        return generation, columns
+
+    def extend(self, arrays):
+        size = len(arrays["id"])
+        if self.length + size > len(self.columns["id"]):
+            # the old generation stays valid for readers until commit() publishes this one
+            generation, columns = self._allocate(
+                self.root, self.system_id, max(2 * len(self.columns["id"]), self.length + size),
+            )
+            for name, column in columns.items():
+                column[:self.length] = self.columns[name][:self.length]
+            if self.generation != self.published:
+                shutil.rmtree(_directory(self.root, self.system_id, self.generation), ignore_errors=True)
+            self.generation, self.columns = generation, columns
+        for name, column in self.columns.items():
+            column[self.length:self.length + size] = arrays[name]
+        self.length += size
+
+    def commit(self):
+        """Flush the columns and publish them; the previous generation is removed."""
+        for column in self.columns.values():
+            column.flush()
+        previous = _read_meta(self.root, self.system_id)
+        _write_meta(self.root, self.system_id, {"generation": self.generation, "length": self.length})
+        if previous and previous["generation"] != self.generation:
+            # processes that still map the old files keep reading them until they close them
+            shutil.rmtree(_directory(self.root, self.system_id, previous["generation"]), ignore_errors=True)
+
+
+def _arrays(rows):
+    return {
+        name: np.fromiter(
+            ((row[index] if name != "timestamp" else _to_micros(row[index])) for row in rows),
+            dtype=dtype, count=len(rows),
+        )
+        for index, (name, dtype) in enumerate(FIELDS)
+    }
+
+
+def build_series(system_id, chunk_size=10000):
+    """
+    (Re)build the series cache of a system from the database and return its number of rows.
+
+    Rows committed while it runs are either read by the query or appended by their own
+    `append_series` afterwards, which waits for the lock and skips the rows already present.
+    """
+    root = _root()
+    with _locked(root, system_id):
+        history = MeasurementHistory(system_id)
+        writer = _Writer.create(root, system_id, history.count())
+        chunk = []
+        for row in history.rows(chunk_size=chunk_size):
+            chunk.append(tuple(getattr(row, name) for name, _ in FIELDS))
+            if len(chunk) >= chunk_size:
+                writer.extend(_arrays(chunk))
+                chunk = []
+        if chunk:
+            writer.extend(_arrays(chunk))
+        writer.commit()
+        return writer.length
+
+
+def _remove(root, system_id):
+    meta = _read_meta(root, system_id)
+    if meta:
+        os.remove(_meta_path(root, system_id))
+        shutil.rmtree(_directory(root, system_id, meta["generation"]), ignore_errors=True)
+
+
+def _append(root, system_id, arrays):
+    with _locked(root, system_id):
+        meta = _read_meta(root, system_id)
+        if not meta:
+            # not built yet; the first read builds it from the database
+            return
+        writer = _Writer.reopen(root, system_id, meta)
+        order = np.lexsort((arrays["id"], arrays["timestamp"]))
+        arrays = {name: values[order] for name, values in arrays.items()}
+
+        if writer.length:
+            times = writer.columns["timestamp"][:writer.length]
+            ids = writer.columns["id"][:writer.length]
+            last_time, last_id = times[-1], ids[-1]
+            new = (arrays["timestamp"] > last_time) | ((arrays["timestamp"] == last_time) & (arrays["id"] > last_id))
+            for time, pk in zip(arrays["timestamp"][~new], arrays["id"][~new]):
+                first, last = np.searchsorted(times, time, side="left"), np.searchsorted(times, time, side="right")
+                if pk not in ids[first:last]:
+                    # an older reading: the series would have to be rewritten, so it is rebuilt on the next read
+                    _remove(root, system_id)
+                    return
+            arrays = {name: values[new] for name, values in arrays.items()}
+
+        if len(arrays["id"]):
+            writer.extend(arrays)
+            writer.commit()
+
+
+def append_series(measurements):
+    """
+    Add newly inserted `measurements` to the series caches of their systems once the
+    transaction commits.
+
+    Readings newer than the cached ones are appended in place. An older reading cannot be
+    appended, so it invalidates the system's series instead, and so does a reading without a
+    primary key (a backend or write path that does not return them). Systems without a cache
+    are skipped; it is built on the first read.
+    """
+    root = _root()
+    if root is None:
+        return
+    by_system = {}
+    for measurement in measurements:
+        by_system.setdefault(measurement.system_id, []).append(
+            tuple(getattr(measurement, name) for name, _ in FIELDS)
+        )
+
+    def append():
+        for system_id, rows in by_system.items():
+            if any(row[0] is None for row in rows):
+                with _locked(root, system_id):
+                    _remove(root, system_id)
+                continue
+            try:
+                _append(root, system_id, _arrays(rows))
+            except Exception:
+                logger.exception("Appending to the measurement series of system %s failed", system_id)
+                # a cache missing these rows must not be read again
+                with _locked(root, system_id):
+                    _remove(root, system_id)
+
+    if by_system:
+        # the measurements are saved by then; a failing cache must not fail the request
+        transaction.on_commit(append, robust=True)
+
+
+def forget_series(system_ids=None):
+    """
+    Drop the series caches of `system_ids` (every cached system when None) once the current
+    transaction commits. Needed whenever measurements are deleted or written without
+    `save_measurements`.
+    """
+    root = _root()
+    if root is None:
+        return
+
+    def forget():
+        ids = system_ids
+        if ids is None:
+            ids = [path.stem for path in root.glob("*.json")] if root.exists() else []
+        for system_id in ids:
+            with _locked(root, system_id):
+                _remove(root, system_id)
+
+    transaction.on_commit(forget, robust=True)
@@ -0,0 +1,163 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from rest_framework.exceptions import ParseError
+
+from .aggregation import METRICS
+from .filters import parse_number
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+PERCENTILES = (5, 50, 95)
+
+
+def query_settings():
+    query = getattr(settings, 'MEASUREMENT_QUERY', {})
+    return query.get('STATISTICS_MAX_GAP', 3600), query.get('STATISTICS_WORK_MEM', '64MB')
+
+
+def parse_ranges(query_params):
+    """
+    The `<metric>_range=low,high` parameters as `{metric: (low, high)}`. Raises `ParseError`
+    for anything but two numbers in increasing order.
+    """
+    ranges = {}
+    for metric in METRICS:
+        param = f"{metric}_range"
+        value = query_params.get(param)
+        if not value:
+            continue
+        try:
+            low, high = map(parse_number, value.split(","))
+        except ValueError:
+            low = high = None
+        if low is None or low > high:
+            raise ParseError(f"Invalid value for '{param}'. Expected 'low,high', e.g. {param}=5.5,6.5.")
+        ranges[metric] = (low, high)
+    return ranges
+
+
+def _summary(count, first, last, covered, metrics, ranges):
+    """
+    The response body. `metrics[metric]` is `(min, max, mean, stddev, percentiles, seconds in range)`;
+    `covered` is the number of seconds the readings account for.
+    """
+    summary = {
+        "count": count,
+        "first_timestamp": first,
+        "last_timestamp": last,
+        "covered_seconds": covered,
+    }
+    for metric in METRICS:
+        minimum, maximum, mean, stddev, percentiles, in_range = metrics[metric]
+        summary[metric] = {
+            "min": minimum,
+            "max": maximum,
+            "mean": mean,
+            "stddev": stddev,
+            **{f"p{level}": value for level, value in zip(PERCENTILES, percentiles)},
+            "in_range": None,
+        }
+        if metric in ranges:
+            low, high = ranges[metric]
+            summary[metric]["in_range"] = {
+                "min": low,
+                "max": high,
+                "seconds": in_range,
+                "fraction": in_range / covered if covered else None,
+            }
+    return summary
+
+
+def column_statistics(columns, ranges, max_gap):
+    """
+    Statistics of `block_format`-style columns in `(timestamp, id)` order (timestamps in
+    microseconds), computed with NumPy.
+
+    Percentiles interpolate linearly and the standard deviation is the sample one, the
+    same as `percentile_cont` and `stddev_samp` in `database_statistics`.
+    """
+    times = np.asarray(columns["timestamp"])
+    count = len(times)
+    if not count:
+        empty = (None, None, None, None, (None,) * len(PERCENTILES), 0.0)
+        return _summary(0, None, None, 0.0, dict.fromkeys(METRICS, empty), ranges)
+
+    # every reading holds until the next one, across gaps of up to max_gap seconds
+    held = np.diff(times) / 1e6
+    counted = held <= max_gap
+    metrics = {}
+    for metric in METRICS:
+        values = np.asarray(columns[metric], dtype=np.float64)
+        in_range = 0.0
+        if metric in ranges:
+            low, high = ranges[metric]
+            inside = counted & (values[:-1] >= low) & (values[:-1] <= high)
+            in_range = float(held[inside].sum())
+        metrics[metric] = (
+            values.min().item(),
+            values.max().item(),
+            values.mean().item(),
+            values.std(ddof=1).item() if count > 1 else None,
+            np.percentile(values, PERCENTILES).tolist(),
+            in_range,
+        )
+    first, last = times[[0, -1]].tolist()
+    return _summary(
+        count, EPOCH + MICROSECOND * first, EPOCH + MICROSECOND * last, float(held[counted].sum()), metrics, ranges,
+    )
+
+
+def database_statistics(queryset, ranges, max_gap, work_mem):
+    """
+    `column_statistics` of a `Measurement` queryset in one PostgreSQL query.
+
+    `LEAD` over the `(system, timestamp, id)` index order gives how long each reading holds;
+    `percentile_cont`, `stddev_samp` and filtered sums aggregate it. No row leaves the database.
+    """
+    quote = connection.ops.quote_name
+    timestamp, held = quote("timestamp"), quote("held")
+    levels = ", ".join(str(level / 100) for level in PERCENTILES)
+
+    selects = ["COUNT(*)", f"MIN({timestamp})", f"MAX({timestamp})", f"SUM({held}) FILTER (WHERE {held} <= %s)"]
+    params = [max_gap]
+    for metric in METRICS:
+        column = quote(metric)
+        selects += [
+            f"MIN({column})", f"MAX({column})", f"AVG({column})", f"STDDEV_SAMP({column})",
+            f"PERCENTILE_CONT(ARRAY[{levels}]::double precision[]) WITHIN GROUP (ORDER BY {column})",
+        ]
+        if metric in ranges:
+            selects.append(f"SUM({held}) FILTER (WHERE {held} <= %s AND {column} BETWEEN %s AND %s)")
+            params += [max_gap, *ranges[metric]]
+
+    inner, inner_params = queryset.values("id", "timestamp", *METRICS).query.sql_with_params()
+    sql = (
+        f"SELECT {', '.join(selects)} FROM ("
+        f"SELECT m.*, EXTRACT(EPOCH FROM LEAD(m.{timestamp}) OVER (ORDER BY m.{timestamp}, m.{quote('id')}) "
+        f"- m.{timestamp}) AS {held} FROM ({inner}) m"
+        f") s"
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT set_config('work_mem', %s, true)", [work_mem])
+        cursor.execute(sql, params + list(inner_params))
+        row = list(cursor.fetchone())
+
+    count, first, last, covered = row[:4]
+    values = iter(row[4:])
+    metrics = {}
+    for metric in METRICS:
+        minimum, maximum, mean, stddev, percentiles = (next(values) for _ in range(5))
+        in_range = next(values) if metric in ranges else None
+        metrics[metric] = (
+            minimum if minimum is None else float(minimum),
+            maximum if maximum is None else float(maximum),
+            mean if mean is None else float(mean),
+            stddev if stddev is None else float(stddev),
+            percentiles or (None,) * len(PERCENTILES),
+            float(in_range or 0),
+        )
+    return _summary(count, first, last, float(covered or 0), metrics, ranges)
@@ -0,0 +1,90 @@
+from django.db import connection
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.fields import DateTimeField
+from .models import HydroponicSystem
+from .filters import parse_measurement_filters
+from .blocks import MeasurementHistory
+from .statistics import column_statistics, database_statistics, parse_ranges, query_settings
+from . import series
+
+class MeasurementStatisticsAPIView(APIView):
+
+    def get(self, request, system_id):
+        """
+        Distribution statistics of the measurements of a hydroponic system over a window.
+
+        For every metric: min, max, mean, sample standard deviation, the 5th, 50th and 95th
+        percentiles (linearly interpolated) and, when a target range is given, the time spent
+        in it. Every reading counts as holding until the next one; gaps longer than
+        `MEASUREMENT_QUERY['STATISTICS_MAX_GAP']` seconds count as no data.
+
+        Computed by PostgreSQL in one query. Otherwise, and for systems with compressed history,
+        the selected columns are streamed into NumPy, or read from the memory-mapped series cache
+        when it is enabled and only date filters are given.
+
+        ## URL Parameter:
+        - **system_id** (integer, required): The ID of the hydroponic system.
+
+        ## Query Parameters:
+        - The filters of `GET /systems/<id>/measurements/` (`ph_min`, `timestamp_after`, ...) select the
+          measurements that are summarized.
+        - **ph_range**, **temperature_range**, **tds_range** (string, `low,high`): Target range whose
+          time-in-range is returned, inclusive.
+
+        ## Example Request:
+        GET /systems/1/measurements/statistics/?timestamp_after=2025-02-10&ph_range=5.5,6.5
+
+        ## Responses:
+        - **200 OK**: Returns the statistics; values are null when no measurement matches.
+        - **400 Bad Request**: If a query parameter is incorrectly formatted.
+        - **403 Forbidden**: If the user does not have permission to access the system.
+
+        ## Example Response:
+        ```json
+        {
+            "count": 10080,
+            "first_timestamp": "2025-02-10T00:00:30Z",
+            "last_timestamp": "2025-02-16T23:59:30Z",
+            "covered_seconds": 604740.0,
+            "ph": {
+                "min": 5.2,
+                "max": 6.9,
+                "mean": 6.03,
+                "stddev": 0.27,
+                "p5": 5.6,
+                "p50": 6.0,
+                "p95": 6.5,
+                "in_range": {"min": 5.5, "max": 6.5, "seconds": 562300.0, "fraction": 0.93}
+            },
+            "temperature": {"min": 18.5, "max": 26.0, "mean": 22.1, "stddev": 1.8, "p5": 19.2, "p50": 22.0, "p95": 25.1, "in_range": null},
+            "tds": {"min": 610.0, "max": 840.0, "mean": 735.4, "stddev": 41.2, "p5": 668.0, "p50": 736.0, "p95": 801.0, "in_range": null}
+        }
+        ```
+        """
+        try:
+            system = HydroponicSystem.objects.get(id=system_id, owner=request.user)
+        except HydroponicSystem.DoesNotExist:
+            raise PermissionDenied("You do not have permission to this system")
+
+        lookups = parse_measurement_filters(request.query_params)
+        ranges = parse_ranges(request.query_params)
+        max_gap, work_mem = query_settings()
+
+        history = MeasurementHistory(system.id, lookups)
+        if connection.vendor == "postgresql" and not history.has_blocks:
+            statistics = database_statistics(history.queryset, ranges, max_gap, work_mem)
+        elif series.enabled() and set(lookups) <= {"timestamp__gte", "timestamp__lte"}:
+            cached = series.load_series(system.id).between(
+                lookups.get("timestamp__gte"), lookups.get("timestamp__lte"),
+            )
+            statistics = column_statistics(cached, ranges, max_gap)
+        else:
+            statistics = column_statistics(history.columns(), ranges, max_gap)
+
+        timestamp_field = DateTimeField()
+        for name in ("first_timestamp", "last_timestamp"):
+            if statistics[name] is not None:
+                statistics[name] = timestamp_field.to_representation(statistics[name])
+        return Response(statistics)
@@ -3,8 +3,12 @@ from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from .serializers import HydroponicSystemSerializer, MeasurementSerializer
 from datetime import datetime
-from .models import HydroponicSystem, Measurement
+from .models import HydroponicSystem
+from .latest import get_latest_measurements, forget_latest_measurements
+from .series import forget_series
+from .versions import bump_versions, conditional, owned_system
 from django.db.models import Q
+from django.http import Http404
 
 class HydroponicSystemViewSet(viewsets.ModelViewSet):
     serializer_class = HydroponicSystemSerializer
@@ -21,6 +25,9 @@ class HydroponicSystemViewSet(viewsets.ModelViewSet):
         ### Request Body:
         - **name** (string, required): Name of the hydroponic system.
         - **location** (string, optional): Location of the system.
+        - **raw_retention_days** (integer, optional): Days raw measurements are kept before
+          `manage.py compact_measurements` replaces them with their hourly and daily summaries.
+          The server default (90 days) when omitted.
         
         #### Example Request:
         POST /systems/
@@ -42,6 +49,7 @@ class HydroponicSystemViewSet(viewsets.ModelViewSet):
             "name": "Greenhouse A",
             "location": "Farm #1",
             "created_at": "2025-02-17T11:56:38.938336Z",
+            "raw_retention_days": null,
             "owner": 4
         }
         ```
@@ -49,20 +57,26 @@ class HydroponicSystemViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             serializer.save(owner=request.user)
+            bump_versions("user", [request.user.pk])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)         
 
+    @conditional("system", "pk")
     def retrieve(self, request, pk=None):
         """
         Retrieve details of a specific hydroponic system along with the latest measurements.
 
+        The latest measurements (`MEASUREMENT_QUERY['LATEST_COUNT']`, newest first) are served from
+        a per-system cache that is updated whenever measurements are saved.
+
         ### Example Request:
         GET /systems/1/
 
         ### Responses:
-        - **200 OK**: Returns the hydroponic system details and its latest measurements.
-        - **403 Forbidden**: If the user does not own the requested hydroponic system.
-        - **404 Not Found**: If the system does not exist.
+        - **200 OK**: Returns the hydroponic system details and its latest measurements,
+          with `ETag` and `Last-Modified` headers.
+        - **304 Not Modified**: If `If-None-Match` / `If-Modified-Since` match the current validators.
+        - **404 Not Found**: If the system does not exist or belongs to another user.
 
         ### Example Response:
         ```json
@@ -88,12 +102,12 @@ class HydroponicSystemViewSet(viewsets.ModelViewSet):
         }
         ```
         """
-        hydroponic_system = self.get_object()
-        
-        if hydroponic_system.owner != request.user:
-            raise PermissionDenied("You do not have access to this resource.")
+        # the ownership check, already done by @conditional
+        hydroponic_system = owned_system(request, pk)
+        if hydroponic_system is None:
+            raise Http404
 
-        latest_measurements = Measurement.objects.filter(system=hydroponic_system).order_by('-timestamp')[:10]
+        latest_measurements = get_latest_measurements(hydroponic_system.id)
 
         hydroponic_serializer = self.get_serializer(hydroponic_system)
         measurement_serializer = MeasurementSerializer(latest_measurements, many=True)
@@ -145,6 +159,8 @@ class HydroponicSystemViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(hydroponic_system, data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        bump_versions("system", [hydroponic_system.id])
+        bump_versions("user", [request.user.pk])
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def destroy(self, request, pk=None):
@@ -169,9 +185,14 @@ class HydroponicSystemViewSet(viewsets.ModelViewSet):
         hydroponic_system = self.get_object()
         if hydroponic_system.owner != request.user:
             raise PermissionDenied("You cannot delete this resource.")
+        forget_latest_measurements([hydroponic_system.id])
+        forget_series([hydroponic_system.id])
+        bump_versions("system", [hydroponic_system.id])
+        bump_versions("user", [request.user.pk])
         hydroponic_system.delete()
         return Response({"message": "Hydroponic system has been removed."}, status=status.HTTP_204_NO_CONTENT)
     
+    @conditional("user")
     def list(self, request):
         """
         List of hydroponic systems owned by the authenticated user.
@@ -188,7 +209,8 @@ class HydroponicSystemViewSet(viewsets.ModelViewSet):
         GET /systems/?name=greenhouse&sort_by=name&sort_order=desc
         
         ### Responses:
-        - **200 OK**: Returns a list of hydroponic systems.
+        - **200 OK**: Returns a list of hydroponic systems, with `ETag` and `Last-Modified` headers.
+        - **304 Not Modified**: If `If-None-Match` / `If-Modified-Since` match the current validators.
         - **400 Bad Request**: If a query parameter is incorrectly formatted.
         
         ### Example Response:
@@ -0,0 +1,135 @@
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'HydroponicSystem.settings'
+import django
+django.setup()
+
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from ..models import HydroponicSystem, Measurement, User
+from ..writes import save_measurements
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def user1():
+    user = User.objects.create(email="newuser@example.com")
+    user.set_password("securepassword")
+    user.save()
+    return user
+
+@pytest.fixture
+def user2():
+    user = User.objects.create(email="seconduser@example.com")
+    user.set_password("securepassword2")
+    user.save()
+    return user
+
+@pytest.fixture
+def hydroponic_system1(user1):
+    return HydroponicSystem.objects.create(owner=user1, name="Test System 1", location="Greenhouse 1")
+
+@pytest.fixture
+def readings1(hydroponic_system1):
+    # every 7 minutes for 10 hours
+    start = datetime(2025, 2, 17, 8, 3, tzinfo=timezone.utc)
+    measurements = [
+        Measurement.from_reading(
+            system=hydroponic_system1, timestamp=start + timedelta(minutes=7 * i),
+            ph=6.0 + (i % 7) / 10, temperature=20.0 + i % 5, tds=800 + i,
+        )
+        for i in range(86)
+    ]
+    save_measurements(measurements)
+    return measurements
+
+def expected_buckets(measurements, seconds):
+    buckets = {}
+    for m in measurements:
+        start = int(m.timestamp.timestamp()) // seconds * seconds
+        buckets.setdefault(datetime.fromtimestamp(start, tz=timezone.utc), []).append(m)
+    return buckets
+
+
+@pytest.mark.django_db
+def test_aggregate_measurements_hourly(api_client, user1, hydroponic_system1, readings1):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement-aggregate", args=[hydroponic_system1.id]) + "?bucket=1h"
+    response = api_client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    expected = expected_buckets(readings1, 3600)
+    results = response.data["results"]
+    assert [r["timestamp"] for r in results] == [
+        start.strftime("%Y-%m-%dT%H:%M:%SZ") for start in sorted(expected)
+    ]
+    for result, start in zip(results, sorted(expected)):
+        rows = expected[start]
+        assert result["count"] == len(rows)
+        assert result["ph_min"] == min(m.ph for m in rows)
+        assert result["temperature_max"] == max(m.temperature for m in rows)
+        assert result["tds_avg"] == pytest.approx(sum(m.tds for m in rows) / len(rows))
+
+@pytest.mark.django_db
+def test_aggregate_measurements_filters(api_client, user1, hydroponic_system1, readings1):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement-aggregate", args=[hydroponic_system1.id])
+    response = api_client.get(url + "?bucket=5m&ph_min=6.5&sort_order=desc")
+
+    assert response.status_code == status.HTTP_200_OK
+    expected = expected_buckets([m for m in readings1 if m.ph >= 6.5], 300)
+    assert sum(r["count"] for r in response.data["results"]) == sum(map(len, expected.values()))
+    timestamps = [r["timestamp"] for r in response.data["results"]]
+    assert timestamps == sorted(timestamps, reverse=True)
+
+    response = api_client.get(url + "?bucket=1d")
+    assert [(r["timestamp"], r["count"]) for r in response.data["results"]] == [("2025-02-17T00:00:00Z", 86)]
+
+@pytest.mark.django_db
+def test_aggregate_measurements_invalid(api_client, user1, hydroponic_system1, readings1, settings):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement-aggregate", args=[hydroponic_system1.id])
+
+    response = api_client.get(url + "?bucket=2h")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    settings.MEASUREMENT_QUERY = {"AGGREGATION_MAX_BUCKETS": 5}
+    response = api_client.get(url + "?bucket=1m")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "Too many buckets" in response.data["detail"]
+
+@pytest.mark.django_db
+def test_aggregate_measurements_permission_denied(api_client, user2, hydroponic_system1):
+    api_client.force_authenticate(user=user2)
+    url = reverse("measurement-aggregate", args=[hydroponic_system1.id])
+    response = api_client.get(url)
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("query", ["?bucket=1h", "?bucket=1h&ph_min=6.2"])
+def test_aggregate_measurements_columnar(api_client, user1, hydroponic_system1, readings1, query):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement-aggregate", args=[hydroponic_system1.id]) + query
+    rows = api_client.get(url).data["results"]
+    response = api_client.get(url + "&format=columnar")
+
+    assert response.status_code == status.HTTP_200_OK
+    data = json.loads(response.content)
+    assert data["bucket"] == "1h"
+    assert data["results"] == {name: [row[name] for row in rows] for name in rows[0]}
+
+@pytest.mark.django_db
+def test_aggregate_measurements_columnar_epoch_ms(api_client, user1, hydroponic_system1, readings1):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement-aggregate", args=[hydroponic_system1.id]) + "?bucket=1d&format=columnar&timestamps=epoch_ms"
+    response = api_client.get(url)
+
+    assert json.loads(response.content)["results"]["timestamp"] == [
+        int(datetime(2025, 2, 17, tzinfo=timezone.utc).timestamp() * 1000)
+    ]
@@ -0,0 +1,30 @@
+import pytest
+from datetime import datetime, timezone
+from .. import binary_format
+
+def test_encode_decode_roundtrip():
+    readings = [
+        (datetime(2025, 2, 17, 12, 0, 0, tzinfo=timezone.utc), 6.5, 22.1, 900),
+        (datetime(2025, 2, 17, 12, 0, 10, 250000, tzinfo=timezone.utc), 6.45, 22.3, 905),
+    ]
+    data = binary_format.encode(readings, first_sequence=7)
+
+    assert len(data) == binary_format.HEADER.size + binary_format.SEQUENCE.size + 2 * binary_format.RECORD.size
+    assert list(binary_format.decode(data)) == [
+        (readings[0][0], 6.5, 22.1, 900, 7),
+        (readings[1][0], 6.45, 22.3, 905, 8),
+    ]
+
+def test_decode_without_sequence():
+    data = binary_format.encode([(1739793600000, 6.5, 22.0, 900)])
+
+    assert [row[4] for row in binary_format.decode(data)] == [None]
+
+def test_decode_rejects_truncated_payload():
+    data = binary_format.encode([(1739793600000, 6.5, 22.0, 900)] * 3)
+
+    with pytest.raises(binary_format.BinaryFormatError):
+        list(binary_format.decode(data[:-1]))
+
+    with pytest.raises(binary_format.BinaryFormatError):
+        list(binary_format.decode(b"XX" + data[2:]))
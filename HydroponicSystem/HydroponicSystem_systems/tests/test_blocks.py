@@ -0,0 +1,271 @@
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'HydroponicSystem.settings'
+import django
+django.setup()
+
+import pytest
+import numpy as np
+from io import StringIO
+from datetime import timedelta
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone as django_timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from .. import block_format
+from ..blocks import MeasurementHistory, day_start
+from ..models import HydroponicSystem, Measurement, MeasurementBlock, MeasurementDaily, MeasurementHourly, User
+from ..writes import save_measurements
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def user1():
+    user = User.objects.create(email="newuser@example.com")
+    user.set_password("securepassword")
+    user.save()
+    return user
+
+@pytest.fixture
+def hydroponic_system1(user1):
+    return HydroponicSystem.objects.create(owner=user1, name="Test System 1", location="Greenhouse 1")
+
+def readings(system, start, count, step=timedelta(hours=3), first_sequence=0):
+    return [
+        Measurement.from_reading(
+            system=system, timestamp=start + step * i,
+            ph=5.5 + (i * 7 % 30) / 10, temperature=18.0 + (i * 3 % 11), tds=700 + i * 37 % 400,
+            # every fifth reading comes without a sequence
+            sequence=None if i % 5 == 0 else first_sequence + i,
+        )
+        for i in range(count)
+    ]
+
+@pytest.fixture
+def history(hydroponic_system1):
+    # 45 days, the older 15 of them cold
+    start = day_start(django_timezone.now() - timedelta(days=45)) + timedelta(minutes=7)
+    save_measurements(readings(hydroponic_system1, start, 8 * 45))
+    return hydroponic_system1
+
+def compress():
+    call_command("compress_measurements", stdout=StringIO())
+
+
+def test_block_format_round_trip():
+    rng = np.random.default_rng(7)
+    count = 8640
+    columns = {
+        "id": np.arange(10000, 10000 + 3 * count, 3),
+        "timestamp": 1735689600000000 + np.arange(count) * 10000000 + rng.integers(0, 3000, count),
+        "ph": np.round(6 + np.cumsum(rng.normal(0, 0.01, count)), 2),
+        "temperature": -np.round(2 + np.cumsum(rng.normal(0, 0.02, count)), 1),
+        "tds": 800 + np.cumsum(rng.integers(-3, 4, count)),
+        "sequence": np.arange(count),
+        "sequence_null": rng.random(count) < 0.2,
+    }
+
+    data = block_format.encode(columns)
+    decoded = block_format.decode(data)
+
+    for name in ("id", "timestamp", "ph", "temperature", "tds", "sequence_null"):
+        assert np.array_equal(decoded[name], columns[name]), name
+    present = ~columns["sequence_null"]
+    assert np.array_equal(decoded["sequence"][present], columns["sequence"][present])
+    # a row costs more than 60 bytes in the table, before indexes
+    assert len(data) * 10 < 60 * count
+
+def test_block_format_rejects_corrupt_data():
+    data = block_format.encode({
+        "id": np.arange(3), "timestamp": np.arange(3), "ph": np.ones(3), "temperature": np.ones(3),
+        "tds": np.arange(3), "sequence": np.zeros(3, dtype=np.int64), "sequence_null": np.ones(3, dtype=bool),
+    })
+    with pytest.raises(block_format.BlockFormatError):
+        block_format.decode(data[:-4])
+    with pytest.raises(block_format.BlockFormatError):
+        block_format.decode(b"XX" + data[2:])
+
+@pytest.mark.django_db
+def test_compress_measurements_moves_cold_days(history):
+    out = StringIO()
+
+    call_command("compress_measurements", stdout=out)
+
+    cutoff = day_start(django_timezone.now() - timedelta(days=30))
+    assert not Measurement.objects.filter(timestamp__lt=cutoff).exists()
+    assert Measurement.objects.filter(timestamp__gte=cutoff).exists()
+    blocks = MeasurementBlock.objects.filter(system=history)
+    assert blocks.count() == 15
+    assert sum(blocks.values_list("count", flat=True)) + Measurement.objects.count() == 8 * 45
+    assert f"System {history.id}: moved {8 * 15} rows into 15 blocks" in out.getvalue()
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name, params", [
+    ("measurement", {}),
+    ("measurement", {"page": 3}),
+    ("measurement", {"sort_order": "desc", "page": 2}),
+    ("measurement", {"ph_min": 6.0, "ph_max": 7.5}),
+    ("measurement", {"format": "columnar", "pagination": "cursor", "page_size": 100, "count": "true"}),
+    ("measurement", {"format": "json", "timestamp_after": "2000-01-01"}),
+    ("measurement", {"max_points": 50}),
+    ("measurement", {"sort_by": "ph", "sort_order": "desc", "page": 2}),
+    ("measurement", {"sort_by": "tds", "format": "columnar", "page": 5}),
+    ("measurement-export", {"format": "csv"}),
+    ("measurement-export", {"format": "ndjson", "sort_order": "desc", "tds_max": 900}),
+    ("measurement-export", {"format": "csv", "sort_by": "temperature"}),
+    ("measurement-aggregate", {"bucket": "1d"}),
+    ("measurement-aggregate", {"bucket": "1h", "ph_min": 6.0}),
+])
+def test_reads_are_the_same_after_compression(api_client, user1, history, name, params):
+    api_client.force_authenticate(user=user1)
+    url = reverse(name, args=[history.id])
+
+    before = api_client.get(url, params)
+    # exports stream, so read the body before the rows move
+    expected = b"".join(before)
+    compress()
+    after = api_client.get(url, params)
+
+    assert before.status_code == status.HTTP_200_OK
+    assert after.status_code == status.HTTP_200_OK
+    assert b"".join(after) == expected
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_cursor_pages_cross_blocks(api_client, user1, history, sort_order):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[history.id])
+    expected = list(Measurement.objects.order_by(
+        *(("-timestamp", "-id") if sort_order == "desc" else ("timestamp", "id"))
+    ).values_list("id", flat=True))
+    compress()
+
+    ids, params = [], {"pagination": "cursor", "page_size": 37, "sort_order": sort_order}
+    response = api_client.get(url, params)
+    while True:
+        ids.extend(measurement["id"] for measurement in response.data["results"])
+        if response.data["next"] is None:
+            break
+        response = api_client.get(response.data["next"])
+    assert ids == expected
+
+    # and back again
+    previous = api_client.get(response.data["previous"])
+    assert [measurement["id"] for measurement in previous.data["results"]] == expected[-37 - len(response.data["results"]):-len(response.data["results"])]
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name, params, allowed", [
+    # a time range holding few compressed rows can still be sorted by value
+    ("measurement", {"sort_by": "ph"}, {"sort_by": "ph", "timestamp_after": 32}),
+    ("measurement-export", {"format": "csv", "sort_by": "tds"}, {"format": "csv", "sort_by": "tds", "timestamp_after": 32}),
+    # deep pages are reached with cursors
+    ("measurement", {"page": 10}, {"pagination": "cursor"}),
+])
+def test_reads_of_compressed_history_are_bounded(api_client, user1, history, settings, name, params, allowed):
+    compress()
+    settings.MEASUREMENT_QUERY = {"BLOCK_SCAN_MAX_ROWS": 50}
+    api_client.force_authenticate(user=user1)
+    url = reverse(name, args=[history.id])
+    if "timestamp_after" in allowed:
+        allowed["timestamp_after"] = (django_timezone.now() - timedelta(days=allowed["timestamp_after"])).date().isoformat()
+
+    assert api_client.get(url, params).status_code == status.HTTP_400_BAD_REQUEST
+    assert api_client.get(url, allowed).status_code == status.HTTP_200_OK
+
+@pytest.mark.django_db
+def test_late_readings_are_merged_into_blocks(api_client, user1, history):
+    compress()
+    first_day = MeasurementBlock.objects.order_by("start").first()
+    save_measurements(readings(history, first_day.start + timedelta(minutes=1), 3, first_sequence=100000))
+
+    compress()
+
+    first_day.refresh_from_db()
+    assert first_day.count == 11
+    assert MeasurementBlock.objects.count() == 15
+    api_client.force_authenticate(user=user1)
+    response = api_client.get(reverse("measurement", args=[history.id]), {"pagination": "cursor", "page_size": 11})
+    assert [measurement["sequence"] for measurement in response.data["results"][:4]] == [None, None, 100001, 1]
+
+@pytest.mark.django_db
+def test_retries_of_compressed_readings_are_duplicates(history):
+    compress()
+    stored = Measurement.objects.count()
+    # the server stamps retries that carry no timestamp with the time they arrive
+    retried = readings(history, django_timezone.now(), 8)
+
+    duplicates = save_measurements(retried)
+
+    assert [measurement.sequence for measurement in duplicates] == [1, 2, 3, 4, 6, 7]
+    # only the readings without a sequence are stored again
+    assert Measurement.objects.count() == stored + 2
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("descending, max_decoded", [(False, 4), (True, 1)])
+def test_aggregate_stops_decoding_at_the_limit(history, monkeypatch, descending, max_decoded):
+    compress()
+    expected = MeasurementHistory(history.id, descending=descending).aggregate(86400)
+    decoded = []
+    decode = block_format.decode
+    monkeypatch.setattr(block_format, "decode", lambda data: decoded.append(data) or decode(data))
+
+    buckets = MeasurementHistory(history.id, descending=descending).aggregate(86400, limit=3)
+
+    assert buckets == expected[:3]
+    assert len(expected) == 45
+    # one block past the limit at most, to see that the last bucket is complete
+    assert len(decoded) <= max_decoded
+
+@pytest.mark.django_db
+def test_rebuild_rollups_keeps_compressed_days(history):
+    daily = list(MeasurementDaily.objects.order_by("bucket").values_list("bucket", "count", "ph_sum"))
+    hourly = MeasurementHourly.objects.count()
+    compress()
+
+    call_command("rebuild_rollups", stdout=StringIO())
+
+    assert list(MeasurementDaily.objects.order_by("bucket").values_list("bucket", "count", "ph_sum")) == daily
+    assert MeasurementHourly.objects.count() == hourly
+
+@pytest.mark.django_db
+def test_retrieve_reads_latest_measurements_from_blocks(api_client, user1, hydroponic_system1):
+    save_measurements(readings(hydroponic_system1, django_timezone.now() - timedelta(days=40), 4))
+    compress()
+    api_client.force_authenticate(user=user1)
+
+    response = api_client.get(reverse("hydroponicsystem-detail", args=[hydroponic_system1.id]))
+
+    assert not Measurement.objects.exists()
+    assert [measurement["sequence"] for measurement in response.data["latest_measurements"]] == [3, 2, 1, None]
+
+@pytest.mark.django_db
+def test_compaction_deletes_expired_blocks(history):
+    compress()
+    history.raw_retention_days = 35
+    history.save()
+    out = StringIO()
+
+    call_command("compact_measurements", stdout=out)
+
+    cutoff = day_start(django_timezone.now() - timedelta(days=35))
+    assert not MeasurementBlock.objects.filter(start__lt=cutoff).exists()
+    assert MeasurementBlock.objects.count() == 5
+    assert f"deleted {8 * 10} rows" in out.getvalue()
+
+@pytest.mark.django_db
+def test_compress_measurements_dry_run(history):
+    out = StringIO()
+
+    with transaction.atomic():
+        call_command("compress_measurements", "--dry-run", stdout=out)
+
+    assert not MeasurementBlock.objects.exists()
+    assert f"Would move {8 * 15} rows" in out.getvalue()
@@ -0,0 +1,82 @@
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'HydroponicSystem.settings'
+import django
+django.setup()
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from ..models import DeviceToken, HydroponicSystem, User
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def user1():
+    user = User.objects.create(email="newuser@example.com")
+    user.set_password("securepassword")
+    user.save()
+    return user
+
+@pytest.fixture
+def user2():
+    user = User.objects.create(email="seconduser@example.com")
+    user.set_password("securepassword2")
+    user.save()
+    return user
+
+@pytest.fixture
+def hydroponic_system1(user1):
+    return HydroponicSystem.objects.create(owner=user1, name="Test System 1", location="Greenhouse 1")
+
+
+@pytest.mark.django_db
+def test_issue_list_and_revoke_device_token(api_client, user1, hydroponic_system1):
+    api_client.force_authenticate(user=user1)
+    url = reverse("device-token", kwargs={"system_id": hydroponic_system1.id})
+
+    response = api_client.post(url, {"name": "sensor-north"}, format="json")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    key = response.data["key"]
+    token = DeviceToken.objects.get(id=response.data["id"])
+    assert token.system == hydroponic_system1
+    # only the hash of the key is stored
+    assert token.key_hash == DeviceToken.hash_key(key) != key
+
+    response = api_client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [dict(item) for item in response.data] == [
+        {"id": token.id, "name": "sensor-north", "created_at": response.data[0]["created_at"]}
+    ]
+
+    detail_url = reverse("device-token-detail", kwargs={"system_id": hydroponic_system1.id, "token_id": token.id})
+    assert api_client.delete(detail_url).status_code == status.HTTP_204_NO_CONTENT
+    assert api_client.delete(detail_url).status_code == status.HTTP_404_NOT_FOUND
+    assert not DeviceToken.objects.exists()
+
+@pytest.mark.django_db
+def test_device_tokens_of_foreign_system(api_client, user2, hydroponic_system1):
+    token, _ = DeviceToken.issue(hydroponic_system1, "sensor")
+    api_client.force_authenticate(user=user2)
+    url = reverse("device-token", kwargs={"system_id": hydroponic_system1.id})
+    detail_url = reverse("device-token-detail", kwargs={"system_id": hydroponic_system1.id, "token_id": token.id})
+
+    assert api_client.get(url).status_code == status.HTTP_403_FORBIDDEN
+    assert api_client.post(url, {"name": "intruder"}, format="json").status_code == status.HTTP_403_FORBIDDEN
+    assert api_client.delete(detail_url).status_code == status.HTTP_403_FORBIDDEN
+    assert DeviceToken.objects.count() == 1
+
+@pytest.mark.django_db
+def test_issue_device_token_requires_name(api_client, user1, hydroponic_system1):
+    api_client.force_authenticate(user=user1)
+
+    response = api_client.post(
+        reverse("device-token", kwargs={"system_id": hydroponic_system1.id}), {}, format="json",
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "name" in response.data
@@ -0,0 +1,39 @@
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'HydroponicSystem.settings'
+import django
+django.setup()
+
+import numpy as np
+from ..downsampling import MinMaxReducer, lttb
+
+
+def test_lttb_keeps_ends_and_spikes():
+    x = np.arange(10000, dtype=np.float64)
+    y = np.sin(x / 500)
+    y[4321] = 10.0
+    y[7000] = -10.0
+
+    selected = lttb(x, y, 100)
+
+    assert len(selected) == 100
+    assert selected[0] == 0 and selected[-1] == 9999
+    assert np.all(np.diff(selected) > 0)
+    assert {4321, 7000} <= set(selected.tolist())
+
+def test_lttb_short_series():
+    assert lttb(np.arange(5.0), np.arange(5.0), 10).tolist() == [0, 1, 2, 3, 4]
+
+def test_min_max_reducer_streams_chunks():
+    times = np.arange(0, 50000, dtype=np.int64) * 1000
+    values = np.cos(times / 1e6)
+    values[31337] = 99.0
+    reducer = MinMaxReducer(len(times), 200, metrics=("ph",))
+
+    for start in range(0, len(times), 4096):
+        reducer.update(times[start:start + 4096], [values[start:start + 4096]])
+
+    kept_times, kept_values = reducer.series("ph")
+    assert len(kept_times) <= 400
+    assert np.all(np.diff(kept_times) > 0)
+    assert kept_values.max() == 99.0 and kept_times[kept_values.argmax()] == times[31337]
+    assert kept_values.min() == values.min()
@@ -0,0 +1,115 @@
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'HydroponicSystem.settings'
+import django
+django.setup()
+
+import csv
+import gzip
+import io
+import json
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from datetime import datetime, timedelta, timezone as dt_timezone
+from ..models import HydroponicSystem, Measurement, User
+from ..serializers import MeasurementSerializer
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def user1():
+    user = User.objects.create(email="newuser@example.com")
+    user.set_password("securepassword")
+    user.save()
+    return user
+
+@pytest.fixture
+def user2():
+    user = User.objects.create(email="seconduser@example.com")
+    user.set_password("securepassword2")
+    user.save()
+    return user
+
+@pytest.fixture
+def hydroponic_system1(user1):
+    return HydroponicSystem.objects.create(owner=user1, name="Test System 1", location="Greenhouse 1")
+
+@pytest.fixture
+def history1(hydroponic_system1):
+    start = datetime(2024, 2, 15, tzinfo=dt_timezone.utc)
+    Measurement.objects.bulk_create([
+        Measurement.from_reading(
+            system=hydroponic_system1, timestamp=start + timedelta(minutes=i, microseconds=i % 3),
+            ph=6 + i % 10 / 10, temperature=20.5 + i % 5, tds=800 + i, sequence=i if i % 2 else None,
+        )
+        for i in range(45)
+    ])
+    return list(Measurement.objects.filter(system=hydroponic_system1).order_by("timestamp", "id"))
+
+def expected_rows(measurements):
+    return [
+        {key: "" if value is None else str(value) for key, value in row.items()}
+        for row in MeasurementSerializer(measurements, many=True).data
+    ]
+
+def read_body(response):
+    return b"".join(response.streaming_content)
+
+
+@pytest.mark.django_db
+def test_export_measurements_csv(api_client, user1, hydroponic_system1, history1, settings):
+    settings.MEASUREMENT_QUERY = {**settings.MEASUREMENT_QUERY, "EXPORT_CHUNK_SIZE": 10}
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement-export", args=[hydroponic_system1.id])
+    response = api_client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.streaming
+    assert response["Content-Type"] == "text/csv; charset=utf-8"
+    assert response["Content-Disposition"] == f'attachment; filename="system-{hydroponic_system1.id}-measurements.csv"'
+
+    rows = list(csv.DictReader(io.StringIO(read_body(response).decode())))
+    assert rows == expected_rows(history1)
+
+@pytest.mark.django_db
+def test_export_measurements_ndjson_filtered(api_client, user1, hydroponic_system1, history1):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement-export", args=[hydroponic_system1.id]) + "?format=ndjson&tds_min=820&sort_order=desc"
+    response = api_client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "application/x-ndjson; charset=utf-8"
+    rows = [json.loads(line) for line in read_body(response).decode().splitlines()]
+    expected = [m for m in reversed(history1) if m.tds >= 820]
+    assert rows == MeasurementSerializer(expected, many=True).data
+
+@pytest.mark.django_db
+def test_export_measurements_gzip(api_client, user1, hydroponic_system1, history1):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement-export", args=[hydroponic_system1.id])
+    response = api_client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+    assert response["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response["Vary"]
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(read_body(response)).decode())))
+    assert rows == expected_rows(history1)
+
+@pytest.mark.django_db
+def test_export_measurements_invalid_filter(api_client, user1, hydroponic_system1):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement-export", args=[hydroponic_system1.id]) + "?format=csv&ph_min=abc"
+    response = api_client.get(url)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {"detail": "Invalid value for 'ph_min'. Expected a number."}
+
+@pytest.mark.django_db
+def test_export_measurements_permission_denied(api_client, user2, hydroponic_system1):
+    api_client.force_authenticate(user=user2)
+    response = api_client.get(reverse("measurement-export", args=[hydroponic_system1.id]))
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert response.json() == {"detail": "You do not have permission to this system"}
@@ -0,0 +1,114 @@
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'HydroponicSystem.settings'
+import django
+django.setup()
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from django.db import connection
+from django.http import QueryDict
+from rest_framework.exceptions import ParseError
+from ..filters import parse_measurement_query
+from ..pagination import keyset_filter
+from ..models import HydroponicSystem, Measurement, User
+
+INDEX = "measurement_system_ts_id_idx"
+
+@pytest.fixture
+def user1():
+    user = User.objects.create(email="newuser@example.com")
+    user.set_password("securepassword")
+    user.save()
+    return user
+
+@pytest.fixture
+def seeded_systems(user1):
+    systems = [
+        HydroponicSystem.objects.create(owner=user1, name=f"Test System {i}", location="Greenhouse 1")
+        for i in range(5)
+    ]
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    Measurement.objects.bulk_create([
+        Measurement.from_reading(
+            system=system, timestamp=start + timedelta(minutes=i),
+            ph=6 + i % 10 / 10, temperature=20 + i % 5, tds=800 + i % 100,
+        )
+        for system in systems
+        for i in range(2000)
+    ])
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    return systems
+
+
+def test_parse_measurement_query():
+    filters, ordering, descending = parse_measurement_query(
+        QueryDict("ph_min=6.0&tds_max=900&timestamp_after=2024-01-01&sort_order=desc")
+    )
+
+    assert dict(filters.children) == {
+        "ph__gte": 6.0,
+        "tds__lte": 900.0,
+        "timestamp__gte": datetime(2024, 1, 1, tzinfo=timezone.utc),
+    }
+    assert ordering == ("-timestamp", "-id")
+    assert descending
+
+@pytest.mark.parametrize("query, ordering", [
+    ("sort_by=ph", ("ph", "id")),
+    ("sort_by=temperature&sort_order=desc", ("-temperature", "-id")),
+    ("sort_by=tds", ("tds", "id")),
+])
+def test_parse_measurement_query_value_orders(query, ordering):
+    assert parse_measurement_query(QueryDict(query))[1] == ordering
+
+@pytest.mark.parametrize("query, message", [
+    ("ph_min=abc", "Invalid value for 'ph_min'. Expected a number."),
+    ("tds_max=nan", "Invalid value for 'tds_max'. Expected a number."),
+    ("timestamp_before=17-02-2025", "Invalid timestamp format. Expected format: YYYY-MM-DD."),
+    ("sort_by=sequence", "Invalid value for 'sort_by'. Sorting is supported by: timestamp, ph, temperature, tds."),
+    ("sort_order=up", "Invalid value for 'sort_order'. Use 'asc' or 'desc'."),
+])
+def test_parse_measurement_query_invalid(query, message):
+    with pytest.raises(ParseError) as error:
+        parse_measurement_query(QueryDict(query))
+
+    assert error.value.detail == message
+
+
+def assert_uses_index(queryset, index=INDEX):
+    plan = queryset.explain()
+    if connection.vendor == "sqlite":
+        assert index in plan
+        assert "TEMP B-TREE" not in plan
+    else:
+        assert "Index" in plan and "Sort" not in plan, plan
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("query, index", [
+    ("", INDEX),
+    ("sort_order=desc", INDEX),
+    ("timestamp_after=2024-01-01&timestamp_before=2024-01-02&ph_min=6.2", INDEX),
+    ("sort_by=ph", "measurement_system_ph_id_idx"),
+    ("sort_by=temperature&sort_order=desc", "measurement_system_temp_id_idx"),
+    ("sort_by=tds&tds_min=850", "measurement_system_tds_id_idx"),
+])
+def test_measurement_queries_use_index(seeded_systems, query, index):
+    filters, ordering, _ = parse_measurement_query(QueryDict(query))
+    measurements = Measurement.objects.filter(filters, system=seeded_systems[2]).order_by(*ordering)
+
+    assert_uses_index(measurements[:10], index)
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("backwards", [False, True])
+def test_cursor_page_query_uses_index(seeded_systems, backwards):
+    position = Measurement.objects.filter(system=seeded_systems[2]).order_by("timestamp", "id")[1500]
+    ordering = ("-timestamp", "-id") if backwards else ("timestamp", "id")
+    measurements = Measurement.objects.filter(
+        keyset_filter(position.timestamp, position.id, backwards=backwards), system=seeded_systems[2]
+    ).order_by(*ordering)
+
+    assert_uses_index(measurements[:11])
+    if connection.vendor == "sqlite":
+        # the range starts at the cursor instead of at the first row of the system
+        assert "timestamp" in measurements[:11].explain().split("USING")[1]
@@ -0,0 +1,105 @@
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'HydroponicSystem.settings'
+import django
+django.setup()
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from ..models import HydroponicSystem, Measurement, User
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def user1():
+    user = User.objects.create(email="newuser@example.com")
+    user.set_password("securepassword")
+    user.save()
+    return user
+
+@pytest.fixture
+def user2():
+    user = User.objects.create(email="seconduser@example.com")
+    user.set_password("securepassword2")
+    user.save()
+    return user
+
+@pytest.fixture
+def systems1(user1):
+    return [
+        HydroponicSystem.objects.create(owner=user1, name=f"Rack {i}", location="Greenhouse 1")
+        for i in range(3)
+    ]
+
+@pytest.fixture
+def hydroponic_system2(user2):
+    return HydroponicSystem.objects.create(owner=user2, name="Test System 2", location="Greenhouse 2")
+
+@pytest.mark.django_db
+def test_gateway_create_measurements(api_client, user1, systems1, django_assert_max_num_queries):
+    api_client.force_authenticate(user=user1)
+    url = reverse("gateway-measurement")
+    data = [
+        {"system": system.id, "measurements": [{"ph": 6.5, "temperature": 22.5, "tds": 900}] * 5}
+        for system in systems1
+    ]
+
+    # ownership check, one insert, one upsert per rollup
+    with django_assert_max_num_queries(4):
+        response = api_client.post(url, data, format="json")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data["created"] == 15
+    assert [result["created"] for result in response.data["results"]] == [5, 5, 5]
+    for system in systems1:
+        assert Measurement.objects.filter(system=system).count() == 5
+
+@pytest.mark.django_db
+def test_gateway_rejects_foreign_system(api_client, user1, systems1, hydroponic_system2):
+    api_client.force_authenticate(user=user1)
+    url = reverse("gateway-measurement")
+    data = [
+        {"system": systems1[0].id, "measurements": [{"ph": 6.5, "temperature": 22.5, "tds": 900}]},
+        {"system": hydroponic_system2.id, "measurements": [{"ph": 6.5, "temperature": 22.5, "tds": 900}]},
+    ]
+    response = api_client.post(url, data, format="json")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data["results"][0]["created"] == 1
+    assert response.data["results"][1]["created"] == 0
+    assert "permission" in response.data["results"][1]["detail"]
+    assert not Measurement.objects.filter(system=hydroponic_system2).exists()
+
+@pytest.mark.django_db
+def test_gateway_invalid_rows(api_client, user1, systems1):
+    api_client.force_authenticate(user=user1)
+    url = reverse("gateway-measurement")
+    data = [
+        {"system": systems1[0].id, "measurements": [
+            {"ph": 6.5, "temperature": 22.5, "tds": 900},
+            {"ph": 20, "temperature": 22.5, "tds": 900},
+        ]},
+        {"system": systems1[1].id, "measurements": [{"ph": 6.5, "temperature": 22.5, "tds": 900}]},
+    ]
+
+    response = api_client.post(url, data, format="json")
+    assert response.data["results"][0]["created"] == 0
+    assert response.data["results"][0]["errors"][0]["index"] == 1
+    assert response.data["results"][1]["created"] == 1
+
+    response = api_client.post(url + "?mode=best_effort", data, format="json")
+    assert response.data["results"][0]["created"] == 1
+    assert response.data["results"][0]["rejected"] == 1
+    assert Measurement.objects.filter(system=systems1[0]).count() == 1
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("body", [{"system": 1}, [{"system": True, "measurements": []}], [{"system": "1", "measurements": []}]])
+def test_gateway_malformed_body(api_client, user1, body):
+    api_client.force_authenticate(user=user1)
+    url = reverse("gateway-measurement")
+    response = api_client.post(url, body, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
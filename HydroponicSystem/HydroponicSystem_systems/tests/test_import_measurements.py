@@ -0,0 +1,72 @@
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'HydroponicSystem.settings'
+import django
+django.setup()
+
+import pytest
+from io import StringIO
+from datetime import datetime, timezone
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from ..models import HydroponicSystem, Measurement, User
+
+@pytest.fixture
+def user1():
+    user = User.objects.create(email="newuser@example.com")
+    user.set_password("securepassword")
+    user.save()
+    return user
+
+@pytest.fixture
+def hydroponic_system1(user1):
+    return HydroponicSystem.objects.create(owner=user1, name="Test System 1", location="Greenhouse 1")
+
+@pytest.fixture
+def hydroponic_system2(user1):
+    return HydroponicSystem.objects.create(owner=user1, name="Test System 2", location="Greenhouse 2")
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / "legacy.csv"
+    path.write_text(
+        "timestamp,ph,temperature,tds\n"
+        "2023-05-01T10:00:00Z,6.5,22.0,800\n"
+        "2023-05-01T10:01:00Z,6.6,22.1,805\n"
+        "2023-05-01T10:02:00Z,15.0,22.1,805\n"
+        "2023-05-01T10:03:00Z,6.4,60.0,805\n"
+        "not-a-date,6.4,22.0,805\n"
+        "2023-02-30T10:00:00Z,6.4,22.0,805\n"
+        "2023-05-01 10:04:00,6.4,22.2,-5\n"
+        "2023-05-01 10:05:00,6.7,21.9,810\n"
+    )
+    return path
+
+@pytest.mark.django_db
+def test_import_measurements(hydroponic_system1, csv_file):
+    out, err = StringIO(), StringIO()
+    call_command("import_measurements", str(csv_file), system=hydroponic_system1.id, chunk_size=2, stdout=out, stderr=err)
+
+    measurements = Measurement.objects.filter(system=hydroponic_system1).order_by("timestamp")
+    assert measurements.count() == 3
+    assert measurements[0].timestamp == datetime(2023, 5, 1, 10, 0, tzinfo=timezone.utc)
+    assert measurements[2].timestamp == datetime(2023, 5, 1, 10, 5, tzinfo=timezone.utc)
+    assert "Imported 3 rows, rejected 5" in out.getvalue()
+    assert "rows/s" in out.getvalue()
+    assert "legacy.csv:7: timestamp: Invalid timestamp '2023-02-30T10:00:00Z'." in err.getvalue()
+
+@pytest.mark.django_db
+def test_import_measurements_maps_files_to_systems(hydroponic_system1, hydroponic_system2, csv_file):
+    call_command(
+        "import_measurements",
+        f"{hydroponic_system1.id}={csv_file}",
+        f"{hydroponic_system2.id}={csv_file}",
+        stdout=StringIO(), stderr=StringIO(),
+    )
+
+    assert Measurement.objects.filter(system=hydroponic_system1).count() == 3
+    assert Measurement.objects.filter(system=hydroponic_system2).count() == 3
+
+@pytest.mark.django_db
+def test_import_measurements_unknown_system(csv_file):
+    with pytest.raises(CommandError):
+        call_command("import_measurements", str(csv_file), system=999, stdout=StringIO())
@@ -0,0 +1,246 @@
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'HydroponicSystem.settings'
+import django
+django.setup()
+
+import asyncio
+import pytest
+from datetime import datetime, timezone
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from ..line_server import IngestServer, LineProtocolError, parse_line
+from ..models import DeviceToken, HydroponicSystem, Measurement, User
+
+@pytest.fixture
+def user1():
+    user = User.objects.create(email="newuser@example.com")
+    user.set_password("securepassword")
+    user.save()
+    return user
+
+@pytest.fixture
+def user2():
+    user = User.objects.create(email="seconduser@example.com")
+    user.set_password("securepassword2")
+    user.save()
+    return user
+
+@pytest.fixture
+def hydroponic_system1(user1):
+    return HydroponicSystem.objects.create(owner=user1, name="Test System 1", location="Greenhouse 1")
+
+@pytest.fixture
+def hydroponic_system2(user2):
+    return HydroponicSystem.objects.create(owner=user2, name="Test System 2", location="Greenhouse 2")
+
+
+async def exchange(server, lines, replies):
+    """Send `lines` to `server` and return the first `replies` lines it answers."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+    writer.write("".join(line + "\n" for line in lines).encode())
+    await writer.drain()
+    received = [(await reader.readline()).decode().strip() for _ in range(replies)]
+    writer.close()
+    await writer.wait_closed()
+    return received
+
+
+def run_server(scenario, **options):
+    async def main():
+        server = IngestServer(port=0, **options)
+        await server.start()
+        try:
+            return await scenario(server)
+        finally:
+            await server.shutdown()
+    return asyncio.run(main())
+
+
+def test_parse_line():
+    system_id, reading, timestamp = parse_line("system=12 ph=6.4,temperature=22.1,tds=820i,sequence=5 1700000000")
+
+    assert system_id == 12
+    assert reading == {"ph": 6.4, "temperature": 22.1, "tds": 820, "sequence": 5}
+    assert timestamp == datetime(2023, 11, 14, 22, 13, 20, tzinfo=timezone.utc)
+    assert parse_line("system=12 ph=6.4,temperature=22.1,tds=820 1700000000000", precision="ms")[2] == timestamp
+    assert parse_line("system=12 ph=6.4,temperature=22.1,tds=820")[2] is None
+
+@pytest.mark.parametrize("line", [
+    "ph=6.4,temperature=22.1,tds=820",
+    "system=x ph=6.4,temperature=22.1,tds=820",
+    "system=12 ph=6.4,temperature=22.1",
+    "system=12 ph=6.4,temperature=22.1,tds=8.5",
+    "system=12 ph=6.4,temperature=22.1,tds=820,humidity=40",
+    "system=12 ph=6.4,temperature=22.1,tds=820 yesterday",
+])
+def test_parse_line_invalid(line):
+    with pytest.raises(LineProtocolError):
+        parse_line(line)
+
+@pytest.mark.django_db(transaction=True)
+def test_ingest_server_writes_batches(hydroponic_system1):
+    _, token = DeviceToken.issue(hydroponic_system1, "sensor")
+    lines = [f"AUTH {token}"] + [
+        f"system={hydroponic_system1.id} ph=6.5,temperature=22.0,tds={800 + i},sequence={i} {1700000000 + i}"
+        for i in range(50)
+    ] + [
+        f"system={hydroponic_system1.id} ph=15,temperature=22.0,tds=800",
+        "garbage",
+        f"system={hydroponic_system1.id} ph=6.5,temperature=22.0,tds=800,sequence=0",
+        "FLUSH",
+    ]
+
+    async def scenario(server):
+        replies = await exchange(server, lines, 4)
+        count = await sync_to_async(Measurement.objects.filter(system=hydroponic_system1).count)()
+        return replies, count
+
+    replies, count = run_server(scenario, batch_size=16)
+
+    assert replies[0] == "OK"
+    # syntax errors are answered right away, range errors once the batch is validated
+    errors = sorted(replies[1:3])
+    assert errors[0].startswith("ERR 52 ph: Ensure this value is less than or equal to 14")
+    assert errors[1].startswith("ERR 53 ")
+    assert replies[3] == "OK 50 1 2"
+    assert count == 50
+    first = Measurement.objects.get(system=hydroponic_system1, sequence=0)
+    assert first.timestamp == datetime(2023, 11, 14, 22, 13, 20, tzinfo=timezone.utc)
+
+@pytest.mark.django_db(transaction=True)
+def test_ingest_server_rejects_bad_token():
+    async def scenario(server):
+        return await exchange(server, ["AUTH not-a-token", "system=1 ph=6.5,temperature=22.0,tds=800"], 2)
+
+    replies = run_server(scenario)
+
+    assert replies == ["ERR 1 Authentication failed.", ""]
+    assert not Measurement.objects.exists()
+
+@pytest.mark.django_db(transaction=True)
+def test_ingest_server_rejects_foreign_system(hydroponic_system1, hydroponic_system2):
+    _, token = DeviceToken.issue(hydroponic_system1, "sensor")
+
+    async def scenario(server):
+        return await exchange(server, [
+            f"AUTH {token}", f"system={hydroponic_system2.id} ph=6.5,temperature=22.0,tds=800", "FLUSH",
+        ], 3)
+
+    replies = run_server(scenario)
+
+    assert replies[1] == "ERR 2 You do not have permission to add measurements in this system."
+    assert replies[2] == "OK 0 0 1"
+    assert not Measurement.objects.exists()
+
+@pytest.mark.django_db(transaction=True)
+def test_ingest_server_drains_on_shutdown(hydroponic_system1):
+    _, token = DeviceToken.issue(hydroponic_system1, "sensor")
+
+    async def scenario(server):
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(f"AUTH {token}\n".encode())
+        assert await reader.readline() == b"OK\n"
+        writer.write("".join(
+            f"system={hydroponic_system1.id} ph=6.5,temperature=22.0,tds=800\n" for _ in range(2000)
+        ).encode())
+        await writer.drain()
+        (connection,) = server.connections
+        # a queue of 10 readings keeps the connection waiting for the writer
+        while connection.lines < 50:
+            await asyncio.sleep(0.01)
+
+        await server.shutdown()
+        assert await reader.read() == b""
+        writer.close()
+        return connection.stats()
+
+    async def main():
+        server = IngestServer(port=0, queue_size=10, batch_size=5)
+        await server.start()
+        return await scenario(server)
+
+    stats = asyncio.run(main())
+
+    assert stats["accepted"] == stats["lines"] - 1 > 50
+    assert Measurement.objects.filter(system=hydroponic_system1).count() == stats["accepted"]
+
+@pytest.mark.django_db(transaction=True)
+def test_ingest_server_accepts_datagrams(hydroponic_system1, hydroponic_system2):
+    _, token = DeviceToken.issue(hydroponic_system1, "sensor")
+    datagrams = [
+        [f"AUTH {token}"] + [
+            f"system={hydroponic_system1.id} ph=6.5,temperature=22.0,tds={800 + i},sequence={i}" for i in range(10)
+        ],
+        [
+            f"AUTH {token}",
+            f"system={hydroponic_system1.id} ph=15,temperature=22.0,tds=800",
+            f"system={hydroponic_system2.id} ph=6.5,temperature=22.0,tds=800",
+            "garbage",
+            f"system={hydroponic_system1.id} ph=6.5,temperature=22.0,tds=800,sequence=0",
+        ],
+        ["AUTH not-a-token", f"system={hydroponic_system1.id} ph=6.5,temperature=22.0,tds=800"],
+        [f"system={hydroponic_system1.id} ph=6.5,temperature=22.0,tds=800"],
+    ]
+
+    async def scenario(server):
+        transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            asyncio.DatagramProtocol, remote_addr=("127.0.0.1", server.udp_port),
+        )
+        for lines in datagrams:
+            transport.sendto("\n".join(lines).encode())
+        transport.close()
+        while server.datagrams.datagrams < len(datagrams):
+            await asyncio.sleep(0.01)
+        await server.shutdown()
+        return server.datagrams.stats()
+
+    async def main():
+        server = IngestServer(port=0, udp_port=0, batch_size=4)
+        await server.start()
+        return await scenario(server)
+
+    stats = asyncio.run(main())
+
+    assert {key: stats[key] for key in ("datagrams", "unauthenticated", "accepted", "duplicates", "rejected")} == {
+        "datagrams": 4, "unauthenticated": 2, "accepted": 10, "duplicates": 1, "rejected": 3,
+    }
+    assert Measurement.objects.filter(system=hydroponic_system1).count() == 10
+
+@pytest.mark.django_db(transaction=True)
+def test_ingest_server_caches_and_revokes_tokens(hydroponic_system1):
+    device_token, token = DeviceToken.issue(hydroponic_system1, "sensor")
+    line = f"system={hydroponic_system1.id} ph=6.5,temperature=22.0,tds=800"
+
+    async def scenario(server):
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(f"AUTH {token}\n".encode())
+        assert await reader.readline() == b"OK\n"
+        lookups = []
+        original = server._lookup_token
+        server._lookup_token = lambda key: lookups.append(key) or original(key)
+
+        writer.write(f"{line}\n{line}\nFLUSH\n".encode())
+        assert await reader.readline() == b"OK 2 0 0\n"
+        assert lookups == []
+
+        await sync_to_async(device_token.delete)()
+        # as if the cached lookup had expired
+        server._tokens[token] = (hydroponic_system1.id, 0)
+        writer.write(f"{line}\n{line}\n".encode())
+        replies = [await reader.readline(), await reader.readline()]
+        writer.close()
+        return lookups, replies
+
+    lookups, replies = run_server(scenario)
+
+    assert lookups == [token]
+    # the connection is closed once the revoked token is noticed
+    assert replies == [b"ERR 5 Authentication failed.\n", b""]
+    assert Measurement.objects.filter(system=hydroponic_system1).count() == 2
+
+def test_run_ingest_server_requires_shared_cache(settings):
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+    with pytest.raises(CommandError, match="local to this process"):
+        call_command("run_ingest_server", "--port", "0")
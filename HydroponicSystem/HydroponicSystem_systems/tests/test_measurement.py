@@ -7,8 +7,17 @@ import pytest
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from datetime import datetime
+import json
+from datetime import datetime, timezone as dt_timezone
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
 from ..models import HydroponicSystem, Measurement, User
+from ..serializers import MeasurementSerializer
+
+@pytest.fixture
+def shared_versions(settings):
+    # the local-memory cache of the tests stands in for a shared one
+    settings.MEASUREMENT_QUERY = {"CONDITIONAL_REQUESTS": True}
 
 @pytest.fixture
 def api_client():
@@ -119,3 +128,487 @@ def test_sort_measurements_descending(api_client, user1, hydroponic_system1, mea
     assert response.status_code == status.HTTP_200_OK
     timestamps = [datetime.strptime(m["timestamp"], "%Y-%m-%dT%H:%M:%S.%fZ") for m in response.data["results"]]
     assert timestamps == sorted(timestamps, reverse=True)
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("sort_by", ["ph", "temperature", "tds"])
+def test_sort_measurements_by_value(api_client, user1, hydroponic_system1, sort_by):
+    measurements1 = [
+        Measurement.objects.create(
+            system=hydroponic_system1, ph=5.0 + i * 7 % 10 / 5, temperature=20.0 + i * 3 % 4, tds=700 + i * 11 % 6,
+        )
+        for i in range(15)
+    ]
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id]) + f"?sort_by={sort_by}&sort_order=desc"
+    response = api_client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    expected = sorted(measurements1, key=lambda m: (getattr(m, sort_by), m.id), reverse=True)[:len(response.data["results"])]
+    assert [m["id"] for m in response.data["results"]] == [m.id for m in expected]
+
+@pytest.mark.django_db
+def test_create_measurements_batch(api_client, user1, hydroponic_system1):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id])
+    data = [{"ph": 6.5, "temperature": 22.5, "tds": 900} for _ in range(30)]
+    response = api_client.post(url, data, format="json")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data["created"] == 30
+    assert response.data["rejected"] == 0
+    assert Measurement.objects.filter(system=hydroponic_system1).count() == 30
+
+@pytest.mark.django_db
+def test_create_measurements_batch_atomic_rejects_all(api_client, user1, hydroponic_system1):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id])
+    data = [
+        {"ph": 6.5, "temperature": 22.5, "tds": 900},
+        {"ph": 300, "temperature": 22.5, "tds": 900},
+    ]
+    response = api_client.post(url, data, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data["errors"][0]["index"] == 1
+    assert "ph" in response.data["errors"][0]["errors"]
+    assert not Measurement.objects.filter(system=hydroponic_system1).exists()
+
+@pytest.mark.django_db
+def test_create_measurements_batch_best_effort(api_client, user1, hydroponic_system1):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id]) + "?mode=best_effort"
+    data = [
+        {"ph": 6.5, "temperature": 22.5, "tds": 900},
+        {"ph": 6.5, "temperature": 99, "tds": 900},
+        {"ph": 6.7, "temperature": 22.5, "tds": 910},
+    ]
+    response = api_client.post(url, data, format="json")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data["created"] == 2
+    assert response.data["rejected"] == 1
+    assert response.data["errors"][0]["index"] == 1
+    assert "temperature" in response.data["errors"][0]["errors"]
+    assert Measurement.objects.filter(system=hydroponic_system1).count() == 2
+
+@pytest.mark.django_db
+def test_create_measurements_batch_permission_denied(api_client, user2, hydroponic_system1):
+    api_client.force_authenticate(user=user2)
+    url = reverse("measurement", args=[hydroponic_system1.id])
+    data = [{"ph": 6.5, "temperature": 22.5, "tds": 900}]
+    response = api_client.post(url, data, format="json")
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+@pytest.mark.django_db
+def test_create_measurements_ndjson(api_client, user1, hydroponic_system1, settings):
+    settings.MEASUREMENT_INGEST = {"NDJSON_CHUNK_SIZE": 4}
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id])
+    lines = ['{"ph": 6.5, "temperature": 22.5, "tds": 900}'] * 10
+    lines.insert(3, '{"ph": 6.5, "temperature": 22.5')
+    lines.insert(7, '{"ph": -1, "temperature": 22.5, "tds": 900}')
+    body = "\n".join(lines) + "\n"
+    response = api_client.post(url, body, content_type="application/x-ndjson")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data["accepted"] == 10
+    assert response.data["rejected"] == 2
+    assert response.data["first_error"]["line"] == 4
+    assert Measurement.objects.filter(system=hydroponic_system1).count() == 10
+
+@pytest.mark.django_db
+def test_create_measurements_ndjson_permission_denied(api_client, user2, hydroponic_system1):
+    api_client.force_authenticate(user=user2)
+    url = reverse("measurement", args=[hydroponic_system1.id])
+    body = '{"ph": 6.5, "temperature": 22.5, "tds": 900}\n'
+    response = api_client.post(url, body, content_type="application/x-ndjson")
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+@pytest.fixture
+def write_behind(settings):
+    from ..ingest import shutdown_write_behind_buffer
+    settings.MEASUREMENT_INGEST = {
+        "WRITE_BEHIND": True,
+        "WRITE_BEHIND_MAX_ROWS": 2,
+        "WRITE_BEHIND_FLUSH_ROWS": 100,
+        "WRITE_BEHIND_FLUSH_INTERVAL": 3600,
+    }
+    shutdown_write_behind_buffer()
+    yield
+    shutdown_write_behind_buffer()
+
+@pytest.mark.django_db
+def test_create_measurement_write_behind(api_client, user1, hydroponic_system1, write_behind):
+    from ..ingest import get_write_behind_buffer
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id])
+    data = {"ph": 6.5, "temperature": 22.5, "tds": 900}
+
+    assert api_client.post(url, data).status_code == status.HTTP_202_ACCEPTED
+    assert api_client.post(url, data).status_code == status.HTTP_202_ACCEPTED
+    assert api_client.post(url, data).status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert not Measurement.objects.filter(system=hydroponic_system1).exists()
+
+    buffer = get_write_behind_buffer()
+    assert buffer.stats() == {"queue_depth": 2, "dropped": 1, "flushed": 0}
+
+    buffer.flush()
+    assert Measurement.objects.filter(system=hydroponic_system1).count() == 2
+    assert buffer.stats() == {"queue_depth": 0, "dropped": 1, "flushed": 2}
+
+@pytest.mark.django_db
+def test_create_measurement_write_behind_sync(api_client, user1, hydroponic_system1, write_behind):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id]) + "?sync=true"
+    data = {"ph": 6.5, "temperature": 22.5, "tds": 900}
+    response = api_client.post(url, data)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert Measurement.objects.filter(id=response.data["id"]).exists()
+
+@pytest.mark.django_db
+def test_create_measurement_with_sequence_is_idempotent(api_client, user1, hydroponic_system1):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id])
+    data = {"ph": 6.5, "temperature": 22.5, "tds": 900, "sequence": 41}
+
+    response = api_client.post(url, data)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data["sequence"] == 41
+    assert response.data["id"] is not None
+
+    response = api_client.post(url, data)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["duplicate"] is True
+    assert Measurement.objects.filter(system=hydroponic_system1, sequence=41).count() == 1
+
+@pytest.mark.django_db
+def test_create_measurements_batch_reports_duplicates(api_client, user1, hydroponic_system1):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id])
+    data = [{"ph": 6.5, "temperature": 22.5, "tds": 900, "sequence": i} for i in range(5)]
+    api_client.post(url, data[:3], format="json")
+
+    response = api_client.post(url, data, format="json")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data["created"] == 2
+    assert sorted(response.data["duplicates"]) == [0, 1, 2]
+    assert Measurement.objects.filter(system=hydroponic_system1).count() == 5
+
+@pytest.mark.django_db
+def test_create_measurements_ndjson_skips_duplicates(api_client, user1, hydroponic_system1):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id])
+    body = "".join(f'{{"ph": 6.5, "temperature": 22.5, "tds": 900, "sequence": {i % 3}}}\n' for i in range(6))
+    response = api_client.post(url, body, content_type="application/x-ndjson")
+
+    assert response.data["accepted"] == 3
+    assert response.data["duplicates"] == 3
+    assert Measurement.objects.filter(system=hydroponic_system1).count() == 3
+
+@pytest.mark.django_db
+def test_create_measurements_binary(api_client, user1, hydroponic_system1):
+    from datetime import timezone
+    from .. import binary_format
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id]) + "?mode=best_effort"
+    readings = [(datetime(2025, 2, 17, 12, i, tzinfo=timezone.utc), 6.5, 22.5, 900) for i in range(4)]
+    readings.append((datetime(2025, 2, 17, 12, 5, tzinfo=timezone.utc), 20.0, 22.5, 900))
+    body = binary_format.encode(readings, first_sequence=100)
+
+    response = api_client.post(url, body, content_type=binary_format.CONTENT_TYPE)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data["created"] == 4
+    assert response.data["errors"][0]["index"] == 4
+    stored = Measurement.objects.filter(system=hydroponic_system1).order_by("timestamp")
+    assert [m.timestamp for m in stored] == [r[0] for r in readings[:4]]
+    assert [m.sequence for m in stored] == [100, 101, 102, 103]
+
+    response = api_client.post(url, body, content_type=binary_format.CONTENT_TYPE)
+    assert response.data["created"] == 0
+    assert response.data["duplicates"] == [100, 101, 102, 103]
+
+@pytest.mark.django_db
+def test_create_measurements_binary_atomic(api_client, user1, hydroponic_system1):
+    from datetime import timezone
+    from .. import binary_format
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id])
+    readings = [(datetime(2025, 2, 17, 12, i, tzinfo=timezone.utc), 6.5 if i else 20.0, 22.5, 900) for i in range(3)]
+
+    response = api_client.post(url, binary_format.encode(readings), content_type=binary_format.CONTENT_TYPE)
+
+    # the same errors as a JSON batch
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data == {"errors": [{"index": 0, "errors": {"ph": ["Ensure this value is less than or equal to 14.0."]}}]}
+    assert not Measurement.objects.exists()
+
+@pytest.mark.django_db
+def test_create_measurements_binary_malformed(api_client, user1, hydroponic_system1):
+    from .. import binary_format
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id])
+    response = api_client.post(url, b"HM\x01", content_type=binary_format.CONTENT_TYPE)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.mark.django_db
+def test_create_measurements_gzip_batch(api_client, user1, hydroponic_system1):
+    import gzip, json
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id])
+    body = gzip.compress(json.dumps([{"ph": 6.5, "temperature": 22.5, "tds": 900}] * 50).encode())
+    response = api_client.post(url, body, content_type="application/json", HTTP_CONTENT_ENCODING="gzip")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data["created"] == 50
+    assert response.wsgi_request.decompression_stats["ratio"] > 10
+
+@pytest.mark.django_db
+def test_create_measurements_gzip_ndjson(api_client, user1, hydroponic_system1):
+    import gzip
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id])
+    body = gzip.compress(b'{"ph": 6.5, "temperature": 22.5, "tds": 900}\n' * 20)
+    response = api_client.post(url, body, content_type="application/x-ndjson", HTTP_CONTENT_ENCODING="gzip")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data["accepted"] == 20
+
+@pytest.mark.django_db
+def test_create_measurements_gzip_limits(api_client, user1, hydroponic_system1, settings):
+    import gzip
+    settings.REQUEST_DECOMPRESSION = {"MAX_SIZE": 1024}
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id])
+
+    body = gzip.compress(b" " * 10 * 1024 * 1024)
+    response = api_client.post(url, body, content_type="application/json", HTTP_CONTENT_ENCODING="gzip")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = api_client.post(url, b"not gzip", content_type="application/json", HTTP_CONTENT_ENCODING="gzip")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = api_client.post(url, b"{}", content_type="application/json", HTTP_CONTENT_ENCODING="br")
+    assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
+@pytest.mark.django_db
+def test_create_measurements_gzip_default_limit(api_client, user1, hydroponic_system1, settings):
+    import gzip
+    del settings.REQUEST_DECOMPRESSION
+    settings.DATA_UPLOAD_MAX_MEMORY_SIZE = 1024
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id])
+
+    body = gzip.compress(b'{"ph": 6.5, "temperature": 22.5, "tds": 900}\n' * 100)
+    response = api_client.post(url, body, content_type="application/x-ndjson", HTTP_CONTENT_ENCODING="gzip")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not Measurement.objects.exists()
+
+@pytest.fixture
+def history1(hydroponic_system1):
+    # pairs of readings share a timestamp, so pages must break ties by id
+    Measurement.objects.bulk_create([
+        Measurement.from_reading(
+            system=hydroponic_system1, timestamp=datetime(2024, 2, 15, 10, i // 2, tzinfo=dt_timezone.utc),
+            ph=6.5, temperature=22.0, tds=800 + i,
+        )
+        for i in range(25)
+    ])
+    return list(Measurement.objects.filter(system=hydroponic_system1).order_by("timestamp", "id"))
+
+def walk_cursor_pages(api_client, url, link="next"):
+    ids = []
+    pages = []
+    while url:
+        response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        pages.append(response.data)
+        ids.extend(m["id"] for m in response.data["results"])
+        url = response.data[link]
+    return ids, pages
+
+@pytest.mark.django_db
+def test_list_measurements_cursor(api_client, user1, hydroponic_system1, history1):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id]) + "?pagination=cursor&page_size=4"
+
+    ids, pages = walk_cursor_pages(api_client, url)
+
+    assert ids == [m.id for m in history1]
+    assert len(pages) == 7
+    assert "count" not in pages[0]
+    assert pages[0]["previous"] is None
+
+    back_ids, _ = walk_cursor_pages(api_client, pages[-1]["previous"], link="previous")
+    assert back_ids == [m["id"] for page in reversed(pages[:-1]) for m in page["results"]]
+
+@pytest.mark.django_db
+def test_list_measurements_cursor_descending(api_client, user1, hydroponic_system1, history1):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id]) + "?pagination=cursor&sort_order=desc&count=true"
+
+    ids, pages = walk_cursor_pages(api_client, url)
+
+    assert ids == [m.id for m in reversed(history1)]
+    assert pages[0]["count"] == 25
+
+@pytest.mark.django_db
+def test_list_measurements_cursor_invalid(api_client, user1, hydroponic_system1, history1):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id])
+
+    response = api_client.get(url + "?cursor=garbage")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data["detail"] == "Invalid cursor."
+
+    response = api_client.get(url + "?pagination=cursor&sort_by=ph")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data["detail"] == "Cursor pagination only supports 'sort_by=timestamp'."
+
+    next_url = api_client.get(url + "?pagination=cursor").data["next"]
+    response = api_client.get(next_url.replace("sort_order=asc", "") + "&sort_order=desc")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.mark.django_db
+def test_list_measurements_max_points(api_client, user1, hydroponic_system1, history1, settings):
+    settings.MEASUREMENT_QUERY = {"DOWNSAMPLE_CHUNK_SIZE": 7}
+    Measurement.objects.filter(id=history1[12].id).update(tds=5000)
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id]) + "?max_points=5"
+    response = api_client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["count"] == 25
+    tds = response.data["series"]["tds"]
+    assert len(tds) == 5
+    assert max(point["value"] for point in tds) == 5000
+    assert tds[0]["timestamp"] == "2024-02-15T10:00:00Z"
+    assert [point["timestamp"] for point in tds] == sorted(point["timestamp"] for point in tds)
+
+    response = api_client.get(url + "&ph_min=7")
+    assert response.data["count"] == 0
+    assert response.data["series"]["ph"] == []
+
+    response = api_client.get(reverse("measurement", args=[hydroponic_system1.id]) + "?max_points=2")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.mark.django_db
+def test_list_measurements_conditional(
+    shared_versions, api_client, user1, hydroponic_system1, measurements1, django_assert_num_queries, django_capture_on_commit_callbacks,
+):
+    cache.clear()
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id]) + "?sort_order=desc"
+    response = api_client.get(url)
+    etag = response["ETag"]
+
+    assert response.status_code == status.HTTP_200_OK
+    assert "Last-Modified" in response
+
+    # only the ownership check
+    with django_assert_num_queries(1):
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # other query parameters are a different resource
+    response = api_client.get(url + "&ph_min=6", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+
+    with django_capture_on_commit_callbacks(execute=True):
+        api_client.post(reverse("measurement", args=[hydroponic_system1.id]), {"ph": 7.0, "temperature": 21.0, "tds": 700})
+
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response["ETag"] != etag
+    assert response.data["count"] == 16
+
+@pytest.mark.django_db
+def test_list_measurements_conditional_foreign_or_missing_system(shared_versions, api_client, user1, user2, hydroponic_system1, measurements1):
+    cache.clear()
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id])
+    response = api_client.get(url)
+    etag, last_modified = response["ETag"], response["Last-Modified"]
+
+    api_client.force_authenticate(user=user2)
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert "ETag" not in response
+
+    response = api_client.get(
+        reverse("measurement", args=[hydroponic_system1.id + 1000]), HTTP_IF_NONE_MATCH="*", HTTP_IF_MODIFIED_SINCE=last_modified,
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    # probing ids does not create version tokens
+    assert cache.get(f"versions:system:{hydroponic_system1.id + 1000}") is None
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("query, accept", [
+    ("", "application/json"),
+    ("?sort_order=desc&page=2", "application/json"),
+    ("?pagination=cursor&page_size=7&count=true", "application/json"),
+    ("", "application/json; indent=2"),
+])
+def test_list_measurements_fast_path_matches_serializer(api_client, user1, hydroponic_system1, history1, query, accept):
+    # floats that orjson would write differently from json, and a sequence
+    Measurement.objects.bulk_create([
+        Measurement.from_reading(
+            system=hydroponic_system1, timestamp=datetime(2024, 2, 15, 9, 30, 0, 123, tzinfo=dt_timezone.utc),
+            ph=1e-05, temperature=0.1 + 0.2, tds=0, sequence=42,
+        ),
+    ])
+    api_client.force_authenticate(user=user1)
+    response = api_client.get(reverse("measurement", args=[hydroponic_system1.id]) + query, HTTP_ACCEPT=accept)
+    assert response.status_code == status.HTTP_200_OK
+
+    data = json.loads(response.content)
+    by_id = Measurement.objects.in_bulk([m["id"] for m in data["results"]])
+    expected = {**data, "results": MeasurementSerializer([by_id[m["id"]] for m in data["results"]], many=True).data}
+
+    assert response.content == JSONRenderer().render(expected, accept)
+    assert response.data["results"] == expected["results"]
+
+@pytest.mark.django_db
+def test_list_measurements_columnar(api_client, user1, hydroponic_system1, history1):
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id]) + "?pagination=cursor&page_size=20"
+    rows = api_client.get(url).data["results"]
+    response = api_client.get(url + "&format=columnar")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "application/json"
+    data = json.loads(response.content)
+    assert data["results"] == {
+        name: [row[name] for row in rows] for name in ("id", "sequence", "timestamp", "ph", "temperature", "tds")
+    }
+
+    # cursors of columnar pages continue in the same format
+    assert "format=columnar" in data["next"]
+    assert len(json.loads(api_client.get(data["next"]).content)["results"]["id"]) == 5
+
+@pytest.mark.django_db
+def test_list_measurements_columnar_options(api_client, user1, hydroponic_system1):
+    Measurement.objects.bulk_create([
+        Measurement.from_reading(
+            system=hydroponic_system1, timestamp=datetime(2024, 2, 15, 10, 0, 0, 1500, tzinfo=dt_timezone.utc),
+            ph=6.123456789, temperature=22.1, tds=800,
+        ),
+    ])
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id]) + "?format=columnar&timestamps=epoch_ms&float32=true"
+    response = api_client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    results = json.loads(response.content)["results"]
+    assert results["timestamp"] == [1707991200001]
+    assert results["ph"] == [6.123457]
+    assert results["temperature"] == [22.1]
+
+    response = api_client.get(url.replace("epoch_ms", "unix"))
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data["detail"] == "Invalid value for 'timestamps'. Use one of: iso, epoch_ms."
@@ -0,0 +1,150 @@
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'HydroponicSystem.settings'
+import django
+django.setup()
+
+import pytest
+from io import StringIO
+from datetime import datetime, timezone
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.http import QueryDict
+from django.urls import reverse
+from rest_framework.test import APIClient
+from ..filters import parse_measurement_query
+from ..latest import get_latest_measurements
+from ..models import HydroponicSystem, Measurement, MeasurementSequence, User
+from ..partitions import (
+    DEFAULT_PARTITION, add_months, create_partition, list_partitions, month_start, partition_name,
+)
+from ..versions import get_version
+from ..writes import save_measurements
+
+postgresql_only = pytest.mark.skipif(connection.vendor != "postgresql", reason="partitioning is PostgreSQL only")
+
+@pytest.fixture
+def user1():
+    user = User.objects.create(email="newuser@example.com")
+    user.set_password("securepassword")
+    user.save()
+    return user
+
+@pytest.fixture
+def hydroponic_system1(user1):
+    return HydroponicSystem.objects.create(owner=user1, name="Test System 1", location="Greenhouse 1")
+
+def reading(system, timestamp, sequence=None):
+    return Measurement.from_reading(system=system, timestamp=timestamp, ph=6.5, temperature=22.0, tds=800, sequence=sequence)
+
+
+def test_month_arithmetic():
+    assert month_start(datetime(2025, 3, 31, 23, 59, tzinfo=timezone.utc)) == datetime(2025, 3, 1, tzinfo=timezone.utc)
+    assert add_months(datetime(2025, 11, 1, tzinfo=timezone.utc), 3) == datetime(2026, 2, 1, tzinfo=timezone.utc)
+    assert add_months(datetime(2025, 1, 1, tzinfo=timezone.utc), -1) == datetime(2024, 12, 1, tzinfo=timezone.utc)
+    assert partition_name(datetime(2025, 2, 1, tzinfo=timezone.utc)) == "HydroponicSystem_systems_measurement_p202502"
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor == "postgresql", reason="checks the error on other databases")
+def test_manage_partitions_requires_postgresql():
+    with pytest.raises(CommandError, match="requires PostgreSQL"):
+        call_command("manage_partitions")
+
+@postgresql_only
+@pytest.mark.django_db
+def test_manage_partitions_creates_and_detaches(hydroponic_system1):
+    current = month_start(datetime.now(timezone.utc))
+    old = add_months(current, -30)
+    # lands in the default partition until its partition exists
+    Measurement.objects.bulk_create([reading(hydroponic_system1, old.replace(day=15))])
+
+    with connection.cursor() as cursor:
+        create_partition(cursor, old)
+
+    call_command("manage_partitions", "--ahead", "5", stdout=StringIO())
+    with connection.cursor() as cursor:
+        months = set(list_partitions(cursor))
+        cursor.execute(f'SELECT COUNT(*) FROM "{DEFAULT_PARTITION}"')
+        assert cursor.fetchone()[0] == 0
+    assert {add_months(current, offset) for offset in range(6)} <= months
+
+    out = StringIO()
+    call_command("manage_partitions", "--keep-months", "12", "--drop", stdout=out)
+    assert f"Dropped {partition_name(old)}" in out.getvalue()
+    assert not Measurement.objects.filter(system=hydroponic_system1).exists()
+
+@postgresql_only
+@pytest.mark.django_db
+def test_range_queries_are_pruned(hydroponic_system1):
+    month = month_start(datetime.now(timezone.utc))
+    filters, ordering, _ = parse_measurement_query(QueryDict(
+        f"timestamp_after={month:%Y-%m-%d}&timestamp_before={month.replace(day=20):%Y-%m-%d}"
+    ))
+    plan = Measurement.objects.filter(filters, system=hydroponic_system1).order_by(*ordering)[:10].explain()
+
+    assert partition_name(month) in plan
+    assert partition_name(add_months(month, 1)) not in plan
+    assert DEFAULT_PARTITION not in plan
+
+@postgresql_only
+@pytest.mark.django_db
+def test_save_measurements_partitioned_duplicates(hydroponic_system1):
+    timestamp = datetime.now(timezone.utc)
+    assert save_measurements([reading(hydroponic_system1, timestamp, sequence=1)]) == []
+
+    duplicates = save_measurements([
+        reading(hydroponic_system1, timestamp, sequence=1),
+        reading(hydroponic_system1, timestamp, sequence=2),
+    ])
+
+    assert [m.sequence for m in duplicates] == [1]
+    assert Measurement.objects.filter(system=hydroponic_system1).count() == 2
+
+@postgresql_only
+@pytest.mark.django_db
+def test_retried_upload_with_server_timestamps_is_deduplicated(user1, hydroponic_system1):
+    api_client = APIClient()
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id])
+    batch = [
+        {"ph": 6.5, "temperature": 22.0, "tds": 800, "sequence": 1},
+        {"ph": 6.6, "temperature": 22.1, "tds": 810, "sequence": 2},
+    ]
+    assert api_client.post(url, batch, format="json").status_code == 201
+
+    # the retry is stamped with a new timestamp by the server
+    response = api_client.post(url, batch + [{"ph": 6.7, "temperature": 22.2, "tds": 820, "sequence": 3}], format="json")
+
+    assert response.status_code == 201
+    assert sorted(response.data["duplicates"]) == [1, 2]
+    assert Measurement.objects.filter(system=hydroponic_system1).count() == 3
+    assert sorted(MeasurementSequence.objects.values_list("sequence", flat=True)) == [1, 2, 3]
+
+@postgresql_only
+@pytest.mark.django_db
+def test_detached_partition_releases_sequences(hydroponic_system1):
+    old = add_months(month_start(datetime.now(timezone.utc)), -30)
+    with connection.cursor() as cursor:
+        create_partition(cursor, old)
+    save_measurements([reading(hydroponic_system1, old.replace(day=15), sequence=1)])
+
+    call_command("manage_partitions", "--keep-months", "12", "--drop", stdout=StringIO())
+
+    assert not MeasurementSequence.objects.exists()
+    assert save_measurements([reading(hydroponic_system1, old.replace(day=15), sequence=1)]) == []
+
+@postgresql_only
+@pytest.mark.django_db
+def test_detached_partition_invalidates_caches(hydroponic_system1, django_capture_on_commit_callbacks):
+    old = add_months(month_start(datetime.now(timezone.utc)), -30)
+    with connection.cursor() as cursor:
+        create_partition(cursor, old)
+    save_measurements([reading(hydroponic_system1, old.replace(day=15))])
+    assert len(get_latest_measurements(hydroponic_system1.id)) == 1
+    version = get_version("system", hydroponic_system1.id)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("manage_partitions", "--keep-months", "12", stdout=StringIO())
+
+    assert get_latest_measurements(hydroponic_system1.id) == []
+    assert get_version("system", hydroponic_system1.id) != version
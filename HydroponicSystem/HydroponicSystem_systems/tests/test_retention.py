@@ -0,0 +1,151 @@
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'HydroponicSystem.settings'
+import django
+django.setup()
+
+import pytest
+from io import StringIO
+from datetime import datetime, timedelta, timezone
+from django.core.management import call_command
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone as django_timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from ..models import HydroponicSystem, Measurement, MeasurementCompaction, MeasurementDaily, MeasurementHourly, User
+from ..retention import compact_system, retention_cutoff
+from ..writes import save_measurements
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def user1():
+    user = User.objects.create(email="newuser@example.com")
+    user.set_password("securepassword")
+    user.save()
+    return user
+
+@pytest.fixture
+def hydroponic_system1(user1):
+    return HydroponicSystem.objects.create(owner=user1, name="Test System 1", location="Greenhouse 1")
+
+@pytest.fixture
+def hydroponic_system2(user1):
+    return HydroponicSystem.objects.create(owner=user1, name="Test System 2", location="Greenhouse 2")
+
+def readings(system, start, count, step=timedelta(hours=5)):
+    return [
+        Measurement.from_reading(
+            system=system, timestamp=start + step * i,
+            ph=5.5 + (i * 7 % 30) / 10, temperature=18.0 + (i * 3 % 11), tds=700 + i * 37 % 400,
+        )
+        for i in range(count)
+    ]
+
+def rollup_rows(model, system):
+    return list(model.objects.filter(system=system).order_by("bucket").values(
+        "bucket", "count", "ph_sum", "ph_min", "ph_max", "tds_sum", "tds_min", "tds_max",
+    ))
+
+def days_ago(days):
+    return django_timezone.now() - timedelta(days=days)
+
+
+@pytest.mark.django_db
+def test_compact_measurements_keeps_summaries_of_deleted_rows(hydroponic_system1):
+    # 120 days of readings, the older half written without rollups
+    old = readings(hydroponic_system1, days_ago(120), 288)
+    Measurement.objects.bulk_create(old[:100])
+    save_measurements(old[100:])
+    with transaction.atomic():
+        call_command("rebuild_rollups", stdout=StringIO())
+        expected = rollup_rows(MeasurementHourly, hydroponic_system1), rollup_rows(MeasurementDaily, hydroponic_system1)
+        transaction.set_rollback(True)
+    out = StringIO()
+
+    call_command("compact_measurements", stdout=out)
+
+    cutoff = retention_cutoff(hydroponic_system1)
+    assert cutoff == datetime.combine((days_ago(90)).date(), datetime.min.time(), tzinfo=timezone.utc)
+    assert not Measurement.objects.filter(timestamp__lt=cutoff).exists()
+    assert Measurement.objects.filter(timestamp__gte=cutoff).exists()
+    assert (rollup_rows(MeasurementHourly, hydroponic_system1), rollup_rows(MeasurementDaily, hydroponic_system1)) == expected
+
+    deleted = 288 - Measurement.objects.count()
+    assert f"System {hydroponic_system1.id}: deleted {deleted} rows" in out.getvalue()
+    assert f"Deleted {deleted} rows, " in out.getvalue()
+    assert MeasurementCompaction.objects.get(system=hydroponic_system1).compacted_before == cutoff
+
+@pytest.mark.django_db
+def test_compact_measurements_uses_per_system_retention(hydroponic_system1, hydroponic_system2):
+    hydroponic_system1.raw_retention_days = 7
+    hydroponic_system1.save()
+    save_measurements(readings(hydroponic_system1, days_ago(30), 100) + readings(hydroponic_system2, days_ago(30), 100))
+
+    call_command("compact_measurements", stdout=StringIO())
+
+    assert not Measurement.objects.filter(system=hydroponic_system1, timestamp__lt=days_ago(8)).exists()
+    assert Measurement.objects.filter(system=hydroponic_system2).count() == 100
+
+@pytest.mark.django_db
+def test_compact_measurements_deletes_in_batches(hydroponic_system1):
+    save_measurements(readings(hydroponic_system1, days_ago(200), 50))
+
+    rows, freed = compact_system(hydroponic_system1, retention_cutoff(hydroponic_system1), size=7)
+
+    assert rows == 50
+    assert freed is not None
+    assert not Measurement.objects.exists()
+
+@pytest.mark.django_db
+def test_compaction_resumes_without_refolding(hydroponic_system1):
+    save_measurements(readings(hydroponic_system1, days_ago(200), 50))
+    cutoff = retention_cutoff(hydroponic_system1)
+    daily = rollup_rows(MeasurementDaily, hydroponic_system1)
+    # a run that folded, then died after deleting some of the rows
+    MeasurementCompaction.objects.create(system=hydroponic_system1, folded_before=cutoff)
+    Measurement.objects.filter(pk__in=Measurement.objects.order_by("timestamp").values("pk")[:20]).delete()
+
+    call_command("compact_measurements", stdout=StringIO())
+
+    assert not Measurement.objects.exists()
+    assert rollup_rows(MeasurementDaily, hydroponic_system1) == daily
+    checkpoint = MeasurementCompaction.objects.get(system=hydroponic_system1)
+    assert checkpoint.compacted_before == checkpoint.folded_before == cutoff
+
+@pytest.mark.django_db
+def test_rebuild_rollups_keeps_compacted_buckets(hydroponic_system1):
+    save_measurements(readings(hydroponic_system1, days_ago(120), 288))
+    call_command("compact_measurements", stdout=StringIO())
+    daily = rollup_rows(MeasurementDaily, hydroponic_system1)
+
+    call_command("rebuild_rollups", stdout=StringIO())
+
+    assert rollup_rows(MeasurementDaily, hydroponic_system1) == daily
+    assert sum(row["count"] for row in daily) == 288
+
+@pytest.mark.django_db
+def test_compact_measurements_dry_run(hydroponic_system1):
+    save_measurements(readings(hydroponic_system1, days_ago(100), 20))
+    out = StringIO()
+
+    call_command("compact_measurements", "--dry-run", stdout=out)
+
+    assert Measurement.objects.count() == 20
+    assert not MeasurementCompaction.objects.exists()
+    assert "Would delete" in out.getvalue()
+
+@pytest.mark.django_db
+def test_raw_retention_days_must_be_positive(api_client, user1, hydroponic_system1):
+    api_client.force_authenticate(user=user1)
+    url = reverse("hydroponicsystem-detail", args=[hydroponic_system1.id])
+
+    response = api_client.put(url, {"name": "Test System 1", "raw_retention_days": 0}, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = api_client.put(url, {"name": "Test System 1", "raw_retention_days": 30}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    hydroponic_system1.refresh_from_db()
+    assert hydroponic_system1.raw_retention_days == 30
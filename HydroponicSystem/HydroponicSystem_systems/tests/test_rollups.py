@@ -0,0 +1,150 @@
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'HydroponicSystem.settings'
+import django
+django.setup()
+
+import pytest
+from io import StringIO
+from datetime import datetime, timedelta, timezone
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from ..models import HydroponicSystem, Measurement, MeasurementDaily, MeasurementHourly, User
+from ..rollups import aggregate_rollup
+from ..writes import save_measurements
+
+START = datetime(2025, 2, 16, 22, 0, tzinfo=timezone.utc)
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def user1():
+    user = User.objects.create(email="newuser@example.com")
+    user.set_password("securepassword")
+    user.save()
+    return user
+
+@pytest.fixture
+def hydroponic_system1(user1):
+    return HydroponicSystem.objects.create(owner=user1, name="Test System 1", location="Greenhouse 1")
+
+@pytest.fixture
+def hydroponic_system2(user1):
+    return HydroponicSystem.objects.create(owner=user1, name="Test System 2", location="Greenhouse 2")
+
+def readings(system, count, step=timedelta(minutes=13), first_sequence=None):
+    return [
+        Measurement.from_reading(
+            system=system, timestamp=START + step * i,
+            ph=5.5 + (i * 7 % 30) / 10, temperature=18.0 + (i * 3 % 11), tds=700 + i * 37 % 400,
+            sequence=first_sequence + i if first_sequence is not None else None,
+        )
+        for i in range(count)
+    ]
+
+def rollup_rows(model):
+    return [
+        {key: pytest.approx(value) if isinstance(value, float) else value for key, value in row.items()}
+        for row in model.objects.order_by("system_id", "bucket").values(
+            "system_id", "bucket", "count", "ph_sum", "ph_sum_sq", "ph_min", "ph_max",
+            "temperature_sum", "temperature_min", "temperature_max", "tds_sum", "tds_sum_sq", "tds_min", "tds_max",
+        )
+    ]
+
+
+@pytest.mark.django_db
+def test_rollups_are_updated_incrementally(hydroponic_system1, hydroponic_system2):
+    measurements = readings(hydroponic_system1, 300, first_sequence=0) + readings(hydroponic_system2, 120)
+
+    # out of order, in batches, with a retried batch
+    save_measurements(measurements[200:])
+    save_measurements(measurements[:100])
+    save_measurements(readings(hydroponic_system1, 300, first_sequence=0)[50:150])
+    save_measurements(measurements[100:200])
+
+    incremental = (rollup_rows(MeasurementHourly), rollup_rows(MeasurementDaily))
+    assert sum(row["count"] for row in incremental[1]) == 420
+
+    call_command("rebuild_rollups", stdout=StringIO())
+
+    assert (rollup_rows(MeasurementHourly), rollup_rows(MeasurementDaily)) == incremental
+
+@pytest.mark.django_db
+def test_rebuild_rollups_for_one_system(hydroponic_system1, hydroponic_system2):
+    Measurement.objects.bulk_create(readings(hydroponic_system1, 50) + readings(hydroponic_system2, 50))
+    out = StringIO()
+
+    call_command("rebuild_rollups", "--system", str(hydroponic_system1.id), stdout=out)
+
+    assert "MeasurementDaily: 2 rows" in out.getvalue()
+    assert MeasurementHourly.objects.filter(system=hydroponic_system1).exists()
+    assert not MeasurementHourly.objects.filter(system=hydroponic_system2).exists()
+
+@pytest.mark.django_db
+def test_import_measurements_updates_rollups(hydroponic_system1, tmp_path):
+    path = tmp_path / "legacy.csv"
+    path.write_text(
+        "timestamp,ph,temperature,tds\n"
+        "2023-05-01T10:00:00Z,6.5,22.0,800\n"
+        "2023-05-01T10:30:00Z,6.7,22.4,820\n"
+        "2023-05-01T11:00:00Z,6.6,22.1,805\n"
+    )
+
+    call_command("import_measurements", str(path), "--system", str(hydroponic_system1.id), stdout=StringIO())
+
+    assert [(row.count, row.tds_max) for row in MeasurementHourly.objects.order_by("bucket")] == [(2, 820), (1, 805)]
+
+@pytest.mark.django_db
+def test_aggregation_reads_rollups(api_client, user1, hydroponic_system1):
+    save_measurements(readings(hydroponic_system1, 300))
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement-aggregate", args=[hydroponic_system1.id])
+    raw = api_client.get(url + "?bucket=1h&ph_min=0").data["results"]
+    expected = {r["timestamp"]: r for r in raw}
+
+    hourly = api_client.get(url + "?bucket=1h").data["results"]
+    assert [r["timestamp"] for r in hourly] == list(expected)
+    for result in hourly:
+        assert dict(result) == {
+            key: pytest.approx(value) if isinstance(value, float) else value
+            for key, value in expected[result["timestamp"]].items()
+        }
+
+    # rows deleted without going through the rollups are still counted: the rollup was read
+    Measurement.objects.all().delete()
+    daily = api_client.get(url + "?bucket=1d&timestamp_after=2025-02-17&sort_order=desc").data["results"]
+    assert [r["timestamp"] for r in daily] == ["2025-02-19T00:00:00Z", "2025-02-18T00:00:00Z", "2025-02-17T00:00:00Z"]
+    assert sum(r["count"] for r in daily) == 300 - 10
+
+@pytest.mark.django_db
+def test_aggregation_rollup_keeps_inclusive_end(api_client, user1, hydroponic_system1):
+    # 2025-02-17T00:00:00 is reading 10, exactly on the `timestamp_before` bound
+    save_measurements(readings(hydroponic_system1, 20, step=timedelta(minutes=12)))
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement-aggregate", args=[hydroponic_system1.id])
+
+    results = api_client.get(url + "?bucket=1h&timestamp_before=2025-02-17").data["results"]
+
+    assert [(r["timestamp"], r["count"]) for r in results] == [
+        ("2025-02-16T22:00:00Z", 5), ("2025-02-16T23:00:00Z", 5), ("2025-02-17T00:00:00Z", 1),
+    ]
+
+@pytest.mark.django_db
+def test_aggregate_rollup_limit(api_client, user1, hydroponic_system1, settings):
+    save_measurements(readings(hydroponic_system1, 20, step=timedelta(minutes=12)))
+    lookups = {"timestamp__lte": datetime(2025, 2, 17, tzinfo=timezone.utc)}
+
+    ascending = aggregate_rollup(MeasurementHourly, hydroponic_system1, 3600, lookups, limit=2)
+    descending = aggregate_rollup(MeasurementHourly, hydroponic_system1, 3600, lookups, descending=True, limit=2)
+
+    assert [(b["bucket"].hour, b["count"]) for b in ascending] == [(22, 5), (23, 5)]
+    assert [(b["bucket"].hour, b["count"]) for b in descending] == [(0, 1), (23, 5)]
+
+    settings.MEASUREMENT_QUERY = {"AGGREGATION_MAX_BUCKETS": 2}
+    api_client.force_authenticate(user=user1)
+    response = api_client.get(reverse("measurement-aggregate", args=[hydroponic_system1.id]) + "?bucket=1h")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "Too many buckets" in response.data["detail"]
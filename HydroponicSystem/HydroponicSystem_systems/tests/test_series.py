@@ -0,0 +1,185 @@
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'HydroponicSystem.settings'
+import django
+django.setup()
+
+import pytest
+import numpy as np
+from io import StringIO
+from datetime import datetime, timedelta, timezone
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from ..models import HydroponicSystem, Measurement, User
+from ..writes import save_measurements
+from .. import series
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+@pytest.fixture(autouse=True)
+def series_root(settings, tmp_path):
+    settings.MEASUREMENT_SERIES = {"ROOT": str(tmp_path)}
+    return tmp_path
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def user1():
+    user = User.objects.create(email="newuser@example.com")
+    user.set_password("securepassword")
+    user.save()
+    return user
+
+@pytest.fixture
+def hydroponic_system1(user1):
+    return HydroponicSystem.objects.create(owner=user1, name="Test System 1", location="Greenhouse 1")
+
+def readings(system, count, start=START, step=timedelta(minutes=10)):
+    return [
+        Measurement.from_reading(
+            system=system, timestamp=start + step * i,
+            ph=5.5 + (i * 7 % 30) / 10, temperature=18.0 + (i * 3 % 11), tds=700 + i * 37 % 400,
+        )
+        for i in range(count)
+    ]
+
+def database_columns(system):
+    rows = list(Measurement.objects.filter(system=system).order_by("timestamp", "id").values_list(
+        "id", "timestamp", "ph", "temperature", "tds",
+    ))
+    return {
+        "id": [row[0] for row in rows],
+        "timestamp": [int((row[1] - series.EPOCH) / timedelta(microseconds=1)) for row in rows],
+        "ph": [row[2] for row in rows],
+        "temperature": [row[3] for row in rows],
+        "tds": [row[4] for row in rows],
+    }
+
+def cached_columns(system):
+    cached = series.open_series(system.id)
+    return {name: cached[name].tolist() for name, _ in series.FIELDS}
+
+
+@pytest.mark.django_db
+def test_series_is_built_from_the_database(hydroponic_system1):
+    save_measurements(readings(hydroponic_system1, 500))
+
+    loaded = series.load_series(hydroponic_system1.id)
+
+    assert isinstance(loaded["ph"], np.memmap)
+    assert cached_columns(hydroponic_system1) == database_columns(hydroponic_system1)
+    window = loaded.between(START + timedelta(minutes=100), START + timedelta(minutes=200))
+    assert len(window) == 11
+    assert window["id"].base is not None
+
+@pytest.mark.django_db
+def test_new_measurements_are_appended(hydroponic_system1, django_capture_on_commit_callbacks, monkeypatch):
+    monkeypatch.setattr(series, "MIN_CAPACITY", 64)
+    save_measurements(readings(hydroponic_system1, 50))
+    series.build_series(hydroponic_system1.id)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        save_measurements(readings(hydroponic_system1, 100, start=START + timedelta(days=1)))
+
+    # grew past the initial capacity of 64 rows
+    assert len(series.open_series(hydroponic_system1.id)) == 150
+    assert cached_columns(hydroponic_system1) == database_columns(hydroponic_system1)
+
+@pytest.mark.django_db
+def test_rows_read_by_a_rebuild_are_not_appended_twice(hydroponic_system1, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        save_measurements(readings(hydroponic_system1, 30))
+    series.build_series(hydroponic_system1.id)
+
+    for callback in callbacks:
+        callback()
+
+    assert cached_columns(hydroponic_system1) == database_columns(hydroponic_system1)
+
+@pytest.mark.django_db
+def test_older_measurements_invalidate_the_series(hydroponic_system1, django_capture_on_commit_callbacks):
+    save_measurements(readings(hydroponic_system1, 30, start=START + timedelta(days=1)))
+    series.build_series(hydroponic_system1.id)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        save_measurements(readings(hydroponic_system1, 5))
+
+    assert series.open_series(hydroponic_system1.id) is None
+    series.load_series(hydroponic_system1.id)
+    assert cached_columns(hydroponic_system1) == database_columns(hydroponic_system1)
+
+@pytest.mark.django_db
+def test_measurements_without_primary_keys_invalidate_the_series(hydroponic_system1, django_capture_on_commit_callbacks):
+    save_measurements(readings(hydroponic_system1, 30))
+    series.build_series(hydroponic_system1.id)
+
+    # as written by a backend that does not return primary keys from bulk inserts
+    with django_capture_on_commit_callbacks(execute=True):
+        series.append_series(readings(hydroponic_system1, 5, start=START + timedelta(days=1)))
+
+    assert series.open_series(hydroponic_system1.id) is None
+
+@pytest.mark.django_db
+def test_deleting_the_system_drops_its_series(
+    api_client, user1, hydroponic_system1, series_root, django_capture_on_commit_callbacks,
+):
+    save_measurements(readings(hydroponic_system1, 30))
+    series.build_series(hydroponic_system1.id)
+    api_client.force_authenticate(user=user1)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client.delete(reverse("hydroponicsystem-detail", args=[hydroponic_system1.id]))
+
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert series.open_series(hydroponic_system1.id) is None
+    assert not [path for path in series_root.iterdir() if path.is_dir()]
+
+@pytest.mark.django_db
+def test_import_updates_the_series(hydroponic_system1, tmp_path, django_capture_on_commit_callbacks):
+    save_measurements(readings(hydroponic_system1, 30))
+    series.build_series(hydroponic_system1.id)
+    path = tmp_path / "legacy.csv"
+    path.write_text("timestamp,ph,temperature,tds\n2026-01-01T00:00:00Z,6.5,22.0,800\n")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("import_measurements", str(path), "--system", str(hydroponic_system1.id), stdout=StringIO())
+
+    if connection.vendor == "postgresql":
+        # COPY returns no primary keys
+        assert series.open_series(hydroponic_system1.id) is None
+    else:
+        assert cached_columns(hydroponic_system1) == database_columns(hydroponic_system1)
+
+@pytest.mark.django_db
+def test_downsampling_reads_the_series(api_client, user1, hydroponic_system1, settings):
+    save_measurements(readings(hydroponic_system1, 2000))
+    api_client.force_authenticate(user=user1)
+    url = reverse("measurement", args=[hydroponic_system1.id])
+    params = {"max_points": 100, "timestamp_after": "2025-01-02", "timestamp_before": "2025-01-10"}
+
+    cached = api_client.get(url, params)
+    assert series.open_series(hydroponic_system1.id) is not None
+
+    settings.MEASUREMENT_SERIES = {"ROOT": None}
+    uncached = api_client.get(url, params)
+
+    assert cached.status_code == status.HTTP_200_OK
+    assert cached.json() == uncached.json()
+    assert cached.json()["count"] == Measurement.objects.filter(
+        timestamp__gte=datetime(2025, 1, 2, tzinfo=timezone.utc),
+        timestamp__lte=datetime(2025, 1, 10, tzinfo=timezone.utc),
+    ).count()
+
+@pytest.mark.django_db
+def test_rebuild_series_command(hydroponic_system1):
+    save_measurements(readings(hydroponic_system1, 20))
+    out = StringIO()
+
+    call_command("rebuild_series", stdout=out)
+
+    assert f"System {hydroponic_system1.id}: 20 rows" in out.getvalue()
+    assert cached_columns(hydroponic_system1) == database_columns(hydroponic_system1)
@@ -0,0 +1,163 @@
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'HydroponicSystem.settings'
+import django
+django.setup()
+
+import pytest
+import statistics
+from io import StringIO
+from datetime import datetime, timedelta, timezone
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from ..blocks import MeasurementHistory
+from ..models import HydroponicSystem, Measurement, User
+from ..statistics import column_statistics, database_statistics
+from ..writes import save_measurements
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def user1():
+    user = User.objects.create(email="newuser@example.com")
+    user.set_password("securepassword")
+    user.save()
+    return user
+
+@pytest.fixture
+def user2():
+    user = User.objects.create(email="seconduser@example.com")
+    user.set_password("securepassword2")
+    user.save()
+    return user
+
+@pytest.fixture
+def hydroponic_system1(user1):
+    return HydroponicSystem.objects.create(owner=user1, name="Test System 1", location="Greenhouse 1")
+
+@pytest.fixture
+def readings1(hydroponic_system1):
+    # every 10 minutes for a day, with the readings of 12:00-13:50 missing
+    start = datetime(2025, 2, 17, tzinfo=timezone.utc)
+    measurements = [
+        Measurement.from_reading(
+            system=hydroponic_system1, timestamp=start + timedelta(minutes=10 * i),
+            ph=5.0 + (i * 7 % 20) / 10, temperature=18.0 + (i * 3 % 13) / 2, tds=600 + i * 37 % 300,
+        )
+        for i in range(144) if not 72 <= i < 84
+    ]
+    save_measurements(measurements)
+    return measurements
+
+def get_statistics(api_client, user, system, params=None):
+    api_client.force_authenticate(user=user)
+    return api_client.get(reverse("measurement-statistics", args=[system.id]), params or {})
+
+
+@pytest.mark.django_db
+def test_statistics(api_client, user1, hydroponic_system1, readings1):
+    response = get_statistics(api_client, user1, hydroponic_system1)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["count"] == 132
+    assert response.data["first_timestamp"] == "2025-02-17T00:00:00Z"
+    assert response.data["last_timestamp"] == "2025-02-17T23:50:00Z"
+    # the two hour gap is longer than STATISTICS_MAX_GAP
+    assert response.data["covered_seconds"] == 130 * 600
+    for metric in ("ph", "temperature", "tds"):
+        values = [getattr(m, metric) for m in readings1]
+        result = response.data[metric]
+        assert result["min"] == min(values)
+        assert result["max"] == max(values)
+        assert result["mean"] == pytest.approx(statistics.mean(values))
+        assert result["stddev"] == pytest.approx(statistics.stdev(values))
+        quantiles = statistics.quantiles(values, n=20, method="inclusive")
+        assert [result["p5"], result["p50"], result["p95"]] == pytest.approx([quantiles[0], quantiles[9], quantiles[18]])
+        assert result["in_range"] is None
+
+@pytest.mark.django_db
+def test_statistics_time_in_range(api_client, user1, hydroponic_system1, readings1):
+    response = get_statistics(api_client, user1, hydroponic_system1, {"ph_range": "5.5,6.5", "tds_range": "700,800"})
+
+    assert response.status_code == status.HTTP_200_OK
+    for metric, (low, high) in (("ph", (5.5, 6.5)), ("tds", (700, 800))):
+        # a reading holds for the 10 minutes until the next one, except before the gap and at the end
+        held = [
+            m for m, following in zip(readings1, readings1[1:])
+            if following.timestamp - m.timestamp <= timedelta(hours=1) and low <= getattr(m, metric) <= high
+        ]
+        assert response.data[metric]["in_range"] == {
+            "min": low, "max": high, "seconds": len(held) * 600.0, "fraction": pytest.approx(len(held) / 130),
+        }
+    assert response.data["temperature"]["in_range"] is None
+
+@pytest.mark.django_db
+def test_statistics_filters(api_client, user1, hydroponic_system1, readings1):
+    response = get_statistics(api_client, user1, hydroponic_system1, {"ph_min": 6.0, "tds_max": 800})
+
+    selected = [m for m in readings1 if m.ph >= 6.0 and m.tds <= 800]
+    assert response.data["count"] == len(selected)
+    assert response.data["ph"]["min"] == min(m.ph for m in selected)
+    assert response.data["tds"]["max"] == max(m.tds for m in selected)
+
+@pytest.mark.django_db
+def test_statistics_empty_window(api_client, user1, hydroponic_system1, readings1):
+    response = get_statistics(api_client, user1, hydroponic_system1, {"timestamp_after": "2025-03-01", "ph_range": "5.5,6.5"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["count"] == 0
+    assert response.data["first_timestamp"] is None
+    assert response.data["ph"]["p50"] is None
+    assert response.data["ph"]["in_range"] == {"min": 5.5, "max": 6.5, "seconds": 0.0, "fraction": None}
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("params", [{"ph_range": "6.5,5.5"}, {"ph_range": "5.5"}, {"tds_range": "a,b"}, {"ph_min": "low"}])
+def test_statistics_invalid_parameters(api_client, user1, hydroponic_system1, params):
+    response = get_statistics(api_client, user1, hydroponic_system1, params)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.mark.django_db
+def test_statistics_forbidden(api_client, user2, hydroponic_system1):
+    response = get_statistics(api_client, user2, hydroponic_system1)
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+@pytest.mark.django_db
+def test_statistics_of_compressed_history(api_client, user1, hydroponic_system1, readings1):
+    params = {"ph_range": "5.5,6.5", "tds_min": 650}
+    expected = get_statistics(api_client, user1, hydroponic_system1, params).data
+
+    call_command("compress_measurements", stdout=StringIO())
+
+    assert not Measurement.objects.exists()
+    assert get_statistics(api_client, user1, hydroponic_system1, params).data == expected
+
+@pytest.mark.django_db
+def test_statistics_from_series_cache(api_client, user1, hydroponic_system1, readings1, settings, tmp_path):
+    params = {"ph_range": "5.5,6.5", "timestamp_after": "2025-02-17"}
+    expected = get_statistics(api_client, user1, hydroponic_system1, params).data
+    settings.MEASUREMENT_SERIES = {"ROOT": str(tmp_path)}
+
+    assert get_statistics(api_client, user1, hydroponic_system1, params).data == expected
+    assert os.listdir(tmp_path)
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="percentile_cont is PostgreSQL only")
+def test_database_statistics_match_numpy(hydroponic_system1, readings1):
+    ranges = {"ph": (5.5, 6.5), "temperature": (20, 22)}
+    history = MeasurementHistory(hydroponic_system1.id, {"ph__gte": 5.2})
+
+    result = database_statistics(history.queryset, ranges, 3600, "64MB")
+    expected = column_statistics(history.columns(), ranges, 3600)
+
+    for name in ("count", "first_timestamp", "last_timestamp", "covered_seconds"):
+        assert result[name] == expected[name]
+    for metric in ("ph", "temperature", "tds"):
+        in_range, expected_in_range = result[metric].pop("in_range"), expected[metric].pop("in_range")
+        assert result[metric] == pytest.approx(expected[metric])
+        assert in_range == (expected_in_range and pytest.approx(expected_in_range))
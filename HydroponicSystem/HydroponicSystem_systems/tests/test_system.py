@@ -8,8 +8,19 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from datetime import datetime
+from django.core.cache import cache
+from ..latest import cache_stats
 from ..models import HydroponicSystem, Measurement, User
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+@pytest.fixture
+def shared_versions(settings):
+    # the local-memory cache of the tests stands in for a shared one
+    settings.MEASUREMENT_QUERY = {"CONDITIONAL_REQUESTS": True}
+
 @pytest.fixture
 def api_client():
     return APIClient()
@@ -85,6 +96,42 @@ def test_retrieve_hydroponic_system(api_client, user1, hydroponic_system1, measu
     assert "latest_measurements" in response.data
     assert len(response.data["latest_measurements"]) == 10
 
+@pytest.mark.django_db
+def test_retrieve_hydroponic_system_cached(api_client, user1, hydroponic_system1, measurements1, django_assert_num_queries):
+    api_client.force_authenticate(user=user1)
+    url = reverse("hydroponicsystem-detail", args=[hydroponic_system1.id])
+    first = api_client.get(url)
+
+    # only the system itself is read
+    with django_assert_num_queries(1):
+        second = api_client.get(url)
+
+    assert second.data == first.data
+    assert [m["id"] for m in second.data["latest_measurements"]] == [m.id for m in reversed(measurements1[5:])]
+    assert cache_stats() == {"hits": 1, "misses": 1}
+
+@pytest.mark.django_db
+def test_retrieve_hydroponic_system_cache_updated_on_write(
+    api_client, user1, hydroponic_system1, measurements1, django_capture_on_commit_callbacks,
+):
+    api_client.force_authenticate(user=user1)
+    url = reverse("hydroponicsystem-detail", args=[hydroponic_system1.id])
+    api_client.get(url)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client.post(
+            reverse("measurement", args=[hydroponic_system1.id]),
+            [{"ph": 7.0, "temperature": 21.0, "tds": 700}, {"ph": 7.1, "temperature": 21.5, "tds": 710}],
+            format="json",
+        )
+    assert response.status_code == status.HTTP_201_CREATED
+
+    latest = api_client.get(url).data["latest_measurements"]
+    assert len(latest) == 10
+    assert [m["ph"] for m in latest[:2]] == [7.1, 7.0]
+    assert [m["id"] for m in latest[2:]] == [m.id for m in reversed(measurements1[7:])]
+    assert cache_stats() == {"hits": 1, "misses": 1}
+
 @pytest.mark.django_db
 def test_retrieve_hydroponic_system_permission_denied(api_client, user2, hydroponic_system1):
     api_client.force_authenticate(user=user2)
@@ -130,3 +177,58 @@ def test_list_hydroponic_systems_invalid_date(api_client, user1, hydroponic_syst
 
     assert response.status_code == status.HTTP_400_BAD_REQUEST
     assert "Invalid date format" in response.data["detail"]
+
+@pytest.mark.django_db
+def test_retrieve_hydroponic_system_conditional(
+    shared_versions, api_client, user1, user2, hydroponic_system1, measurements1, django_assert_num_queries, django_capture_on_commit_callbacks,
+):
+    api_client.force_authenticate(user=user1)
+    url = reverse("hydroponicsystem-detail", args=[hydroponic_system1.id])
+    response = api_client.get(url)
+    etag, last_modified = response["ETag"], response["Last-Modified"]
+
+    # only the ownership check
+    with django_assert_num_queries(1):
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+    assert api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code == status.HTTP_304_NOT_MODIFIED
+
+    # validators are per user, so they never skip the ownership check
+    api_client.force_authenticate(user=user2)
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_404_NOT_FOUND
+    assert api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code == status.HTTP_404_NOT_FOUND
+    missing = reverse("hydroponicsystem-detail", args=[hydroponic_system1.id + 1000])
+    assert api_client.get(missing, HTTP_IF_NONE_MATCH="*", HTTP_IF_MODIFIED_SINCE=last_modified).status_code == status.HTTP_404_NOT_FOUND
+    assert cache.get(f"versions:system:{hydroponic_system1.id + 1000}") is None
+
+    api_client.force_authenticate(user=user1)
+    with django_capture_on_commit_callbacks(execute=True):
+        api_client.put(url, {"name": "Renamed"})
+
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["hydroponic_system"]["name"] == "Renamed"
+    assert api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code == status.HTTP_200_OK
+
+@pytest.mark.django_db
+def test_no_validators_with_process_local_versions(api_client, user1, hydroponic_system1):
+    api_client.force_authenticate(user=user1)
+
+    for url in (reverse("hydroponicsystem-list"), reverse("hydroponicsystem-detail", args=[hydroponic_system1.id])):
+        response = api_client.get(url, HTTP_IF_NONE_MATCH="*")
+        assert response.status_code == status.HTTP_200_OK
+        assert "ETag" not in response and "Last-Modified" not in response
+
+@pytest.mark.django_db
+def test_list_hydroponic_systems_conditional(shared_versions, api_client, user1, hydroponic_system1, django_capture_on_commit_callbacks):
+    api_client.force_authenticate(user=user1)
+    url = reverse("hydroponicsystem-list")
+    etag = api_client.get(url)["ETag"]
+
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+    with django_capture_on_commit_callbacks(execute=True):
+        api_client.post(url, {"name": "Second System"})
+
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["count"] == 2
@@ -0,0 +1,58 @@
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'HydroponicSystem.settings'
+import django
+django.setup()
+
+import numpy as np
+from rest_framework.serializers import ListSerializer
+from ..serializers import MeasurementSerializer
+from ..validation import validate_columns, validate_rows, iter_validated
+
+ROWS = [
+    {"ph": 6.5, "temperature": 22.5, "tds": 900},
+    {"ph": "6.5", "temperature": "22", "tds": "900", "sequence": 3},
+    {"ph": 15, "temperature": -20, "tds": -1},
+    {"ph": "abc", "temperature": True, "tds": 900.5},
+    {"temperature": 22.5, "tds": 900},
+    {"ph": None, "temperature": 22.5, "tds": 900, "sequence": None},
+    {"ph": 6.5, "temperature": 22.5, "tds": 10 ** 30, "sequence": -1},
+    "not a measurement",
+]
+
+
+def test_validate_rows_matches_serializer_errors():
+    expected = ListSerializer(child=MeasurementSerializer(), data=ROWS)
+    expected.is_valid()
+
+    _, _, errors = validate_rows(ROWS)
+
+    assert [errors.get(index, {}) for index in range(len(ROWS))] == expected.errors
+
+
+def test_validate_rows_converts_values():
+    columns, nulls, errors = validate_rows(ROWS[:2])
+
+    assert errors == {}
+    assert list(iter_validated(columns, nulls, errors)) == [
+        (0, {"sequence": None, "ph": 6.5, "temperature": 22.5, "tds": 900}),
+        (1, {"sequence": 3, "ph": 6.5, "temperature": 22.0, "tds": 900}),
+    ]
+
+
+def test_validate_rows_rejects_nan():
+    _, _, errors = validate_rows([{"ph": float("nan"), "temperature": 22.5, "tds": 900}])
+
+    assert errors == {0: {"ph": ["A valid number is required."]}}
+
+
+def test_validate_columns():
+    errors = validate_columns({
+        "ph": np.array([6.5, 14.5, np.nan]),
+        "temperature": np.array([22.5, 22.5, 22.5]),
+        "tds": np.array([900, 900, 900]),
+        "sequence": None,
+    })
+
+    assert set(errors) == {1, 2}
+    assert errors[1]["ph"][0].code == "max_value"
+    assert errors[2]["ph"][0].code == "invalid"
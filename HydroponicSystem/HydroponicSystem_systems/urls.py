@@ -1,7 +1,18 @@
 from django.urls import path
 
 from .measurement_view import MeasurementAPIView
+from .gateway_view import GatewayMeasurementAPIView
+from .aggregation_view import MeasurementAggregationAPIView
+from .export_view import MeasurementExportAPIView
+from .statistics_view import MeasurementStatisticsAPIView
+from .device_token_view import DeviceTokenAPIView, DeviceTokenDetailAPIView
 
 urlpatterns = [
     path('systems/<int:system_id>/measurements/', MeasurementAPIView.as_view(), name="measurement"),
+    path('systems/<int:system_id>/measurements/aggregate/', MeasurementAggregationAPIView.as_view(), name="measurement-aggregate"),
+    path('systems/<int:system_id>/measurements/export/', MeasurementExportAPIView.as_view(), name="measurement-export"),
+    path('systems/<int:system_id>/measurements/statistics/', MeasurementStatisticsAPIView.as_view(), name="measurement-statistics"),
+    path('systems/<int:system_id>/device-tokens/', DeviceTokenAPIView.as_view(), name="device-token"),
+    path('systems/<int:system_id>/device-tokens/<int:token_id>/', DeviceTokenDetailAPIView.as_view(), name="device-token-detail"),
+    path('gateway/measurements/', GatewayMeasurementAPIView.as_view(), name="gateway-measurement"),
 ]
\ No newline at end of file
@@ -0,0 +1,166 @@
+import numpy as np
+from rest_framework.exceptions import ErrorDetail, ValidationError
+from rest_framework.fields import SkipField, empty
+from rest_framework.serializers import Serializer
+
+_type_of = np.frompyfunc(type, 1, 1)
+
+
+class _Column:
+    """Validation rules of one writable `MeasurementSerializer` field."""
+    def __init__(self, name, field):
+        self.name = name
+        self.field = field
+        self.is_float = field.__class__.__name__ == "FloatField"
+        self.dtype = np.float64 if self.is_float else np.int64
+        self.fast_types = (float, int) if self.is_float else (int,)
+        self.invalid = ErrorDetail(str(field.error_messages['invalid']), code='invalid')
+        self.max_value = field.max_value
+        self.min_value = field.min_value
+        self.max_message = None
+        self.min_message = None
+        if field.max_value is not None:
+            message = field.error_messages['max_value'].format(max_value=field.max_value)
+            self.max_message = ErrorDetail(message, code='max_value')
+        if field.min_value is not None:
+            message = field.error_messages['min_value'].format(min_value=field.min_value)
+            self.min_message = ErrorDetail(message, code='min_value')
+
+
+_columns = None
+
+
+def get_columns():
+    global _columns
+    if _columns is None:
+        from .serializers import MeasurementSerializer
+        fields = MeasurementSerializer().fields
+        _columns = [
+            _Column(name, field) for name, field in fields.items()
+            if not field.read_only
+        ]
+    return _columns
+
+
+def _add_error(errors, index, name, detail):
+    errors.setdefault(index, {}).setdefault(name, []).extend(detail)
+
+
+def check_column(column, values, checked, errors):
+    """
+    Apply the NaN and range checks of `column` to the rows selected by the boolean mask `checked`.
+
+    Unlike `MeasurementSerializer`, NaN is rejected with the field's "invalid" message.
+    Errors are added to `errors` as `{index: {field: [ErrorDetail, ...]}}`.
+    """
+    if column.is_float:
+        for index in np.flatnonzero(checked & np.isnan(values)):
+            _add_error(errors, int(index), column.name, [column.invalid])
+        checked = checked & ~np.isnan(values)
+
+    # validators run max before min, as on the serializer field; a value can only fail one of them
+    if column.max_value is not None:
+        for index in np.flatnonzero(checked & (values > column.max_value)):
+            _add_error(errors, int(index), column.name, [column.max_message])
+    if column.min_value is not None:
+        for index in np.flatnonzero(checked & (values < column.min_value)):
+            _add_error(errors, int(index), column.name, [column.min_message])
+
+
+def validate_columns(columns):
+    """
+    Check already-numeric column arrays (for example decoded from a binary upload).
+
+    Every writable field present in `columns` is NaN- and range-checked; `None` columns
+    are skipped. Returns serializer-style errors keyed by row index.
+    """
+    errors = {}
+    for column in get_columns():
+        values = columns.get(column.name)
+        if values is not None:
+            check_column(column, values, np.ones(len(values), dtype=bool), errors)
+    return errors
+
+
+def validate_rows(rows):
+    """
+    Validate a list of measurement objects column by column instead of row by row.
+
+    Common values (numbers of the right type) are converted and range-checked with NumPy;
+    anything else (strings, booleans, nulls, missing keys) falls back to the serializer field,
+    so error messages are the same as `MeasurementSerializer` gives.
+
+    Returns `(columns, nulls, errors)`: `columns` maps field names to arrays with one entry per
+    row, `nulls` maps nullable field names to masks of rows without a value, and `errors` maps
+    row indexes to serializer-style error dicts.
+    """
+    size = len(rows)
+    errors = {}
+    is_mapping = np.fromiter((isinstance(row, dict) for row in rows), dtype=bool, count=size)
+    for index in np.flatnonzero(~is_mapping):
+        message = Serializer.default_error_messages['invalid'].format(datatype=type(rows[index]).__name__)
+        errors[int(index)] = {"non_field_errors": [ErrorDetail(message, code='invalid')]}
+
+    columns = {}
+    nulls = {}
+    for column in get_columns():
+        raw = np.empty(size, dtype=object)
+        raw[:] = [row.get(column.name, empty) if isinstance(row, dict) else empty for row in rows]
+
+        types = _type_of(raw)
+        fast = np.zeros(size, dtype=bool)
+        for fast_type in column.fast_types:
+            fast |= types == fast_type
+
+        values = np.zeros(size, dtype=column.dtype)
+        try:
+            values[fast] = raw[fast].astype(column.dtype)
+        except OverflowError:
+            fast[:] = False
+
+        null = np.zeros(size, dtype=bool)
+        checked = fast.copy()
+        for index in np.flatnonzero(~fast & is_mapping):
+            index = int(index)
+            try:
+                value = column.field.run_validation(raw[index])
+            except SkipField:
+                null[index] = True
+                continue
+            except ValidationError as exc:
+                _add_error(errors, index, column.name, exc.detail)
+                continue
+            if value is None:
+                null[index] = True
+            elif column.is_float and value != value:
+                _add_error(errors, index, column.name, [column.invalid])
+            else:
+                # already range-checked by the field validators
+                values[index] = value
+
+        check_column(column, values, checked, errors)
+        columns[column.name] = values
+        if column.field.allow_null or not column.field.required:
+            nulls[column.name] = null
+
+    return columns, nulls, errors
+
+
+def format_errors(row_errors):
+    """Format one row's serializer-style errors as a single line, e.g. `ph: Ensure this value ...`."""
+    return "; ".join(f"{name}: {' '.join(map(str, messages))}" for name, messages in row_errors.items())
+
+
+def iter_validated(columns, nulls, errors):
+    """Yield `(index, attrs)` for every valid row, with `None` for null values."""
+    names = list(columns)
+    lists = [columns[name].tolist() for name in names]
+    null_lists = [nulls[name].tolist() if name in nulls else None for name in names]
+
+    for index, values in enumerate(zip(*lists)):
+        if index in errors:
+            continue
+        attrs = {}
+        for name, value, null in zip(names, values, null_lists):
+            attrs[name] = None if null is not None and null[index] else value
+        yield index, attrs
@@ -0,0 +1,126 @@
+import hashlib
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from .models import HydroponicSystem
+
+
+def _cache():
+    return caches[getattr(settings, 'MEASUREMENT_QUERY', {}).get('VERSION_CACHE', 'default')]
+
+
+def enabled():
+    """
+    Whether `conditional` issues validators. A token bumped in one process must be seen by all
+    of them, or a stale one keeps answering 304 for changed data, so by default this is off
+    when the version cache is process-local. `MEASUREMENT_QUERY['CONDITIONAL_REQUESTS']`
+    overrides the default.
+    """
+    configured = getattr(settings, 'MEASUREMENT_QUERY', {}).get('CONDITIONAL_REQUESTS')
+    if configured is not None:
+        return configured
+    return not isinstance(_cache(), LocMemCache)
+
+
+def _key(scope, object_id):
+    return f"versions:{scope}:{object_id}"
+
+
+def get_version(scope, object_id):
+    """
+    `(token, modified)` of a `scope` ("system" or "user") object, `modified` in epoch seconds.
+
+    A missing token (new object, cache restart or eviction) is created on first use, so
+    validators issued before it can no longer match.
+    """
+    cache = _cache()
+    key = _key(scope, object_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, (uuid.uuid4().hex, int(time.time())), timeout=None)
+        version = cache.get(key) or (uuid.uuid4().hex, int(time.time()))
+    return version
+
+
+def bump_versions(scope, object_ids):
+    """
+    Replace the tokens of `object_ids` once the current transaction commits.
+
+    `modified` moves forward by at least a second per change, so `If-Modified-Since`,
+    which has one-second resolution, cannot miss a change made within the same second.
+    """
+    keys = [_key(scope, object_id) for object_id in set(object_ids)]
+
+    def bump():
+        cache = _cache()
+        now = int(time.time())
+        current = cache.get_many(keys)
+        cache.set_many({
+            key: (uuid.uuid4().hex, max(now, current[key][1] + 1) if key in current else now)
+            for key in keys
+        }, timeout=None)
+
+    if keys:
+        transaction.on_commit(bump)
+
+
+def owned_system(request, system_id):
+    """
+    The requesting user's `HydroponicSystem` with id `system_id`, or None when it does not exist
+    or belongs to someone else. Looked up once per request, so a conditional handler and its
+    validators share the query.
+    """
+    systems = request.__dict__.setdefault("_owned_systems", {})
+    if system_id not in systems:
+        try:
+            systems[system_id] = HydroponicSystem.objects.filter(id=system_id, owner_id=request.user.pk).first()
+        except (TypeError, ValueError):
+            systems[system_id] = None
+    return systems[system_id]
+
+
+def conditional(scope, url_kwarg=None):
+    """
+    Decorator for GET handlers of API views: `ETag` and `Last-Modified` come from the version
+    of the `scope` object named by `url_kwarg` (the requesting user when None), and matching
+    `If-None-Match` / `If-Modified-Since` requests get `304 Not Modified` before the handler
+    runs. For the system scope the validators exist only when `owned_system` finds the system,
+    and the handler can reuse that lookup.
+
+    For a missing or foreign system, or when `enabled()` is false, there are no validators:
+    the handler runs and answers as it would without conditional headers, and no version
+    token is created.
+
+    The ETag also covers the user, the full URL and the `Accept` header, so every query and
+    representation of the resource has its own validator.
+    """
+    def version(request, kwargs):
+        if not enabled():
+            return None
+        if url_kwarg is None:
+            return get_version(scope, request.user.pk)
+        system = owned_system(request, kwargs[url_kwarg])
+        return None if system is None else get_version(scope, system.pk)
+
+    def etag(request, *args, **kwargs):
+        current = version(request, kwargs)
+        if current is None:
+            return None
+        parts = [current[0], str(request.user.pk), request.build_absolute_uri(), request.META.get("HTTP_ACCEPT", "")]
+        return hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        current = version(request, kwargs)
+        if current is None:
+            return None
+        return datetime.fromtimestamp(current[1], tz=dt_timezone.utc)
+
+    return method_decorator(condition(etag_func=etag, last_modified_func=last_modified))
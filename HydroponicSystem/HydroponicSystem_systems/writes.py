@@ -0,0 +1,168 @@
+import csv
+import io
+
+from django.db import connection, transaction
+
+from .latest import remember_measurements
+from .models import Measurement, MeasurementSequence
+from .partitions import is_partitioned
+from .rollups import update_rollups
+from .series import append_series
+from .versions import bump_versions
+
+
+def save_measurements(measurements, copy=False):
+    """
+    Insert `measurements` with bulk statements and return the ones skipped as duplicates.
+
+    Rows without a `sequence` are written with `bulk_create`, or with `COPY FROM STDIN` on
+    PostgreSQL when `copy` is set, for bulk imports. COPY returns no primary keys, so the cached
+    latest measurements and series of those systems are dropped instead of updated. Rows with one are written with
+    `INSERT ... ON CONFLICT (system_id, sequence) DO NOTHING RETURNING`, so a retried upload
+    costs no read-before-write. Inserted rows get their primary key set. The keys are first
+    claimed in the `MeasurementSequence` table, the same way: the measurement table's own key
+    does not see rows that `compress_measurements` moved into blocks, and when the table is
+    partitioned (PostgreSQL, migration 0004) it also contains `timestamp`, which retries of
+    server-stamped uploads do not repeat.
+
+    The hourly and daily rollups are updated in the same transaction, and the cached latest
+    measurements, series caches and version tokens of the systems once it commits.
+    """
+    plain = [measurement for measurement in measurements if measurement.sequence is None]
+    sequenced = [measurement for measurement in measurements if measurement.sequence is not None]
+    duplicates = []
+
+    with transaction.atomic(savepoint=False):
+        if plain and copy and connection.vendor == "postgresql":
+            _copy(plain)
+        elif plain:
+            Measurement.objects.bulk_create(plain)
+        if sequenced:
+            duplicates = _insert_ignoring_duplicates(sequenced)
+
+        skipped = {id(measurement) for measurement in duplicates}
+        inserted = [measurement for measurement in measurements if id(measurement) not in skipped]
+        update_rollups(
+            (measurement.system_id, measurement.timestamp, measurement.ph, measurement.temperature, measurement.tds)
+            for measurement in inserted
+        )
+        remember_measurements(inserted)
+        append_series(inserted)
+        bump_versions("system", [measurement.system_id for measurement in inserted])
+
+    return duplicates
+
+
+def _insert_ignoring_duplicates(measurements):
+    opts = Measurement._meta
+    quote_name = connection.ops.quote_name
+    fields = [field for field in opts.concrete_fields if not field.primary_key]
+    # on a partitioned table the unique index also contains the partition key
+    key_fields = [opts.get_field(name) for name in ['system', 'sequence']]
+    if is_partitioned(connection.alias):
+        key_fields.append(opts.get_field('timestamp'))
+    key_columns = ", ".join(quote_name(field.column) for field in key_fields)
+
+    row_placeholder = "(" + ", ".join(["%s"] * len(fields)) + ")"
+    sql = (
+        f"INSERT INTO {quote_name(opts.db_table)} ({', '.join(quote_name(field.column) for field in fields)}) "
+        f"VALUES {{values}} "
+        f"ON CONFLICT ({key_columns}) DO NOTHING "
+        f"RETURNING {quote_name(opts.pk.column)}, {key_columns}"
+    )
+    batch_size = max(connection.ops.bulk_batch_size(fields, measurements), 1)
+    duplicates = []
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(measurements), batch_size):
+            batch = measurements[start:start + batch_size]
+            # pre_save stamps server-side timestamps, so the rows are prepared before anything is claimed
+            rows = [
+                [field.get_db_prep_save(field.pre_save(measurement, True), connection) for field in fields]
+                for measurement in batch
+            ]
+            claimed = _claim_sequences(cursor, batch)
+            prepared, batch, rows = list(zip(batch, rows)), [], []
+            for measurement, row in prepared:
+                key = (measurement.system_id, measurement.sequence)
+                # a key repeated within the upload is claimed once
+                if key in claimed:
+                    claimed.remove(key)
+                    batch.append(measurement)
+                    rows.append(row)
+                else:
+                    duplicates.append(measurement)
+            if not batch:
+                continue
+
+            cursor.execute(
+                sql.format(values=", ".join([row_placeholder] * len(batch))), [value for row in rows for value in row],
+            )
+            inserted = {tuple(key): pk for pk, *key in cursor.fetchall()}
+
+            for measurement in batch:
+                pk = inserted.pop(tuple(getattr(measurement, field.attname) for field in key_fields), None)
+                if pk is None:
+                    duplicates.append(measurement)
+                else:
+                    measurement.pk = pk
+                    measurement._state.adding = False
+
+    return duplicates
+
+
+def _claim_sequences(cursor, measurements):
+    """
+    Insert the `(system_id, sequence)` keys of `measurements` into `MeasurementSequence`,
+    skipping those already there, and return the set of newly claimed ones.
+    """
+    opts = MeasurementSequence._meta
+    quote_name = connection.ops.quote_name
+    timestamp = opts.get_field('timestamp')
+    cursor.execute(
+        f"INSERT INTO {quote_name(opts.db_table)} ({quote_name('system_id')}, {quote_name('sequence')}, "
+        f"{quote_name('timestamp')}) VALUES {', '.join(['(%s, %s, %s)'] * len(measurements))} "
+        f"ON CONFLICT ({quote_name('system_id')}, {quote_name('sequence')}) DO NOTHING "
+        f"RETURNING {quote_name('system_id')}, {quote_name('sequence')}",
+        [
+            value
+            for measurement in measurements
+            for value in (
+                measurement.system_id, measurement.sequence,
+                timestamp.get_db_prep_value(measurement.timestamp, connection),
+            )
+        ],
+    )
+    return {tuple(key) for key in cursor.fetchall()}
+
+
+def _copy(measurements):
+    """Insert `measurements` with `COPY FROM STDIN`; their primary keys stay unset."""
+    opts = Measurement._meta
+    quote_name = connection.ops.quote_name
+    fields = [field for field in opts.concrete_fields if not field.primary_key]
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for measurement in measurements:
+        row = [field.get_db_prep_save(field.pre_save(measurement, True), connection) for field in fields]
+        # an unquoted empty field is NULL in COPY's csv format
+        writer.writerow(
+            "" if value is None else value.isoformat() if hasattr(value, "isoformat")
+            else repr(value) if isinstance(value, float) else value
+            for value in row
+        )
+
+    sql = (
+        f"COPY {quote_name(opts.db_table)} ({', '.join(quote_name(field.column) for field in fields)}) "
+        f"FROM STDIN WITH (FORMAT csv)"
+    )
+    with connection.cursor() as cursor:
+        if hasattr(cursor.cursor, "copy_expert"):
+            # psycopg2
+            buffer.seek(0)
+            cursor.cursor.copy_expert(sql, buffer)
+        else:
+            # psycopg 3
+            with cursor.cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
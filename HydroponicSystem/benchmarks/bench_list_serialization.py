@@ -0,0 +1,97 @@
+"""
+Compare serialization of measurement list pages.
+
+    python benchmarks/bench_list_serialization.py [--rows 1000 10000] [--repeat 5]
+
+`serializer` builds model instances, runs MeasurementSerializer(many=True) and renders with
+DRF's JSONRenderer, as MeasurementAPIView.get did before the fast path. `fast path` builds the
+named tuples of values_list(named=True), encodes them with serializers.encode_measurements and
+renders with MeasurementJSONRenderer (orjson is used for the envelope if installed).
+Both outputs are checked to be byte-identical. No database access is needed.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'HydroponicSystem.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from HydroponicSystem_systems.models import Measurement  # noqa: E402
+from HydroponicSystem_systems.renderers import MeasurementJSONRenderer, orjson  # noqa: E402
+from HydroponicSystem_systems.serializers import (  # noqa: E402
+    MEASUREMENT_VALUES, MeasurementSerializer, encode_measurements,
+)
+
+FIELD_NAMES = [field.attname for field in Measurement._meta.concrete_fields]
+Row = namedtuple("Row", MEASUREMENT_VALUES)
+NEXT = "http://localhost:8000/systems/1/measurements/?page=3"
+PREVIOUS = "http://localhost:8000/systems/1/measurements/?page=1"
+
+
+def make_rows(count):
+    rng = random.Random(count)
+    start = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+    return [
+        {
+            "id": index + 1,
+            "system_id": 1,
+            "timestamp": start + timedelta(seconds=index * 5, microseconds=rng.randrange(1000000)),
+            "ph": round(rng.uniform(5.5, 7.5), 2),
+            "temperature": rng.uniform(18, 26),
+            "tds": rng.randint(600, 1200),
+            "sequence": index if index % 2 else None,
+        }
+        for index in range(count)
+    ]
+
+
+def serializer(rows):
+    measurements = [Measurement.from_db("default", FIELD_NAMES, [row[name] for name in FIELD_NAMES]) for row in rows]
+    data = MeasurementSerializer(measurements, many=True).data
+    return JSONRenderer().render({"count": len(rows), "next": NEXT, "previous": PREVIOUS, "results": data})
+
+
+def fast_path(rows):
+    page = [Row(*[row[name] for name in MEASUREMENT_VALUES]) for row in rows]
+    data = encode_measurements(page)
+    return MeasurementJSONRenderer().render({"count": len(rows), "next": NEXT, "previous": PREVIOUS, "results": data})
+
+
+def best_of(function, rows, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(rows)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    print(f"orjson: {'installed' if orjson else 'not installed'}")
+    print(f"{'rows':>8} {'serializer':>12} {'fast path':>12} {'speedup':>8}")
+    for count in options.rows:
+        rows = make_rows(count)
+        assert serializer(rows) == fast_path(rows), "outputs differ"
+        slow = best_of(serializer, rows, options.repeat)
+        fast = best_of(fast_path, rows, options.repeat)
+        print(f"{count:>8} {slow * 1000:>10.1f}ms {fast * 1000:>10.1f}ms {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compare batch validation of measurement uploads.
+
+    python benchmarks/bench_validation.py [--rows 1000 10000 100000] [--repeat 3]
+
+`row-by-row` is DRF's stock ListSerializer running MeasurementSerializer on every row,
+`columnar` is MeasurementSerializer(many=True), which validates with NumPy columns.
+No database access is needed.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'HydroponicSystem.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.serializers import ListSerializer  # noqa: E402
+
+from HydroponicSystem_systems.serializers import MeasurementSerializer  # noqa: E402
+
+
+def make_rows(count, invalid_ratio=0.01):
+    rng = random.Random(count)
+    rows = []
+    for index in range(count):
+        row = {
+            "ph": round(rng.uniform(5.5, 7.5), 2),
+            "temperature": round(rng.uniform(18, 26), 1),
+            "tds": rng.randint(600, 1200),
+            "sequence": index,
+        }
+        if rng.random() < invalid_ratio:
+            row["ph"] = 15
+        rows.append(row)
+    return rows
+
+
+def row_by_row(rows):
+    serializer = ListSerializer(child=MeasurementSerializer(), data=rows)
+    serializer.is_valid()
+    return serializer
+
+
+def columnar(rows):
+    serializer = MeasurementSerializer(data=rows, many=True, context={"best_effort": True})
+    serializer.is_valid()
+    return serializer
+
+
+def best_of(function, rows, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(rows)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args()
+
+    print(f"{'rows':>8} {'row-by-row':>12} {'columnar':>12} {'speedup':>8}")
+    for count in options.rows:
+        rows = make_rows(count)
+        slow = best_of(row_by_row, rows, options.repeat)
+        fast = best_of(columnar, rows, options.repeat)
+        print(f"{count:>8} {slow * 1000:>10.1f}ms {fast * 1000:>10.1f}ms {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()